@@ -0,0 +1,251 @@
+"""
+    Dynamic micro-batching of line recognition across concurrent callers.
+
+    Callers preprocess their own line images and put them on a queue. A
+    dispatcher thread collects queued lines until either max_batch_size lines
+    are waiting or the oldest one has waited max_wait_ms, sorts them by width
+    to reduce padding, runs one session call and resolves the per-line futures.
+    With several dispatchers, several batches run on the session at the same time,
+    each on the intra op threads of the session (see utils.session_utils).
+"""
+
+import collections
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from . import model_registry
+from .model_registry import DEFAULT_MODEL_CONFIG
+from .utils.image_utils import (ImagePreprocessing, InferringPreprocessing, INFERRING, preprocess_inferring_strip,
+                                pad_inferring_batch)
+
+DEFAULT_MAX_BATCH_SIZE = 32
+DEFAULT_MAX_WAIT_MS = 5.0
+DEFAULT_NUM_DISPATCHERS = 1
+
+# Number of most recent batches kept for the occupancy metrics
+RECENT_BATCHES = 200
+
+_QueuedLine = collections.namedtuple("_QueuedLine", ["feature", "seq_len", "future", "enqueued_at"])
+
+
+class BatchScheduler():
+    """Batches line recognition requests from several threads into shared session runs."""
+
+    def __init__(self, model, max_batch_size=DEFAULT_MAX_BATCH_SIZE, max_wait_ms=DEFAULT_MAX_WAIT_MS,
+                 num_dispatchers=DEFAULT_NUM_DISPATCHERS):
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.num_dispatchers = num_dispatchers
+
+        self._preprocessor = InferringPreprocessing() if getattr(model.config, "binarize_once", False) else \
+            ImagePreprocessing(INFERRING)
+        self._queue = queue.Queue()
+        self._stopped = threading.Event()
+
+        self._stats_lock = threading.Lock()
+        self._num_batches = 0
+        self._num_lines = 0
+        self._recent_batches = collections.deque(maxlen=RECENT_BATCHES)
+
+        self._dispatchers = [threading.Thread(target=self._dispatch_loop, name=f"ocr-batch-dispatcher-{index}",
+                                              daemon=True) for index in range(num_dispatchers)]
+        for dispatcher in self._dispatchers:
+            dispatcher.start()
+
+    def submit(self, image, binarized=False):
+        """
+        Preprocesses a line image in the calling thread and queues it for recognition.
+        Already binarized lines (binarized=True) are only cropped and resized.
+
+        Returns:
+            Future: Resolves to the predicted text of the line.
+        """
+        return self.submit_all([image], binarized=binarized)[0]
+
+    def submit_all(self, images, binarized=False):
+        """
+        Preprocesses the line images of a request in the calling thread and queues them for recognition.
+        No line is queued if any of them fails to preprocess.
+
+        Returns:
+            list: Future of each line image, in the same order.
+        """
+        if self._stopped.is_set():
+            raise RuntimeError("BatchScheduler is closed")
+
+        config = self.model.config
+        lines = [preprocess_inferring_strip(image, config.image_size, flip_image=config.flip_image,
+                                            preprocessor=self._preprocessor, binarized=binarized)
+                 for image in images]
+
+        futures = []
+        for feature, seq_len in lines:
+            future = Future()
+            self._queue.put(_QueuedLine(feature, seq_len, future, time.monotonic()))
+            futures.append(future)
+
+        return futures
+
+    def predict(self, images, timeout=None, binarized=False):
+        """
+        Recognises the line images and waits for all of them. If waiting fails (e.g. a line failed or the
+        timeout passed) the lines of the request that are still queued are cancelled.
+
+        Returns:
+            list: Predicted text of each line image, in the same order.
+        """
+        futures = self.submit_all(images, binarized=binarized)
+        try:
+            return [future.result(timeout=timeout) for future in futures]
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+
+    def close(self):
+        """Stops the dispatchers once the already queued lines are recognised."""
+        self._stopped.set()
+        self._queue.put(None)
+        for dispatcher in self._dispatchers:
+            dispatcher.join()
+
+    def stats(self):
+        """
+        Returns the batching metrics used to tune max_batch_size and max_wait_ms.
+
+        occupancy is the batch size relative to max_batch_size, padding_efficiency is the share of
+        the padded batch that is real line pixels, and queue_wait_ms is how long the oldest line of
+        a batch waited before its session run started.
+        """
+        with self._stats_lock:
+            recent = list(self._recent_batches)
+            num_batches, num_lines = self._num_batches, self._num_lines
+
+        def mean(key):
+            return sum(batch[key] for batch in recent) / len(recent) if recent else 0.0
+
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_ms,
+            "num_dispatchers": self.num_dispatchers,
+            "queued_lines": self._queue.qsize(),
+            "total_batches": num_batches,
+            "total_lines": num_lines,
+            "recent_batches": len(recent),
+            "mean_batch_size": mean("batch_size"),
+            "mean_occupancy": mean("occupancy"),
+            "mean_padding_efficiency": mean("padding_efficiency"),
+            "mean_queue_wait_ms": mean("queue_wait_ms"),
+            "mean_run_ms": mean("run_ms"),
+            "last_batch": recent[-1] if recent else None,
+        }
+
+    def _collect_batch(self):
+        first = self._queue.get()
+        if first is None:
+            return []
+
+        batch = [first]
+        deadline = first.enqueued_at + self.max_wait_ms / 1000.0
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                # Recognise what has been collected, then stop on the next loop
+                self._queue.put(None)
+                break
+            batch.append(item)
+
+        return batch
+
+    def _dispatch_loop(self):
+        while True:
+            batch = self._collect_batch()
+            if not batch:
+                if self._stopped.is_set():
+                    # Passes the stop on to the other dispatchers
+                    self._queue.put(None)
+                    return
+                continue
+
+            self._run_batch(batch)
+
+    def _run_batch(self, batch):
+        config = self.model.config
+        # Lines cancelled by their request are dropped, the others can no longer be cancelled
+        batch = [item for item in batch if item.future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+
+        batch.sort(key=lambda item: item.seq_len)
+        seq_len = [item.seq_len for item in batch]
+
+        started_at = time.monotonic()
+        try:
+            X = pad_inferring_batch([item.feature for item in batch], seq_len, config.image_size,
+                                    flip_image=config.flip_image)
+            _, urdu_out = self.model.infer_batch(X, seq_len)
+        except Exception as e:
+            logging.exception("Batch recognition failed")
+            for item in batch:
+                item.future.set_exception(e)
+            return
+        finished_at = time.monotonic()
+
+        for item, text in zip(batch, urdu_out):
+            item.future.set_result(text)
+
+        record = {
+            "batch_size": len(batch),
+            "occupancy": len(batch) / self.max_batch_size,
+            "padding_efficiency": sum(seq_len) / (len(batch) * max(seq_len)),
+            "queue_wait_ms": (started_at - min(item.enqueued_at for item in batch)) * 1000.0,
+            "run_ms": (finished_at - started_at) * 1000.0,
+        }
+
+        with self._stats_lock:
+            self._num_batches += 1
+            self._num_lines += len(batch)
+            self._recent_batches.append(record)
+
+        logging.debug("OCR batch: %d lines, occupancy %.2f, padding efficiency %.2f, run %.1f ms",
+                      record["batch_size"], record["occupancy"], record["padding_efficiency"], record["run_ms"])
+
+
+_schedulers = {}
+_schedulers_lock = threading.Lock()
+
+
+def get_scheduler(model_config_path=DEFAULT_MODEL_CONFIG, max_batch_size=DEFAULT_MAX_BATCH_SIZE,
+                  max_wait_ms=DEFAULT_MAX_WAIT_MS, num_dispatchers=DEFAULT_NUM_DISPATCHERS):
+    """
+    Return the process wide scheduler in front of the model of the given config, creating it on first use.
+    The batching knobs only apply when the scheduler is created.
+    """
+    model = model_registry.get_model(model_config_path)
+    key = os.path.abspath(model_config_path)
+
+    with _schedulers_lock:
+        scheduler = _schedulers.get(key)
+        if scheduler is None:
+            scheduler = BatchScheduler(model, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms,
+                                       num_dispatchers=num_dispatchers)
+            _schedulers[key] = scheduler
+
+    return scheduler
+
+
+def get_all_stats():
+    """Return the stats of every running scheduler keyed by model config path."""
+    with _schedulers_lock:
+        schedulers = dict(_schedulers)
+
+    return {key: scheduler.stats() for key, scheduler in schedulers.items()}
@@ -0,0 +1,265 @@
+"""
+    Per book calibration of the line finding kernel sizes.
+
+    The closing and opening kernels of page_to_lines_updated have to bridge the gaps
+    between the words of a line without bridging the gaps between lines, so they
+    depend on the size of the text and the spacing of the lines of a book. Both are
+    measured on a fixed sample of pages spread over the book before any page is
+    segmented, the default kernels are scaled to them and the result is cached by the
+    hash of the PDF, so later runs on the same PDF get the same kernels without
+    rendering the sample again.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # not on Windows, the cache file is then only locked within the process
+    fcntl = None
+
+from .convert_to_pages import get_pdf_page_count, iter_pdf_pages
+from .image_utils import otsu_binary, true_runs
+from .utils.binarization import connected_component_stats
+
+DEFAULT_KERNEL_SIZES = ((200, 4), (8, 3))
+DEFAULT_CACHE_PATH = "output/kernel_calibration.json"
+
+CALIBRATION_PAGES = 5  # pages of a book the kernel sizes are calibrated on, spread over the book
+MIN_COMPONENT_AREA = 20  # smaller components are noise
+TEXT_HEIGHT_PERCENTILE = 75  # the median component is a dot or a diacritic, letters are taller
+# Text height (page_text_metrics) of the annotated pages DEFAULT_KERNEL_SIZES were tuned on. Not measured yet, the
+# kernels cannot be calibrated until it is: scripts/stats/segmentation_benchmark.py reports it as text_height.
+REFERENCE_TEXT_HEIGHT = None
+MAX_VERTICAL_KERNEL_GAP_RATIO = 0.5  # vertical kernels stay below this share of the gap between lines
+
+
+def pdf_hash(pdf, chunk_size=1 << 20):
+    """Returns the SHA-256 of a PDF file path or of the bytes of a PDF, the key of its calibration."""
+    if isinstance(pdf, bytes):
+        return hashlib.sha256(pdf).hexdigest()
+
+    digest = hashlib.sha256()
+    with open(pdf, "rb") as pdf_file:
+        for chunk in iter(lambda: pdf_file.read(chunk_size), b""):
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
+
+def page_text_metrics(page_img):
+    """
+    Measures the text of a page.
+
+    Args:
+        page_img (np.ndarray): BGR or grayscale page image.
+
+    Returns:
+        tuple: (text height, gap between lines) in pixels, or None if the page has too little text.
+    """
+    _, bw = otsu_binary(page_img)
+    ink = (bw > 0).astype(np.uint8)
+
+    _, stats = connected_component_stats(ink)
+    heights = stats[stats[:, 4] >= MIN_COMPONENT_AREA, 3]
+    if not len(heights):
+        return None
+
+    starts, ends = true_runs(ink.any(axis=1))
+    if len(starts) < 2:
+        return None
+
+    text_height = float(np.percentile(heights, TEXT_HEIGHT_PERCENTILE))
+    line_gap = float(np.median(starts[1:] - ends[:-1]))
+
+    return text_height, line_gap
+
+
+def kernel_sizes_for(text_height, line_gap, default_kernel_sizes=DEFAULT_KERNEL_SIZES,
+                     reference_text_height=REFERENCE_TEXT_HEIGHT):
+    """
+    Scales the default kernel sizes to the text height, keeping the vertical sizes below half the gap
+    between lines so neighbouring lines are not closed together.
+    """
+    if reference_text_height is None:
+        raise ValueError("REFERENCE_TEXT_HEIGHT is not measured, run scripts/stats/segmentation_benchmark.py")
+
+    scale = text_height / reference_text_height
+    max_height = max(1, int(line_gap * MAX_VERTICAL_KERNEL_GAP_RATIO))
+
+    return tuple((max(1, int(round(width * scale))), min(max_height, max(1, int(round(height * scale)))))
+                 for width, height in default_kernel_sizes)
+
+
+def calibrate_kernel_sizes(page_images, default_kernel_sizes=DEFAULT_KERNEL_SIZES,
+                           reference_text_height=REFERENCE_TEXT_HEIGHT):
+    """
+    Picks the kernel sizes of a book from some of its pages.
+
+    Args:
+        page_images (iterable): BGR page images, e.g. the calibration sample of the book.
+
+    Returns:
+        tuple: ((close width, close height), (open width, open height)), the defaults if no page
+               has enough text.
+    """
+    metrics = [m for m in (page_text_metrics(page_img) for page_img in page_images) if m is not None]
+
+    return calibrate_metrics(metrics, default_kernel_sizes, reference_text_height)
+
+
+def calibrate_metrics(metrics, default_kernel_sizes=DEFAULT_KERNEL_SIZES, reference_text_height=REFERENCE_TEXT_HEIGHT):
+    """Picks the kernel sizes of a book from the (text height, line gap) of some of its pages (see page_text_metrics)."""
+    if not metrics:
+        return default_kernel_sizes
+
+    text_height = float(np.median([text_height for text_height, _ in metrics]))
+    line_gap = float(np.median([line_gap for _, line_gap in metrics]))
+
+    return kernel_sizes_for(text_height, line_gap, default_kernel_sizes, reference_text_height)
+
+
+def calibration_sample(num_book_pages, num_pages=CALIBRATION_PAGES):
+    """
+    Returns the page numbers a book is calibrated on: num_pages pages evenly spread over the book, leaving
+    out the first and last pages (cover, title, index), so the sample does not depend on the pages processed.
+    """
+    if num_book_pages <= num_pages:
+        return list(range(1, num_book_pages + 1))
+
+    return sorted({int(round(page_number)) for page_number in np.linspace(1, num_book_pages, num_pages + 2)[1:-1]})
+
+
+def calibrate_book(pdf, num_pages=CALIBRATION_PAGES, reference_text_height=REFERENCE_TEXT_HEIGHT):
+    """
+    Renders the calibration sample of a book and picks its kernel sizes.
+
+    Returns:
+        tuple: (kernel sizes, number of sample pages with enough text).
+    """
+    sample = calibration_sample(get_pdf_page_count(pdf), num_pages)
+    metrics = [m for m in (page_text_metrics(page_img)
+                           for _, page_img in iter_pdf_pages(pdf, book_name="calibration", page_numbers=sample))
+               if m is not None]
+
+    return calibrate_metrics(metrics, reference_text_height=reference_text_height), len(metrics)
+
+
+@contextmanager
+def _file_lock(path):
+    """Holds an exclusive lock on path.lock, so the processes of the server update the file one at a time."""
+    if fcntl is None:
+        yield
+        return
+
+    with open(path + ".lock", "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class KernelCalibrationCache():
+    """
+    Kernel sizes of the calibrated books, keyed by the hash of their PDF and saved as JSON.
+
+    Several server processes can share the file: an entry is added by re-reading the file under a file
+    lock, merging the entry and replacing the file atomically, so entries of other processes are kept
+    and readers never see a partly written file.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries = None
+
+    def _read(self):
+        if not os.path.isfile(self.path):
+            return {}
+        try:
+            with open(self.path, encoding="utf-8") as cache_file:
+                return json.load(cache_file)
+        except (OSError, ValueError) as e:
+            print(f"Error reading the kernel calibration cache {self.path}: {e}")
+            return {}
+
+    def get(self, key):
+        with self._lock:
+            if self._entries is None or key not in self._entries:
+                self._entries = self._read()  # another process may have calibrated the book since
+            kernel_sizes = self._entries.get(key)
+        return tuple(tuple(size) for size in kernel_sizes) if kernel_sizes is not None else None
+
+    def set(self, key, kernel_sizes):
+        folder = os.path.dirname(self.path) or "."
+        os.makedirs(folder, exist_ok=True)
+
+        with self._lock, _file_lock(self.path):
+            entries = self._read()
+            entries[key] = [list(size) for size in kernel_sizes]
+
+            fd, temp_path = tempfile.mkstemp(dir=folder, prefix=".kernel_calibration_", suffix=".json")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as cache_file:
+                    json.dump(entries, cache_file, indent=2)
+                os.replace(temp_path, self.path)
+            except BaseException:
+                os.remove(temp_path)
+                raise
+
+            self._entries = entries
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_calibration_cache(path=DEFAULT_CACHE_PATH):
+    """Returns the process wide cache of the given file."""
+    with _caches_lock:
+        cache = _caches.get(path)
+        if cache is None:
+            cache = KernelCalibrationCache(path)
+            _caches[path] = cache
+    return cache
+
+
+def calibrated_pages(pdf, pages, num_pages=CALIBRATION_PAGES, cache=None,
+                     reference_text_height=REFERENCE_TEXT_HEIGHT):
+    """
+    Yields the pages of a book with the kernel sizes to find their lines with.
+
+    The kernel sizes are read from the cache. Otherwise they are calibrated on the calibration sample of
+    the book (calibration_sample) before the first page is yielded, and cached. The sample is rendered on
+    its own, so every page of a run gets the same kernel sizes, whichever pages are processed, and a run
+    without a cached calibration gives the same result as a run with one.
+
+    Args:
+        pdf (str or bytes): Path to the PDF or its bytes, its hash is the cache key.
+        pages (iterable): Pages of the book, e.g. from convert_to_pages.iter_pdf_pages_with_text.
+        num_pages (int): Pages the kernel sizes are calibrated on.
+        cache (KernelCalibrationCache): Cache of the calibrated books, get_calibration_cache() by default.
+        reference_text_height (float): Text height the default kernel sizes were tuned on.
+
+    Yields:
+        tuple: (kernel sizes, page) of every page.
+    """
+    cache = cache if cache is not None else get_calibration_cache()
+    key = pdf_hash(pdf)
+
+    kernel_sizes = cache.get(key)
+    if kernel_sizes is None:
+        kernel_sizes, num_calibrated_pages = calibrate_book(pdf, num_pages, reference_text_height)
+        print(f"Calibrated line kernel sizes {kernel_sizes} on {num_calibrated_pages} pages.")
+        if num_calibrated_pages:
+            cache.set(key, kernel_sizes)
+
+    for page in pages:
+        yield kernel_sizes, page
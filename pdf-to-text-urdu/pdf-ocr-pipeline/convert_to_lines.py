@@ -3,12 +3,14 @@
 """
 
 import os
+from concurrent.futures import ThreadPoolExecutor
 
 import cv2
 import numpy as np
 from PIL import Image
 
-from .image_utils import image_contours, image_contours_updated
+from .image_utils import image_contours, image_line_boxes, layout_regions, projection_line_boxes
+from .page_context import PageContext
 from .text_utils import validate_file_path
 
 
@@ -46,7 +48,13 @@ def page_to_lines_old(page_img):
     return line_imgs
 
 
-def page_to_lines_updated(page_img, filter_size = 3.0, kernel_sizes = ((200, 4), (8, 3))):
+MORPHOLOGY = "morphology"
+PROJECTION = "projection"
+SEGMENTATION_METHODS = (MORPHOLOGY, PROJECTION)
+
+
+def page_to_lines_updated(page_img, filter_size = 3.0, kernel_sizes = ((200, 4), (8, 3)), method = MORPHOLOGY,
+                          scale = 1.0, columns = False, workers = 1):
     """
         Extracts the lines from the page image based on the contours
         enhanced using morphological operations and
@@ -55,27 +63,85 @@ def page_to_lines_updated(page_img, filter_size = 3.0, kernel_sizes = ((200, 4),
 
         Args:
              img_or_pth (str or np.ndarray or PIL.Image): Path to the image file or image data.
+             method (str): MORPHOLOGY, or PROJECTION to find the lines from the horizontal projection
+                           profile of the page, falling back to morphology when the profile is ambiguous.
+             scale (float): Factor the page is downscaled by for the morphology, e.g. 0.25 for 600 DPI
+                            scans. The line crops are still cut from the full resolution page.
+             columns (bool): Split multi column pages at their gutters first (see layout_regions) and
+                             extract the lines of every column, the columns are read right to left.
+             workers (int): Threads segmenting the column regions at the same time.
 
         Returns:
-        list: A list of line images extracted from the page image.
+        list: A list of line images extracted from the page image, views of page_img rather than copies.
     """
 
-    line_imgs = [] # array to hold detected lines
+    # The page is not deskewed here, the lines are crops of page_img as before
+    boxes = _line_boxes(PageContext(page_img, deskew=False), filter_size, kernel_sizes, method, scale, columns, workers)
 
-    sorted_contours = image_contours_updated(page_img, kernel_sizes)
+    return [page_img[y:y + h, x:x + w] for x, y, w, h in boxes.tolist()]
 
-    # Iterate over each sorted contour and save line images
-    for contour in sorted_contours:
-        x, y, w, h = cv2.boundingRect(contour)
-        y_offset = 5
 
-        line_image = page_img[max(0, y - y_offset):y + h + y_offset, x:x + w]
+def page_to_line_views(page, filter_size = 3.0, kernel_sizes = ((200, 4), (8, 3)), method = MORPHOLOGY, scale = 1.0,
+                       columns = False, workers = 1):
+    """
+        Extracts the lines of a page like page_to_lines_updated, on the page images of a PageContext.
 
-        # Save line image if its height is sufficient
-        if line_image.shape[0] > 15:
-            line_imgs.append(line_image)
+        Args:
+             page (PageContext or np.ndarray): Page context, or a BGR page image that is deskewed first.
 
-    return line_imgs
+        Returns:
+        list: LineView of each line, with its box and views of the deskewed page and of its binary image.
+    """
+    context = page if isinstance(page, PageContext) else PageContext(page)
+
+    return context.line_views(_line_boxes(context, filter_size, kernel_sizes, method, scale, columns, workers))
+
+
+def _region_line_boxes(image, bw, filter_size, kernel_sizes, method, scale):
+    """Returns the (N, 4) int32 boxes of the lines of a single column region, from top to bottom."""
+    line_boxes = None
+    if method == PROJECTION:
+        line_boxes = projection_line_boxes(bw, filter_size)
+        if line_boxes is None:
+            print("Projection profile is ambiguous, segmenting the page with morphology.")
+
+    if line_boxes is None:
+        line_boxes = image_line_boxes(image, kernel_sizes, bw=bw, scale=scale)
+
+    return line_boxes
+
+
+def _line_boxes(context, filter_size, kernel_sizes, method, scale=1.0, columns=False, workers=1):
+    """Returns the (N, 4) int32 (x, y, w, h) boxes of the lines of the page in reading order."""
+    if method not in SEGMENTATION_METHODS:
+        raise ValueError(f"Unknown line segmentation method {method}, expected one of {SEGMENTATION_METHODS}")
+
+    page_height, page_width = context.image.shape[:2]
+    regions = layout_regions(context.bw) if columns else [(0, 0, page_width, page_height)]
+
+    def segment_region(region):
+        x, y, w, h = region
+        boxes = _region_line_boxes(context.image[y:y + h, x:x + w], context.bw[y:y + h, x:x + w], filter_size,
+                                   kernel_sizes, method, scale)
+        return boxes + np.array((x, y, 0, 0), dtype=np.int32)
+
+    if workers > 1 and len(regions) > 1:
+        # OpenCV releases the GIL, so the regions are segmented in parallel by threads
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            region_boxes = list(executor.map(segment_region, regions))
+    else:
+        region_boxes = [segment_region(region) for region in regions]
+
+    boxes = np.concatenate(region_boxes)
+    y_offset = 5
+
+    top = np.maximum(0, boxes[:, 1] - y_offset)
+    bottom = np.minimum(page_height, boxes[:, 1] + boxes[:, 3] + y_offset)
+
+    # Keep the lines whose height is sufficient
+    keep = bottom - top > 15
+
+    return np.column_stack((boxes[:, 0], top, boxes[:, 2], bottom - top))[keep]
 
 
 def text_to_lines(txt_or_path, save=False, file_name=None):
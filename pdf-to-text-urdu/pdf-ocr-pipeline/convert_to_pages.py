@@ -1,68 +1,302 @@
 import cv2
 import numpy as np
 import os
-import sys
-from pdf2image import convert_from_path, convert_from_bytes
+import re
+import tempfile
+from contextlib import contextmanager
+from pdf2image import convert_from_path, pdfinfo_from_bytes, pdfinfo_from_path
 
-from .image_utils import is_image_completely_blank
+from .image_utils import is_image_completely_blank, is_non_text_thumbnail
+from .text_layer import iter_text_layer
 
+# Pages rasterised by a single pdftoppm call, only one chunk of pages is held in memory at once
+DEFAULT_PAGE_CHUNK_SIZE = 8
 
-def pdf_to_pages(pdf_data, save=False, book_name=""):
+# Thumbnails used to find the pages not worth rendering at full resolution
+THUMBNAIL_DPI = 36
+THUMBNAIL_CHUNK_SIZE = 64
+
+_PAGE_NAME_PATTERN = re.compile(r"_pg(\d+)\.jpg$")
+
+
+def get_pdf_page_count(pdf):
+    """Returns the number of pages of the PDF file or of its binary data, blank pages included."""
+    if isinstance(pdf, bytes):
+        return pdfinfo_from_bytes(pdf)["Pages"]
+    return pdfinfo_from_path(pdf)["Pages"]
+
+
+@contextmanager
+def _pdf_file(pdf):
+    """Yields a path to the PDF, binary data is written to a temporary file once instead of for every chunk."""
+    if not isinstance(pdf, bytes):
+        yield pdf
+        return
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        pdf_path = os.path.join(temp_dir, "document.pdf")
+        with open(pdf_path, "wb") as pdf_file:
+            pdf_file.write(pdf)
+        yield pdf_path
+
+
+def page_file_name(book_name, page_number):
+    """Returns the image filename of a page, e.g. <book_name>_pg12.jpg."""
+    return f"{book_name}_pg{page_number}.jpg"
+
+
+def page_number_of(page_name):
+    """Returns the PDF page number, starting at 1, of a page filename yielded by iter_pdf_pages."""
+    return int(_PAGE_NAME_PATTERN.search(page_name).group(1))
+
+
+def _selected_pages(page_numbers, total_pages):
+    """Returns the ascending page numbers to read, every page of the PDF if page_numbers is None."""
+    if page_numbers is None:
+        return list(range(1, total_pages + 1))
+
+    return sorted(page_number for page_number in set(page_numbers) if 1 <= page_number <= total_pages)
+
+
+def _page_ranges(page_numbers, chunk_size):
+    """Splits ascending page numbers into ranges of consecutive pages of at most chunk_size pages."""
+    ranges = []
+    for page_number in page_numbers:
+        if ranges and page_number == ranges[-1][1] + 1 and ranges[-1][1] - ranges[-1][0] + 1 < chunk_size:
+            ranges[-1][1] = page_number
+        else:
+            ranges.append([page_number, page_number])
+
+    return ranges
+
+
+def screen_pages(pdf_path, page_numbers, thread_count=1, dpi=THUMBNAIL_DPI):
     """
-    Convert each page of a PDF (from binary data) to an OpenCV image.
+    Renders low resolution thumbnails of the pages and finds the blank, near blank and figure only
+    pages, which would yield no text after full resolution rendering and segmentation.
 
     Args:
-        pdf_data (bytes): Binary data of the PDF file.
-        save (bool): Whether to save the extracted page images to individual files.
-        book_name (str): Optional name for the book if saving is enabled.
+        pdf_path (str): Path to the PDF file.
+        page_numbers (list): Ascending page numbers to screen, starting at 1.
+        thread_count (int): Number of pdftoppm processes rendering the thumbnails at once.
+        dpi (int): Resolution of the thumbnails.
 
     Returns:
-        dict: A dictionary where the key is the image filename and the value is the OpenCV image.
+        set: Page numbers of the pages without text.
     """
-    useful_images = {}
+    skipped_pages = set()
 
-    if not book_name:
-        book_name = "extracted_pdf"  # Default name if not provided
+    for first_page, last_page in _page_ranges(page_numbers, THUMBNAIL_CHUNK_SIZE):
+        try:
+            thumbnails = convert_from_path(pdf_path, dpi=dpi, grayscale=True, first_page=first_page,
+                                           last_page=last_page, thread_count=thread_count)
+        except Exception as e:
+            print(f"Error rendering thumbnails of pages {first_page}-{last_page}: {e}")
+            continue
 
-    print(f"Extracting Pages from: {book_name}.pdf")
+        for page_number, thumbnail in enumerate(thumbnails, start=first_page):
+            if is_non_text_thumbnail(np.array(thumbnail)):
+                skipped_pages.add(page_number)
+
+    return skipped_pages
 
+
+def _prescreened(pdf_path, page_numbers, thread_count):
+    """Returns the page numbers left after screening their thumbnails."""
+    skipped_pages = screen_pages(pdf_path, page_numbers, thread_count=thread_count)
+    if skipped_pages:
+        print(f"Skipping {len(skipped_pages)} blank or figure only pages: {sorted(skipped_pages)}")
+
+    return [page_number for page_number in page_numbers if page_number not in skipped_pages]
+
+
+def _render_pages(pdf_path, book_name, page_numbers, total_pages, chunk_size, thread_count, save, prescreen=False):
+    """
+    Rasterises the given pages, yields (page number, image filename, OpenCV image) of the pages that are not blank.
+    With prescreen the thumbnails of every chunk are screened just before the chunk is rendered, so the first
+    page is not delayed by the screening of the whole PDF.
+    """
     if save:
         output_dir = os.path.join("output/book_pages/images", book_name)
         os.makedirs(output_dir, exist_ok=True)
 
-    # Convert PDF pages to images from binary data.
-    try:
-        images = convert_from_bytes(pdf_data)
-    except Exception as e:
-        print(f"Error converting PDF to images: {e}")
-        return {}
+    chunk_size = max(chunk_size, thread_count)  # every process renders at least one page
+    for first_chunk_page, last_chunk_page in _page_ranges(page_numbers, chunk_size):
+        chunk_pages = list(range(first_chunk_page, last_chunk_page + 1))
+        if prescreen:
+            chunk_pages = _prescreened(pdf_path, chunk_pages, thread_count)
 
-    total_pages = len(images)
+        for first_page, last_page, images in _render_chunk(pdf_path, chunk_pages, chunk_size, thread_count):
+            for index in range(len(images)):
+                page_number = first_page + index
+                image, images[index] = images[index], None  # the page is freed once it is consumed
+                print(f"\rProcessing page {page_number}/{total_pages}")
 
-    for index, image in enumerate(images):
-        page_number = index + 1
-        sys.stdout.write(f"\rProcessing page {page_number}/{total_pages}")
-        sys.stdout.flush()
-        print(f"\rProcessing page {page_number}/{total_pages}")
+                try:
+                    if is_image_completely_blank(image):
+                        print(f"\nPage {page_number} is completely blank. Skipping.")
+                        continue
 
+                    open_cv_image = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
+                    page_name = page_file_name(book_name, page_number)
+
+                    if save:
+                        image_save_path = os.path.join(output_dir, page_name)
+                        cv2.imwrite(image_save_path, open_cv_image)
+                        print(f"Saved image: {image_save_path}")
+
+                except Exception as e:
+                    print(f"\nError processing page {page_number}: {e}")
+                    continue
+
+                del image
+                yield page_number, page_name, open_cv_image
+
+
+def _render_chunk(pdf_path, page_numbers, chunk_size, thread_count):
+    """Yields (first page, last page, PIL images) of the ranges of consecutive pages of a chunk."""
+    for first_page, last_page in _page_ranges(page_numbers, chunk_size):
         try:
-            if is_image_completely_blank(image):
-                print(f"\nPage {page_number} is completely blank. Skipping.")
-                continue
+            images = convert_from_path(pdf_path, first_page=first_page, last_page=last_page,
+                                       thread_count=thread_count)
+        except Exception as e:
+            print(f"Error converting pages {first_page}-{last_page} to images: {e}")
+            continue
 
-            open_cv_image = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
-            page_name = f"{book_name}_pg{page_number}.jpg"
-            useful_images[page_name] = open_cv_image
+        yield first_page, last_page, images
 
-            if save:
-                image_save_path = os.path.join(output_dir, page_name)
-                cv2.imwrite(image_save_path, open_cv_image)
-                print(f"Saved image: {image_save_path}")
 
+def iter_pdf_pages(pdf, save=False, book_name="", chunk_size=DEFAULT_PAGE_CHUNK_SIZE, thread_count=1,
+                   prescreen=False, page_numbers=None):
+    """
+    Lazily convert each page of a PDF to an OpenCV image. Pages are rasterised chunk_size at a time,
+    so the memory used does not grow with the number of pages.
+
+    With thread_count > 1 every chunk is split into page ranges rendered by that many pdftoppm
+    processes at once, the pages are still yielded in page order.
+
+    Args:
+        pdf (bytes or str): Binary data of the PDF file, or the path to it.
+        save (bool): Whether to save the extracted page images to individual files.
+        book_name (str): Optional name for the book if saving is enabled.
+        chunk_size (int): Number of pages rasterised together, at least thread_count.
+        thread_count (int): Number of pdftoppm processes rendering a chunk, e.g. os.cpu_count().
+        prescreen (bool): Whether to skip the blank, near blank and figure only pages found on low
+                          resolution thumbnails before rendering at full resolution.
+        page_numbers (iterable): Page numbers to render, starting at 1, every page if None. Only
+                                 these pages are rasterised, e.g. the pages left of a resumed job.
+
+    Yields:
+        tuple: (image filename, OpenCV image) of each page that is not blank, in page order.
+    """
+    if not book_name:
+        book_name = "extracted_pdf"  # Default name if not provided
+
+    print(f"Extracting Pages from: {book_name}.pdf")
+
+    with _pdf_file(pdf) as pdf_path:
+        try:
+            total_pages = get_pdf_page_count(pdf_path)
         except Exception as e:
-            print(f"\nError processing page {page_number}: {e}")
+            print(f"Error converting PDF to images: {e}")
+            return
 
-    return useful_images
+        page_numbers = _selected_pages(page_numbers, total_pages)
+        for _, page_name, page_image in _render_pages(pdf_path, book_name, page_numbers, total_pages, chunk_size,
+                                                      thread_count, save, prescreen=prescreen):
+            yield page_name, page_image
+
+
+def iter_pdf_pages_with_text(pdf, save=False, book_name="", chunk_size=DEFAULT_PAGE_CHUNK_SIZE, thread_count=1,
+                             use_text_layer=True, prescreen=False, page_numbers=None):
+    """
+    Like iter_pdf_pages, but pages of born-digital PDFs with a usable Urdu text layer are read
+    with pdfplumber instead of being rasterised, only scanned or garbled pages are rendered for OCR.
+
+    Args:
+        pdf (bytes or str): Binary data of the PDF file, or the path to it.
+        save (bool): Whether to save the rasterised page images to individual files.
+        book_name (str): Optional name for the book if saving is enabled.
+        chunk_size (int): Number of pages rasterised together, at least thread_count.
+        thread_count (int): Number of pdftoppm processes rendering a chunk.
+        use_text_layer (bool): Whether to read the text layer, if False every page is rasterised.
+        prescreen (bool): Whether to skip the pages without text found on low resolution thumbnails.
+        page_numbers (iterable): Page numbers to read, starting at 1, every page if None. The other
+                                 pages are neither rasterised nor read from the text layer.
+
+    Yields:
+        tuple: (page filename, OpenCV image, text lines) of each page in page order. Pages read from
+               the text layer have no image, rasterised pages have no text lines.
+    """
+    if not book_name:
+        book_name = "extracted_pdf"  # Default name if not provided
+
+    print(f"Extracting Pages from: {book_name}.pdf")
+
+    with _pdf_file(pdf) as pdf_path:
+        try:
+            total_pages = get_pdf_page_count(pdf_path)
+        except Exception as e:
+            print(f"Error converting PDF to images: {e}")
+            return
+
+        page_numbers = _selected_pages(page_numbers, total_pages)
+        if not use_text_layer:
+            for _, page_name, page_image in _render_pages(pdf_path, book_name, page_numbers, total_pages,
+                                                          chunk_size, thread_count, save, prescreen=prescreen):
+                yield page_name, page_image, None
+            return
+
+        # Pages are classified as the iteration reaches them, runs of scanned pages are rendered a chunk at a time
+        scanned_pages = []
+        last_page = num_text_pages = 0
+        text_layer = iter_text_layer(pdf_path, page_numbers=page_numbers)
+        try:
+            for last_page, text_lines in text_layer:
+                if text_lines is None:
+                    scanned_pages.append(last_page)
+                    if len(scanned_pages) < max(chunk_size, thread_count):
+                        continue
+
+                for _, page_name, page_image in _render_pages(pdf_path, book_name, scanned_pages, total_pages,
+                                                              chunk_size, thread_count, save, prescreen=prescreen):
+                    yield page_name, page_image, None
+                scanned_pages = []
+
+                if text_lines is not None:
+                    num_text_pages += 1
+                    yield page_file_name(book_name, last_page), None, text_lines
+        finally:
+            text_layer.close()
+
+        # Pages the text layer was not read for, e.g. when pdfplumber could not open the PDF, are rasterised
+        scanned_pages.extend(page_number for page_number in page_numbers if page_number > last_page)
+        for _, page_name, page_image in _render_pages(pdf_path, book_name, scanned_pages, total_pages, chunk_size,
+                                                      thread_count, save, prescreen=prescreen):
+            yield page_name, page_image, None
+
+        if num_text_pages:
+            print(f"Read {num_text_pages}/{total_pages} pages from the text layer.")
+
+
+def pdf_to_pages(pdf_data, save=False, book_name="", thread_count=1, prescreen=False):
+    """
+    Convert each page of a PDF (from binary data) to an OpenCV image.
+
+    All pages are kept in memory, use iter_pdf_pages to process large PDFs one page at a time.
+
+    Args:
+        pdf_data (bytes): Binary data of the PDF file.
+        save (bool): Whether to save the extracted page images to individual files.
+        book_name (str): Optional name for the book if saving is enabled.
+        thread_count (int): Number of pdftoppm processes rendering the pages at once.
+        prescreen (bool): Whether to skip the pages without text found on low resolution thumbnails.
+
+    Returns:
+        dict: A dictionary where the key is the image filename and the value is the OpenCV image.
+    """
+    return dict(iter_pdf_pages(pdf_data, save=save, book_name=book_name, thread_count=thread_count,
+                               prescreen=prescreen))
 
 if __name__ == "__main__":
     pass
@@ -0,0 +1,191 @@
+"""
+    Exports a trained recognition model for serving.
+
+    The checkpoint of the model config is restored and exported as
+        - frozen: an inference only graph, from the input placeholder to the decoded
+          output, which models.inference_model.InferenceModel loads without building
+          the training graph. Set "inference_graph" in the model config to serve it.
+        - onnx: the CNN, BiLSTM and dense logits converted with tf2onnx, which
+          models.onnx_model.OnnxModel runs on onnxruntime and decodes with NumPy.
+          Set "backend" to "onnx" and "onnx_model" in the model config to serve it.
+
+    With --verify the exported model and the checkpoint recognise the line images of
+    a fixture folder, fixtures/lines by default, and the lines they decode differently
+    are reported. The export then fails on any mismatch.
+
+    Run from the folder containing pdf_ocr_pipeline:
+        python -m pdf_ocr_pipeline.export_model pdf_ocr_pipeline/configs/CNN_RNN_CTC/MMA-UD.json \
+            [--format onnx] [--output model.onnx] [--verify [<line_images_dir>]]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import cv2
+
+from .run_model import TENSORFLOW, create_and_run_model
+
+FROZEN = "frozen"
+ONNX = "onnx"
+EXPORT_FORMATS = (FROZEN, ONNX)
+ONNX_OPSET = 11
+FIXTURE_LINES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "lines")
+
+
+def export_inference_graph(model_config_path, output_path=None):
+    """
+    Freezes the restored model of a config into an inference graph.
+
+    Args:
+        model_config_path (str): Path to the model JSON config.
+        output_path (str): Path of the frozen graph, the "inference_graph" of the config or
+                           frozen_inference_graph.pb next to the checkpoint by default.
+
+    Returns:
+        str: Path of the frozen graph.
+    """
+    from .models.inference_model import default_inference_graph_path, freeze_inference_graph
+
+    tic = time.time()
+    model, config = create_and_run_model(model_config_path, use_inference_graph=False, backend=TENSORFLOW)
+    output_path = output_path or getattr(config, "inference_graph", None) or default_inference_graph_path(config)
+
+    num_nodes = freeze_inference_graph(model, output_path)
+    model.close()
+
+    print(f"Saved the inference graph ({num_nodes} nodes) to {output_path} in {time.time() - tic:.1f} secs.")
+    return output_path
+
+
+def export_onnx(model_config_path, output_path=None, opset=ONNX_OPSET):
+    """
+    Converts the restored model of a config to ONNX, from the line images to the logits. Decoding stays
+    out of the model, OnnxModel decodes the logits with NumPy.
+
+    Args:
+        model_config_path (str): Path to the model JSON config.
+        output_path (str): Path of the ONNX model, the "onnx_model" of the config or model.onnx next to
+                           the checkpoint by default.
+        opset (int): ONNX opset the model is converted to.
+
+    Returns:
+        str: Path of the ONNX model.
+    """
+    import tf2onnx
+
+    from .models.inference_model import LOGITS_NODES, freeze_logits_graph
+    from .models.onnx_model import ONNX_INPUT, ONNX_SEQ_LEN_INPUT
+
+    tic = time.time()
+    model, config = create_and_run_model(model_config_path, use_inference_graph=False, backend=TENSORFLOW)
+    output_path = output_path or getattr(config, "onnx_model", None) or \
+        os.path.join(config.save_dir, config.model, "model.onnx")
+
+    graph_def = freeze_logits_graph(model)
+    model.close()
+
+    node_names = {node.name for node in graph_def.node}
+    input_names = [name for name in (ONNX_INPUT, ONNX_SEQ_LEN_INPUT) if name.split(":")[0] in node_names]
+
+    folder = os.path.dirname(output_path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    tf2onnx.convert.from_graph_def(graph_def, input_names=input_names,
+                                   output_names=[name + ":0" for name in LOGITS_NODES], opset=opset,
+                                   output_path=output_path)
+
+    print(f"Saved the ONNX model to {output_path} in {time.time() - tic:.1f} secs.")
+    return output_path
+
+
+def load_line_images(images_dir, max_lines=None):
+    """Returns the names and images of the line images of a folder, in name order."""
+    names, images = [], []
+    for file_name in sorted(os.listdir(images_dir)):
+        if not file_name.lower().endswith((".jpg", ".jpeg", ".png")):
+            continue
+
+        image = cv2.imread(os.path.join(images_dir, file_name))
+        if image is None:
+            print(f"Error reading image {file_name}. Skipping.")
+            continue
+
+        names.append(file_name)
+        images.append(image)
+        if max_lines is not None and len(images) >= max_lines:
+            break
+
+    return names, images
+
+
+def compare_backends(reference, candidate, images, max_batch=32):
+    """
+    Recognises the same line images with two models.
+
+    Returns:
+        list: Indices of the images whose decoded label ids differ.
+    """
+    reference_out, _ = reference.predict_batch(images, max_batch=max_batch)
+    candidate_out, _ = candidate.predict_batch(images, max_batch=max_batch)
+
+    return [index for index, (expected, actual) in enumerate(zip(reference_out, candidate_out))
+            if list(expected) != list(actual)]
+
+
+def verify_export(model_config_path, export_format, output_path, images_dir=FIXTURE_LINES_DIR, max_lines=None):
+    """
+    Checks that an exported model decodes the fixture line images like the checkpoint.
+
+    Returns:
+        bool: Whether every line is decoded the same, False if there are no line images.
+    """
+    from .utils.config_utils import get_config
+
+    names, images = load_line_images(images_dir, max_lines)
+    if not images:
+        print(f"No fixture line images in {images_dir}")
+        return False
+
+    config = get_config(model_config_path)
+    reference, _ = create_and_run_model(model_config_path, use_inference_graph=False, backend=TENSORFLOW)
+
+    if export_format == ONNX:
+        from .models.onnx_model import OnnxModel
+        candidate = OnnxModel(config, output_path)
+    else:
+        from .models.inference_model import InferenceModel
+        candidate = InferenceModel(config, output_path)
+
+    mismatches = compare_backends(reference, candidate, images)
+    reference.close()
+    candidate.close()
+
+    for index in mismatches:
+        print(f"  {names[index]} is decoded differently")
+    print(f"{len(images) - len(mismatches)} of {len(images)} fixture lines decoded the same by the {export_format} "
+          f"model and the checkpoint.")
+
+    return not mismatches
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export a trained recognition model for inference.")
+    parser.add_argument("model_config", help="path to the model JSON config")
+    parser.add_argument("--format", choices=EXPORT_FORMATS, default=FROZEN, help="export format")
+    parser.add_argument("--output", help="path of the exported model")
+    parser.add_argument("--opset", type=int, default=ONNX_OPSET, help="ONNX opset")
+    parser.add_argument("--verify", nargs="?", const=FIXTURE_LINES_DIR,
+                        help="folder of fixture line images decoded by both models after exporting, "
+                             "fixtures/lines if no folder is given")
+    parser.add_argument("--max-lines", type=int, help="fixture line images verified")
+    args = parser.parse_args()
+
+    if args.format == ONNX:
+        path = export_onnx(args.model_config, args.output, opset=args.opset)
+    else:
+        path = export_inference_graph(args.model_config, args.output)
+
+    if args.verify and not verify_export(args.model_config, args.format, path, args.verify, args.max_lines):
+        sys.exit(1)
@@ -72,6 +72,145 @@ def is_image_completely_blank(image):
     return extrema == (255, 255)
 
 
+# Pre-screening of low resolution page thumbnails, fractions are relative to the thumbnail size
+THUMBNAIL_MARGIN = 0.05  # border ignored, scanner edges and shadows
+MAX_INK_GRAY = 160  # darkest gray treated as paper, keeps Otsu from splitting paper noise on blank pages
+MIN_INK_DENSITY = 0.001  # below this a page is blank or only has a page number, one short line is more
+MAX_TEXT_LINE_HEIGHT = 0.06  # taller bands of inked rows are figures rather than text lines
+MIN_TEXT_LINES = 2  # pages with fewer text line bands (page number, one line caption), mostly figure ink, are skipped
+MAX_FIGURE_INK_SHARE = 0.8
+MIN_RULE_HEIGHT = 0.25  # thin ink running down this much of the page is a column rule or gutter shadow, not text
+MAX_RULE_WIDTH = 0.06
+ROW_GAP_INK = 0.2  # rows with less ink than this share of a typical text row separate bands
+TEXT_ROW_CONTRAST = 0.5  # tall bands whose rows alternate between this much and less ink are touching text lines
+
+
+def true_runs(mask):
+    """
+    Returns:
+        tuple: Start and end (exclusive) indices of the runs of consecutive True values of a 1D mask.
+    """
+    padded = np.concatenate(([0], np.asarray(mask).astype(np.int8), [0]))
+    edges = np.flatnonzero(np.diff(padded))
+
+    return edges[::2], edges[1::2]
+
+
+def vertical_rules(ink, min_height=MIN_RULE_HEIGHT, max_width=MAX_RULE_WIDTH):
+    """
+    Finds the thin vertical runs of ink of a binary page, e.g. column rules and gutter shadows.
+
+    Args:
+        ink (np.ndarray): Boolean ink mask.
+        min_height (float): Shortest run, relative to the height of the page.
+        max_width (float): Widest run, relative to the width of the page, wider runs are figures.
+
+    Returns:
+        np.ndarray: Boolean mask of the ink of the rules.
+    """
+    height, width = ink.shape
+    ink = ink.astype(np.uint8)
+
+    vertical_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (1, max(2, int(height * min_height))))
+    vertical = cv2.morphologyEx(ink, cv2.MORPH_OPEN, vertical_kernel)
+
+    wide_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (max(2, int(width * max_width)), 1))
+    wide = cv2.morphologyEx(vertical, cv2.MORPH_OPEN, wide_kernel)
+
+    return (vertical > 0) & (wide == 0)
+
+
+def band_text_lines(row_ink, max_line_height, min_contrast=TEXT_ROW_CONTRAST):
+    """
+    Counts the text lines of a tall band of inked rows, e.g. nastaliq lines touching through their
+    ascenders and descenders. The rows of text lines alternate between dense line cores and sparse
+    gaps, the rows of a figure have a flat profile.
+
+    Args:
+        row_ink (np.ndarray): Ink of every row of the band.
+        max_line_height (int): Tallest line core.
+        min_contrast (float): Smallest (dense - sparse) / dense row ink of text lines.
+
+    Returns:
+        int: Number of line cores, 0 if the band is a figure.
+    """
+    sparse, dense = np.percentile(row_ink, [10, 90])
+    if dense == 0 or (dense - sparse) / dense < min_contrast:
+        return 0
+
+    starts, ends = true_runs(row_ink > (sparse + dense) / 2)
+    if len(starts) < 2 or (ends - starts).max() > max_line_height:
+        return 0
+
+    return len(starts)
+
+
+def thumbnail_text_stats(thumbnail):
+    """
+    Measures how much ink and how many text line like bands a page thumbnail has.
+
+    Column rules and gutter shadows are removed first, as they ink every row. The rows of the page
+    are then grouped into bands of consecutive rows with ink, rows with much less ink than a text
+    row separate the bands. Text lines are short bands, or tall bands of touching lines whose rows
+    alternate between dense and sparse (see band_text_lines), the other tall bands are figures.
+
+    Args:
+        thumbnail (np.ndarray): Grayscale or BGR page thumbnail, e.g. rendered at 36 DPI.
+
+    Returns:
+        tuple: (ink density, number of text line bands, share of the ink in figure bands)
+    """
+    gray = cv2.cvtColor(thumbnail, cv2.COLOR_BGR2GRAY) if thumbnail.ndim == 3 else thumbnail
+
+    height, width = gray.shape
+    margin_y, margin_x = int(height * THUMBNAIL_MARGIN), int(width * THUMBNAIL_MARGIN)
+    gray = gray[margin_y:height - margin_y, margin_x:width - margin_x]
+    if gray.size == 0:
+        return 0.0, 0, 0.0
+
+    otsu_thresh, _ = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    ink = gray <= min(otsu_thresh, MAX_INK_GRAY)
+    ink &= ~vertical_rules(ink)
+
+    ink_density = ink.mean()
+    row_ink = ink.sum(axis=1)
+    if row_ink.sum() == 0:
+        return 0.0, 0, 0.0
+
+    # Bands of consecutive rows with ink, sparse rows between text lines are gaps
+    in_band = row_ink > ROW_GAP_INK * np.percentile(row_ink[row_ink > 0], 75)
+    starts, ends = true_runs(in_band)
+    band_row_ink = np.where(in_band, row_ink, 0)
+
+    max_line_height = max(2, int(gray.shape[0] * MAX_TEXT_LINE_HEIGHT))
+    band_lines = np.array([1 if end - start <= max_line_height else
+                           band_text_lines(row_ink[start:end], max_line_height) for start, end in zip(starts, ends)])
+    band_ink = np.add.reduceat(band_row_ink, starts)
+    figure_ink_share = band_ink[band_lines == 0].sum() / band_row_ink.sum()
+
+    return float(ink_density), int(band_lines.sum()), float(figure_ink_share)
+
+
+def is_non_text_thumbnail(thumbnail, min_ink_density=MIN_INK_DENSITY, min_text_lines=MIN_TEXT_LINES,
+                          max_figure_ink_share=MAX_FIGURE_INK_SHARE):
+    """
+    Returns True if a page thumbnail is blank, near blank or a figure without text, so the page does
+    not need rendering at full resolution.
+
+    A figure page is skipped with at most min_text_lines - 1 text line bands, so the line of a one
+    line caption is lost, a caption of two or more lines keeps the page. Only dense figures (photos,
+    shaded drawings) are told apart from text: the thin strokes of line drawings split into short
+    bands that count as text lines, so those pages are kept. scripts/stats/check_prescreen.py checks
+    these cases on synthetic thumbnails.
+    """
+    ink_density, text_lines, figure_ink_share = thumbnail_text_stats(thumbnail)
+
+    if ink_density < min_ink_density:
+        return True
+
+    return text_lines < min_text_lines and figure_ink_share > max_figure_ink_share
+
+
 def image_contours(image):
     """
     Extract text contours from image using OpenCV.
@@ -155,21 +294,16 @@ def image_contours_with_saving(image_path, output_dir):
     # return sorted_contours
 
 
-def process_image_morphology(page_img, kernel_sizes):
+def otsu_binary(page_img):
     """
-    Applies morphological operations (closing and opening) to the given image.
+    Binarizes a page for line finding.
 
     Args:
-        page_img (np.ndarray): The input image (as a NumPy array).
-        kernel_sizes (tuple): Tuple containing kernel sizes for closing and opening operations.
+        page_img (np.ndarray): BGR or grayscale page image.
 
     Returns:
-        tuple: A tuple containing the grayscale image, binary image, morphologically closed image,
-               and morphologically opened image.
+        tuple: The grayscale image and its blurred, inverted Otsu binary image (ink is 255).
     """
-
-    # Convert to grayscale
-    # Assuming page_img is your input image
     if len(page_img.shape) == 3 and page_img.shape[2] == 3:  # Check if the image is color (BGR)
         # Convert to grayscale
         gray = cv2.cvtColor(page_img, cv2.COLOR_BGR2GRAY)
@@ -182,6 +316,28 @@ def process_image_morphology(page_img, kernel_sizes):
     # Binarize the image (using Otsu's threshold, inverted binary)
     bw = cv2.threshold(blur, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)[1]
 
+    return gray, bw
+
+
+def process_image_morphology(page_img, kernel_sizes, bw=None):
+    """
+    Applies morphological operations (closing and opening) to the given image.
+
+    Args:
+        page_img (np.ndarray): The input image (as a NumPy array).
+        kernel_sizes (tuple): Tuple containing kernel sizes for closing and opening operations.
+        bw (np.ndarray): Otsu binary image of the page if it is already computed (see otsu_binary
+                         and PageContext), the grayscale image is then returned as None.
+
+    Returns:
+        tuple: A tuple containing the grayscale image, binary image, morphologically closed image,
+               and morphologically opened image.
+    """
+    if bw is None:
+        gray, bw = otsu_binary(page_img)
+    else:
+        gray = None
+
     kernel_size_close = kernel_sizes[0]  # kernel size for closing
     kernel_size_open = kernel_sizes[1]  # kernel size for opening
 
@@ -196,29 +352,281 @@ def process_image_morphology(page_img, kernel_sizes):
     return gray, bw, bw_closed, bw_separated
 
 
-def image_contours_updated(page_img, kernel_sizes):
+def contour_boxes(contours):
+    """Returns the (x, y, w, h) bounding boxes of the contours as an (N, 4) int32 array."""
+    if not len(contours):
+        return np.empty((0, 4), dtype=np.int32)
+
+    return np.array([cv2.boundingRect(contour) for contour in contours], dtype=np.int32)
+
+
+def filter_sort_boxes(boxes, filter_size=3.0):
+    """Returns the indices of the boxes with a width to height ratio of at least filter_size, sorted by y-coordinate."""
+    keep = np.flatnonzero(boxes[:, 2] / boxes[:, 3] >= filter_size)
+
+    return keep[np.argsort(boxes[keep, 1], kind="stable")]
+
+
+def _line_contours(page_img, kernel_sizes, bw=None):
+    """Returns the sorted line contours of image_contours_updated and their boxes, measured once per contour."""
+    _, _, _, bw_separated = process_image_morphology(page_img, kernel_sizes, bw=bw)
+
+    # Find contours in the separated image
+    contours, _ = cv2.findContours(bw_separated, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+    # Filter contours based on width-to-height ratio and sort them by y-coordinate
+    boxes = contour_boxes(contours)
+    order = filter_sort_boxes(boxes, 3.0)
+
+    return [contours[index] for index in order], boxes[order]
+
+
+def image_contours_updated(page_img, kernel_sizes, bw=None):
     """
     Finds and returns sorted contours from the processed image.
 
     Args:
         page_img (np.ndarray): Input image as a NumPy array.
         kernel_sizes (tuple): Tuple containing kernel sizes for morphological operations.
+        bw (np.ndarray): Otsu binary image of the page if it is already computed.
 
     Returns:
         list: Sorted contours based on width-to-height ratio and y-coordinate.
     """
-    _, _, _, bw_separated = process_image_morphology(page_img, kernel_sizes)
+    contours, _ = _line_contours(page_img, kernel_sizes, bw=bw)
 
-    # Find contours in the separated image
-    contours, _ = cv2.findContours(bw_separated, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    return contours
 
-    # Filter contours based on width-to-height ratio
-    filtered_contours = [cnt for cnt in contours if (cv2.boundingRect(cnt)[2] / cv2.boundingRect(cnt)[3]) >= 3.0]
 
-    # Sort contours by y-coordinate
-    sorted_contours = sorted(filtered_contours, key=lambda contour: cv2.boundingRect(contour)[1])
+def image_line_boxes(page_img, kernel_sizes, bw=None, scale=1.0):
+    """
+    Finds the (x, y, w, h) boxes of the lines of a page like image_contours_updated, optionally on a
+    downscaled page.
 
-    return sorted_contours
+    The closing kernel spans hundreds of pixels at scan resolution and dominates the cost of the
+    morphology. With scale < 1 the binary page is downscaled, the morphology runs with kernels scaled
+    by the same factor and the boxes found are projected back to the full resolution page. On 300 DPI
+    and larger pages a scale of 0.5 keeps the boxes within a few pixels of the full resolution ones.
+
+    Args:
+        page_img (np.ndarray): Input image as a NumPy array.
+        kernel_sizes (tuple): Kernel sizes for the closing and opening at full resolution.
+        bw (np.ndarray): Otsu binary image of the page if it is already computed.
+        scale (float): Factor the page is downscaled by for the morphology, 1 keeps the full resolution.
+
+    Returns:
+        np.ndarray: (N, 4) int32 boxes of the lines on the full resolution page, sorted by y-coordinate.
+    """
+    if scale >= 1.0:
+        return _line_contours(page_img, kernel_sizes, bw=bw)[1]
+
+    if bw is None:
+        _, bw = otsu_binary(page_img)
+
+    height, width = bw.shape[:2]
+    small = cv2.resize(bw, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    small = cv2.threshold(small, 127, 255, cv2.THRESH_BINARY)[1]
+    small_kernel_sizes = tuple(tuple(max(1, int(round(size * scale))) for size in kernel_size)
+                               for kernel_size in kernel_sizes)
+
+    # Scale factors of the resized page, which cv2.resize rounds to whole pixels
+    scale_x, scale_y = small.shape[1] / width, small.shape[0] / height
+
+    x, y, w, h = _line_contours(small, small_kernel_sizes, bw=small)[1].T
+    left, top = np.floor(x / scale_x), np.floor(y / scale_y)
+    right = np.minimum(width, np.ceil((x + w) / scale_x))
+    bottom = np.minimum(height, np.ceil((y + h) / scale_y))
+
+    return np.column_stack((left, top, right - left, bottom - top)).astype(np.int32)
+
+
+PROFILE_SMOOTHING = 5  # rows the horizontal projection profile is averaged over
+VALLEY_RATIO = 0.05  # rows with less ink than this share of a text row are gaps between lines
+MIN_LINE_HEIGHT_RATIO = 0.4  # shorter bands (detached dots and marks) are merged into the nearest line
+MAX_LINE_HEIGHT_RATIO = 2.0  # taller bands are touching or skewed lines, the profile is ambiguous
+MIN_GUTTER_WIDTH = 0.03  # share of the page width of a white column gap that makes the page multi column
+MAX_LINE_TILT = 0.25  # rise of the ink between the two ends of a line, relative to its height, above which it is skewed
+
+
+def projection_line_boxes(bw, filter_size=3.0):
+    """
+    Finds the lines of a single column page from the horizontal projection profile of its ink.
+
+    The ink of every row is counted and smoothed, lines are the bands of rows between the valleys
+    of the profile and their width is the extent of their ink. This is much cheaper than the
+    morphology of image_contours_updated but only works when the lines are separated by white rows.
+
+    Args:
+        bw (np.ndarray): Binary page image, ink is 255 (see otsu_binary).
+        filter_size (float): Minimum width to height ratio of a line.
+
+    Returns:
+        np.ndarray: (N, 4) int32 (x, y, w, h) boxes of the lines from top to bottom, or None if the profile
+                    is ambiguous (several columns, skewed or touching lines) and the page should be segmented
+                    with morphology.
+    """
+    ink = bw > 0
+    height, width = ink.shape
+
+    row_ink = ink.sum(axis=1, dtype=np.float64)
+    smoothed = np.convolve(row_ink, np.ones(PROFILE_SMOOTHING) / PROFILE_SMOOTHING, mode="same")
+    if not smoothed.any():
+        return np.empty((0, 4), dtype=np.int32)
+
+    text_row_ink = np.percentile(smoothed[smoothed > 0], 90)
+    starts, ends = true_runs(smoothed > VALLEY_RATIO * text_row_ink)
+    bands = [[start, end] for start, end in zip(starts, ends)]
+
+    # Merge bands of detached dots and marks into the nearest line
+    median_height = np.median([end - start for start, end in bands])
+    merged = []
+    for index, band in enumerate(bands):
+        if band[1] - band[0] >= MIN_LINE_HEIGHT_RATIO * median_height:
+            merged.append(band)
+            continue
+
+        gap_above = band[0] - merged[-1][1] if merged else None
+        gap_below = bands[index + 1][0] - band[1] if index + 1 < len(bands) else None
+        if gap_above is not None and (gap_below is None or gap_above <= gap_below):
+            merged[-1][1] = band[1]
+        elif gap_below is not None:
+            bands[index + 1][0] = band[0]
+        else:
+            merged.append(band)
+
+    median_height = np.median([end - start for start, end in merged])
+    if any(end - start > MAX_LINE_HEIGHT_RATIO * median_height for start, end in merged):
+        return None
+
+    # A white gap running through every line is the gutter between columns
+    inked_columns = ink[smoothed > VALLEY_RATIO * text_row_ink].any(axis=0)
+    columns = np.flatnonzero(inked_columns)
+    gap_starts, gap_ends = true_runs(~inked_columns[columns[0]:columns[-1] + 1])
+    if len(gap_starts) and (gap_ends - gap_starts).max() >= MIN_GUTTER_WIDTH * width:
+        return None
+
+    boxes = []
+    for start, end in merged:
+        line_ink = ink[start:end]
+        line_columns = np.flatnonzero(line_ink.any(axis=0))
+        if not len(line_columns):
+            continue
+
+        x, w, h = int(line_columns[0]), int(line_columns[-1] - line_columns[0] + 1), int(end - start)
+        if w / h < filter_size:
+            continue
+
+        # The ink of a skewed line is higher at one end than at the other
+        third = max(1, w // 3)
+        ends_ink = [line_ink[:, x:x + third], line_ink[:, x + w - third:x + w]]
+        if all(part.any() for part in ends_ink):
+            rows = np.arange(h)
+            left_row, right_row = [np.average(rows, weights=part.sum(axis=1)) for part in ends_ink]
+            if abs(left_row - right_row) > MAX_LINE_TILT * h:
+                return None
+
+        boxes.append((x, int(start), w, h))
+
+    return np.array(boxes, dtype=np.int32).reshape(-1, 4)
+
+
+GUTTER_INK_RATIO = 0.15  # columns with less ink than this share of a median text column are white, headings
+                         # crossing a gutter leave some ink in it
+MIN_COLUMN_INK_RATIO = 0.3  # columns of text have at least this share of the ink of a median text column, less is
+                            # the ragged end of the lines of a single column
+MIN_SPANNING_HEIGHT = 10  # rows of ink crossing a gutter that make a full width region, e.g. a heading
+
+
+def _column_ranges(column_ink, min_gutter_width):
+    """Returns the [start, end) ranges of the columns of text between the gutters of a column ink profile."""
+    inked = np.flatnonzero(column_ink)
+    if not len(inked):
+        return []
+
+    first, last = inked[0], inked[-1] + 1
+    text_column_ink = np.median(column_ink[first:last][column_ink[first:last] > 0])
+    white = column_ink[first:last] <= GUTTER_INK_RATIO * text_column_ink
+
+    gutter_starts, gutter_ends = true_runs(white)
+    # Gutters are inside the text, the white margins at both ends are not
+    gutters = [(first + start, first + end) for start, end in zip(gutter_starts, gutter_ends)
+               if end - start >= min_gutter_width and start > 0 and end < last - first]
+
+    edges = [first] + [edge for gutter in gutters for edge in gutter] + [last]
+    ranges = [(edges[index], edges[index + 1]) for index in range(0, len(edges), 2)]
+
+    if any(np.median(column_ink[start:end]) < MIN_COLUMN_INK_RATIO * text_column_ink for start, end in ranges):
+        return [(first, last)]
+
+    return ranges
+
+
+def layout_regions(bw, min_gutter_width=MIN_GUTTER_WIDTH):
+    """
+    Splits a page into regions of a single text column, in reading order.
+
+    Gutters are the runs of white columns of the vertical projection profile of the page. Rows with
+    ink crossing a gutter (headings, tables spanning the columns) are kept as full width regions,
+    the other rows are split into their columns. Regions are ordered from top to bottom and the
+    columns of a band from right to left, as Urdu is read.
+
+    Args:
+        bw (np.ndarray): Binary page image, ink is 255 (see otsu_binary).
+        min_gutter_width (float): Minimum width of a gutter, as a share of the page width.
+
+    Returns:
+        list: (x, y, w, h) regions of the page. A single column page is a single region.
+    """
+    ink = bw > 0
+    height, width = ink.shape
+
+    columns = _column_ranges(ink.sum(axis=0), min_gutter_width * width)
+    if len(columns) <= 1:
+        return [(0, 0, width, height)]
+
+    # Rows crossing any gutter belong to full width bands
+    gutter_mask = np.zeros(width, dtype=bool)
+    for (_, end), (start, _) in zip(columns[:-1], columns[1:]):
+        gutter_mask[end:start] = True
+    spanning_starts, spanning_ends = true_runs(ink[:, gutter_mask].any(axis=1))
+
+    # A heading only crosses the gutter with some of its rows, its band is grown to the white rows
+    # around it, by at most its own height
+    white_rows = np.flatnonzero(~ink.any(axis=1))
+
+    bands, top = [], 0
+    for start, end in zip(spanning_starts, spanning_ends):
+        # Runs inside the band grown around the previous heading are already part of it
+        if end - start < MIN_SPANNING_HEIGHT or end <= top:
+            continue
+
+        run_height = end - start
+        above = white_rows[white_rows < start]
+        below = white_rows[white_rows >= end]
+        start = max(top, start - run_height, above[-1] + 1 if len(above) else 0)
+        end = min(height, end + run_height, below[0] if len(below) else height)
+
+        bands.append((top, start, False))
+        bands.append((start, end, True))
+        top = end
+    bands.append((top, height, False))
+
+    regions = []
+    for top, bottom, spanning in bands:
+        top, bottom = int(top), int(bottom)
+        band_ink = ink[top:bottom]
+        if not band_ink.any():
+            continue
+
+        if spanning:
+            regions.append((0, top, width, bottom - top))
+            continue
+
+        for start, end in reversed(columns):
+            if band_ink[:, start:end].any():
+                regions.append((int(start), top, int(end - start), bottom - top))
+
+    return regions
 
 
 def get_contour_morph_images(page_img, kernel_sizes=None):
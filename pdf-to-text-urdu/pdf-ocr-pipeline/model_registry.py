@@ -0,0 +1,74 @@
+"""
+    Process wide registry of the loaded recognition models.
+
+    Building the CNN_RNN_CTC graph and restoring its checkpoint costs far more
+    than recognising a line, so each model config is loaded only once per
+    process and the same model object is handed to every caller.
+"""
+
+import os
+import threading
+
+from . import run_model
+
+DEFAULT_MODEL_CONFIG = 'pdf_ocr_pipeline/configs/CNN_RNN_CTC/MMA-UD.json'
+
+_models = {}
+_models_lock = threading.Lock()
+
+
+def _registry_key(model_config_path):
+    return os.path.abspath(model_config_path)
+
+
+def get_model(model_config_path=DEFAULT_MODEL_CONFIG):
+    """
+    Return the model for the given config, building it on first use.
+
+    Args:
+        model_config_path (str): Path to the model JSON config.
+
+    Returns:
+        Model: The shared, restored model for this config.
+    """
+    key = _registry_key(model_config_path)
+
+    model = _models.get(key)
+    if model is None:
+        # Graph construction resets the default TF graph, so models are built one at a time.
+        with _models_lock:
+            model = _models.get(key)
+            if model is None:
+                model, _ = run_model.create_and_run_model(model_config_path)
+                _models[key] = model
+
+    return model
+
+
+def preload_models(model_config_paths=(DEFAULT_MODEL_CONFIG,)):
+    """
+    Load every given model config up front, e.g. at application startup.
+
+    Args:
+        model_config_paths (iterable): Paths to the model JSON configs.
+    """
+    for model_config_path in model_config_paths:
+        get_model(model_config_path)
+
+
+def is_model_loaded(model_config_path=DEFAULT_MODEL_CONFIG):
+    return _registry_key(model_config_path) in _models
+
+
+def unload_model(model_config_path=DEFAULT_MODEL_CONFIG):
+    """
+    Drop a model from the registry and release its session.
+
+    Args:
+        model_config_path (str): Path to the model JSON config.
+    """
+    with _models_lock:
+        model = _models.pop(_registry_key(model_config_path), None)
+
+    if model is not None:
+        model.close()
@@ -8,12 +8,15 @@ class CNN():
     """
     This class implements a convolutional neural network of arbitrary layers.
     """
-    def __init__(self, params):
+    def __init__(self, params, mask_padding=False):
         """
         Args:
             params: The paramters of the model.
+            mask_padding: Keep the padding of the lines of a batch out of every layer, so each line gets
+                          the outputs it gets alone (inference without use_dynamic_lengths).
         """
         self.params = params
+        self.mask_padding = mask_padding
 
     def __call__(self, X, X_seq_len, is_training):
         """
@@ -53,11 +56,21 @@ class CNN():
                                kernel,
                                (1, params.cnn_strides[i][0], params.cnn_strides[i][1], 1),
                                params.cnn_paddings[i])
+            if self.mask_padding:
+                # Padded steps never win the max pooling, as the "SAME" padding of a single line
+                X_seq_len = _ceil_div(X_seq_len, params.cnn_strides[i][0])
+                mask = _time_mask(out, X_seq_len)
+                out = out * mask + (1 - mask) * out.dtype.min
             if params.pool_sizes != (1,1) or params.pool_strides != (1,1):
                 out = tf.nn.max_pool(out,
                                      (1, params.pool_sizes[i][0], params.pool_sizes[i][1], 1),
                                      (1, params.pool_strides[i][0], params.pool_strides[i][1], 1),
                                      params.pool_paddings[i])
+            if self.mask_padding:
+                # Padded steps are zeros for the next layer, as the "SAME" padding of a single line
+                X_seq_len = _ceil_div(X_seq_len, params.pool_strides[i][0])
+                mask = _time_mask(out, X_seq_len)
+                out = out * mask
             out = activation_fn(out)
 
             if params.do_batch_norm[i]:
@@ -81,7 +94,10 @@ class CNN():
             if i >= params.cnn_num_layers - params.cnn_num_residual_layers:
                 out = tf.add(out, residual_connection)
 
-            if params.use_dynamic_lengths:
+            if self.mask_padding:
+                out = out * mask
+
+            elif params.use_dynamic_lengths:
                 # Decrease the sequence lengths depending on the strides that were taken.
                 # Note that this will only work correctly for non-overlapping convolutional
                 # and pooling layers, i.e. when the filter/pool sizes and strides are equal
@@ -101,12 +117,20 @@ class CNN():
 
                 variable_summaries(out, "out_{}".format(i))
 
-        if params.use_dynamic_lengths:
+        if params.use_dynamic_lengths and not self.mask_padding:
             max_time = tf.dtypes.cast(tf.shape(out, out_type=tf.int64)[1], tf.float64)
             X_seq_len = tf.dtypes.cast(tf.clip_by_value(X_seq_len, 0, max_time), tf.int32)
 
         return out, X_seq_len 
 
+def _ceil_div(seq_len, stride):
+    return (seq_len + stride - 1) // stride
+
+def _time_mask(out, seq_len):
+    """Returns a [batch_size, width, 1, 1] mask of out, 1 for the steps of every line and 0 for its padding."""
+    mask = tf.sequence_mask(seq_len, tf.shape(out)[1], dtype=out.dtype)
+    return mask[:, :, tf.newaxis, tf.newaxis]
+
 def _get_kernel(h, w, c, f, name):
     kernel = tf.get_variable(name, shape=[h,w,c,f], trainable=True)
 
@@ -10,7 +10,11 @@ from .encoder import *
 class CNN_RNN_CTC(Model):
     def _build_graph(self):
         # print("+ cnn_rnn_ctc.py -> _build_graph")
-        if self.config.use_dynamic_lengths:
+        # Lines of an inference batch are padded to the widest one, their own lengths keep the padding
+        # out of the CNN and the RNN, so every line is recognised as it is alone
+        mask_padding = self.INFER and not self.config.use_dynamic_lengths
+
+        if self.config.use_dynamic_lengths or mask_padding:
             X_seq_len = self.X_seq_len_placeholder
         else:
             X_seq_len = None
@@ -20,26 +24,29 @@ class CNN_RNN_CTC(Model):
         else:
             dropout = None
 
-        cnn_out, X_seq_len = self._setup_cnn(self.X_placeholder, X_seq_len, self.is_training_placeholder)
+        cnn_out, X_seq_len = self._setup_cnn(self.X_placeholder, X_seq_len, self.is_training_placeholder,
+                                             mask_padding)
 
-        if not self.config.use_dynamic_lengths:
+        if not self.config.use_dynamic_lengths and not mask_padding:
             X_seq_len = tf.fill([tf.shape(cnn_out)[0]], tf.shape(cnn_out)[1])
 
         rnn_out = self._setup_rnn(cnn_out, X_seq_len, dropout, self.vocab_size)
 
         self.loss, decoded = self._setup_CTC(rnn_out, self.y_placeholder, X_seq_len, self.vocab_size)
         self.decoded_train = self.decoded_infer = decoded
-        self.train_op, self.grad_norm = self._optimize(self.loss)
+        # The optimizer is only needed for training, inference restores the weights it trained
+        if not self.INFER:
+            self.train_op, self.grad_norm = self._optimize(self.loss)
 
-        if self.config.verbose:
+        if self.summaries:
             img = tf.expand_dims(tf.transpose(self.X_placeholder, [0,2,1]), -1)
             tf.summary.image("inputs", img , max_outputs=self.config.max_outputs)
 
-    def _setup_cnn(self, X, X_seq_len, is_training):
+    def _setup_cnn(self, X, X_seq_len, is_training, mask_padding=False):
         X_expanded = tf.expand_dims(X, axis=3)
 
         with tf.variable_scope("cnn"):
-            cnn = CNN(self.config)
+            cnn = CNN(self._graph_params(), mask_padding=mask_padding)
             output, new_seq_len = cnn(X_expanded, X_seq_len, is_training)
 
         output_squeezed = tf.squeeze(output, axis=2)
@@ -53,7 +60,7 @@ class CNN_RNN_CTC(Model):
                                        config.rnn_type,
                                        config.rnn_num_units,
                                        config.rnn_num_residual_layers,
-                                       config.verbose)
+                                       self.summaries)
 
         with tf.variable_scope("rnn"):
             encoder = Encoder(params)
@@ -62,7 +69,7 @@ class CNN_RNN_CTC(Model):
             output_layer = tf.layers.Dense(vocab_size+1)
             outputs = output_layer(outputs)
 
-            if config.verbose:
+            if self.summaries:
                 variable_summaries(output_layer.trainable_weights[0], 'output_layer_weights')
                 variable_summaries(output_layer.trainable_weights[1], 'output_layer_biases')
                 variable_summaries(outputs, 'linear_projections')
@@ -56,7 +56,8 @@ class Encoder():
         else:
             raise ValueError("Unknown encoder type %s" % params.encoder_type)
 
-        variable_summaries(encoder_outputs, 'outputs')
+        if params.verbose:
+            variable_summaries(encoder_outputs, 'outputs')
 
         return encoder_outputs, encoder_state
 
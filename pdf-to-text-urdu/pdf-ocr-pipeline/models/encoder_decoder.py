@@ -46,9 +46,11 @@ class Encoder_Decoder(Model): # Model Class act as a parent class here
                                                                                                                  self.global_step)
 
         self.loss = self._setup_loss(self.decoded_train, self.y_out_placeholder, self.y_seq_len_placeholder)
-        self.train_op, self.grad_norm = self._optimize(self.loss)
+        # The optimizer is only needed for training, inference restores the weights it trained
+        if not self.INFER:
+            self.train_op, self.grad_norm = self._optimize(self.loss)
 
-        if self.config.verbose:
+        if self.summaries:
             img = tf.expand_dims(tf.transpose(self.X_placeholder, [0,2,1]), -1)
             tf.summary.image("inputs", img , max_outputs=self.config.max_outputs)
 
@@ -71,7 +73,7 @@ class Encoder_Decoder(Model): # Model Class act as a parent class here
         X_expanded = tf.expand_dims(X, axis=3)   
         
         with tf.variable_scope("cnn"):
-            cnn = CNN(self.config)
+            cnn = CNN(self._graph_params())
             output, new_seq_len = cnn(X_expanded, X_seq_len, is_training)
             
         output_squeezed = tf.squeeze(output, axis=2)
@@ -92,7 +94,7 @@ class Encoder_Decoder(Model): # Model Class act as a parent class here
             output_state: final state of the encoder
         """
         with tf.variable_scope("encoder"):
-            encoder = Encoder(self.config)
+            encoder = Encoder(self._graph_params())
             outputs, output_state = encoder(X, X_seq_len, dropout)
 
         return outputs, output_state
@@ -114,7 +116,8 @@ class Encoder_Decoder(Model): # Model Class act as a parent class here
                                                shape=[vocab_size, self.config.embed_size],
                                                trainable=True)
             embeddings = tf.nn.embedding_lookup(embedding_matrix, y)
-            variable_summaries(embedding_matrix, "embedding_matrix_weights")
+            if not self.INFER:
+                variable_summaries(embedding_matrix, "embedding_matrix_weights")
 
         return embeddings, embedding_matrix
 
@@ -142,7 +145,7 @@ class Encoder_Decoder(Model): # Model Class act as a parent class here
             infer_output: predicted sequences shaped [batch_size, infer_len] where infer_len <= max_len
             infer_alignment: the inference alignment matrix shaped [infer_len, batch_size, time_steps]
         """
-        decoder = Decoder(self.config)
+        decoder = Decoder(self._graph_params())
         train_output, train_alignment, infer_output, infer_alignment = decoder(encoder_output,
                                                                                encoder_seq_len,
                                                                                encoder_final_state,
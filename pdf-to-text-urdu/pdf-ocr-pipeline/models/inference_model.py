@@ -0,0 +1,136 @@
+from __future__ import print_function
+
+import os
+
+import tensorflow as tf
+
+from .model_class import Model
+
+__all__ = ["InferenceModel", "freeze_inference_graph", "freeze_logits_graph", "default_inference_graph_path"]
+
+INPUT_NODES = ("X_placeholder", "X_seq_len_placeholder", "is_training_placeholder", "dropout_placeholder")
+OUTPUT_NODES = ("decoded_indices", "decoded_values", "decoded_shape")
+LOGITS_NODES = ("logits", "logits_seq_len")
+INFERENCE_GRAPH_NAME = "frozen_inference_graph.pb"
+
+
+def default_inference_graph_path(config):
+    """Returns the path of the frozen inference graph next to the checkpoint of a model."""
+    return os.path.join(config.save_dir, config.model, INFERENCE_GRAPH_NAME)
+
+
+def freeze_inference_graph(model, output_path):
+    """
+    Freezes the restored weights of a model into a graph that only goes from the input placeholders
+    to the decoded output and the logits. The optimizer, the loss, the regularizers and the summaries are pruned.
+
+    Args:
+        model (Model): Model restored for inference (see run_model.create_and_run_model).
+        output_path (str): Path of the frozen GraphDef.
+
+    Returns:
+        int: Number of nodes of the frozen graph.
+    """
+    if model.config.decoder_type == "prefix_beam_search":
+        # The language model decoder is a tf.py_func, which cannot be serialised into a GraphDef
+        raise ValueError("decoder_type prefix_beam_search cannot be frozen, use greedy_search or beam_search")
+
+    graph_def = model.sess.graph.as_graph_def()
+    # The logits are kept as outputs too, greedy_search decodes them with NumPy instead of the decoder op
+    node_names = {node.name for node in graph_def.node}
+    output_nodes = list(OUTPUT_NODES) + [name for name in LOGITS_NODES if name in node_names]
+    frozen_graph_def = tf.graph_util.convert_variables_to_constants(model.sess, graph_def, output_nodes)
+
+    folder = os.path.dirname(output_path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    with tf.gfile.GFile(output_path, "wb") as graph_file:
+        graph_file.write(frozen_graph_def.SerializeToString())
+
+    return len(frozen_graph_def.node)
+
+
+def freeze_logits_graph(model):
+    """
+    Freezes the restored weights of a model into a graph from the input placeholders to the batch major
+    logits and their sequence lengths, for converters like tf2onnx. The is_training and dropout
+    placeholders are replaced by their inference values, so batch normalisation and dropout fold away.
+
+    Args:
+        model (Model): Model restored for inference.
+
+    Returns:
+        tf.GraphDef: The frozen graph.
+    """
+    graph_def = tf.graph_util.convert_variables_to_constants(model.sess, model.sess.graph.as_graph_def(),
+                                                             list(LOGITS_NODES))
+    node_names = {node.name for node in graph_def.node}
+
+    with tf.Graph().as_default() as graph:
+        input_map = {}
+        if "is_training_placeholder" in node_names:
+            input_map["is_training_placeholder:0"] = tf.constant(False, name="inference_is_training")
+        if "dropout_placeholder" in node_names:
+            input_map["dropout_placeholder:0"] = tf.constant(0.0, name="inference_dropout")
+        tf.import_graph_def(graph_def, input_map=input_map, name="")
+
+    return tf.graph_util.extract_sub_graph(graph.as_graph_def(), list(LOGITS_NODES))
+
+
+class InferenceModel(Model):
+    """
+    Recognises lines with a frozen inference graph (see freeze_inference_graph) instead of building the
+    training graph and restoring its checkpoint. It has the inference interface of Model (__call__,
+    predict_batch, infer_batch) and writes no files.
+    """
+    def __init__(self, config, graph_path):
+        self.config = config
+        self.TRAIN = self.EVALUATE = False
+        self.INFER = True
+
+        graph_def = tf.GraphDef()
+        with tf.gfile.GFile(graph_path, "rb") as graph_file:
+            graph_def.ParseFromString(graph_file.read())
+
+        # The graph is imported into a graph of its own, so several models can be loaded side by side
+        self.graph = tf.Graph()
+        with self.graph.as_default():
+            tf.import_graph_def(graph_def, name="")
+
+        node_names = {node.name for node in graph_def.node}
+        inputs = {name: self.graph.get_tensor_by_name(name + ":0") if name in node_names else None
+                  for name in INPUT_NODES}
+        self.X_placeholder = inputs["X_placeholder"]
+        self.X_seq_len_placeholder = inputs["X_seq_len_placeholder"]
+        self.is_training_placeholder = inputs["is_training_placeholder"]
+        self.dropout_placeholder = inputs["dropout_placeholder"]
+        self.decoded_infer = [self.graph.get_tensor_by_name(name + ":0") for name in OUTPUT_NODES]
+        # Graphs frozen before the logits were exported only have the decoded output
+        self.logits, self.logits_seq_len = [self.graph.get_tensor_by_name(name + ":0") if name in node_names else None
+                                            for name in LOGITS_NODES]
+
+        self.sess = self._get_session(graph=self.graph)
+
+    def infer_logits(self, X_infer, X_infer_seq_len):
+        return self.sess.run([self.logits, self.logits_seq_len], self._feed_dict(X_infer, X_infer_seq_len))
+
+    def _feed_dict(self, X_infer, X_infer_seq_len):
+        feed_dict = {self.X_placeholder: X_infer}
+        if self.X_seq_len_placeholder is not None:
+            feed_dict[self.X_seq_len_placeholder] = X_infer_seq_len
+        if self.is_training_placeholder is not None:
+            feed_dict[self.is_training_placeholder] = False
+        if self.dropout_placeholder is not None:
+            feed_dict[self.dropout_placeholder] = 0.0
+
+        return feed_dict
+
+    def _infer(self, X_infer, X_infer_seq_len):
+        if self._decodes_logits():
+            return self._infer_greedy(X_infer, X_infer_seq_len)[0]
+
+        indices, values, dense_shape = self.sess.run(self.decoded_infer, self._feed_dict(X_infer, X_infer_seq_len))
+        decoded = tf.SparseTensorValue(indices, values, dense_shape)
+
+        output = self._get_output_indices(decoded, labels=None, num_examples=X_infer.shape[0], test_flag=True)
+        return list(output)
@@ -20,9 +20,11 @@ from ..debugger.custom_filters import add_filters
 from .helpers import *
 from ..utils.data_utils import *
 from ..utils.helpers import from_sparse
+from ..utils.session_utils import pin_process, session_threads
 from ..utils.image_utils import *
 from ..utils.accuracy_metrics import *
 from .lm import ctc_prefix_beam_search_decoder
+from .recognition import LineRecogniser
 
 plt.switch_backend('agg')
 logging.basicConfig(level=logging.INFO)
@@ -32,7 +34,7 @@ SPLIT_RATIO = 0.80
 TIMEOUT = 3
 
 
-class Model():
+class Model(LineRecogniser):
     # print("model_class.py -> Model.__call__() ")
     # Initialize the instancs of the class
     def __init__(self, config, eval_path=None, infer=True):
@@ -44,6 +46,8 @@ class Model():
         self.EVALUATE = eval_path is not None and not infer
         self.INFER = infer and eval_path is None
         self.INFER = infer
+        # Summaries are only built for Tensorboard when training or evaluating, not for inference
+        self.summaries = config.verbose and not self.INFER
         # Save directory that given in cofig file
         # If not having dir. than create the dir. into the given path
         # And During the training phase only load the training data
@@ -79,10 +83,11 @@ class Model():
         # inferenc dataset from the path
         elif self.INFER:
             # print("    + model_class.py -> _load_inferring_data() ")
-            self._load_inferring_data(path)
+            # The inputs are kept local so a single model can be shared between threads
+            X_infer, X_infer_seq_len = self._load_inferring_data(path)
 
             # print("Data is loaded and pre-processed sending now for inference ...")
-            out = self._infer()  # Got here the transcripted text like [28, 49, 14, 3]
+            out = self._infer(X_infer, X_infer_seq_len)  # Got here the transcripted text like [28, 49, 14, 3]
             # print("---------- ", out)
             urdu_out = [convert_to_urdu(o, self.config.data_folder)[1] for o in out]
 
@@ -131,19 +136,6 @@ class Model():
 
         logging.info("Size of evaluation dataset: %d" % sum([d[0].shape[0] for d in self.eval_dataset]))
 
-    def _load_inferring_data(self, images):
-        config = self.config
-        # IMAGE IS PASSING CORRECTLY
-        self.X_infer, self.X_infer_seq_len = handle_inferring(images,
-                                                              config.image_size,
-                                                              flip_image=config.flip_image,
-                                                              buckets=1)
-        # cv2.imshow("Processed Image", self.X_infer[0])
-        # cv2.waitKey(0)
-        # cv2.destroyAllWindows()
-        # result = cv2.normalize(self.X_infer[0], dst=None, alpha=0, beta=255, norm_type=cv2.NORM_MINMAX, dtype=cv2.CV_8U)
-        # cv2.imwrite('Flipped.jpg', result)
-
     # Load data from the data_folder by passing the data_folder path and image configuration
     # Returing the images, images_seq_len, label, label_sq_length
     def _load_data_from_folder(self, data_folder, size=None):
@@ -209,6 +201,10 @@ class Model():
         if config.dropout is not None:
             self.dropout_placeholder = tf.placeholder(tf.float32, [], name="dropout_placeholder")
 
+    def _graph_params(self):
+        """Returns the config the layers of the graph are built from, with verbose off when inferring."""
+        return self.config._replace(verbose=self.summaries)
+
     def _initialize_graph(self):
         tic = time.time()
 
@@ -218,7 +214,16 @@ class Model():
         regularizer = tf.contrib.layers.l2_regularizer(self.config.l2_regularizer_scale)
         with tf.variable_scope("model", regularizer=regularizer):
             self._build_graph()
-            self.merged_summary = tf.summary.merge_all()
+            self.merged_summary = tf.summary.merge_all() if not self.INFER else None
+
+        # Named outputs of the inference graph, see inference_model.freeze_inference_graph
+        if hasattr(self, "logits"):
+            tf.identity(self.logits, name="logits")
+            tf.identity(self.logits_seq_len, name="logits_seq_len")
+        if isinstance(getattr(self, "decoded_infer", None), tf.SparseTensor):
+            tf.identity(self.decoded_infer.indices, name="decoded_indices")
+            tf.identity(self.decoded_infer.values, name="decoded_values")
+            tf.identity(self.decoded_infer.dense_shape, name="decoded_shape")
 
         toc = time.time()
 
@@ -229,9 +234,12 @@ class Model():
 
     def _setup_CTC(self, logits, labels, logits_seq_len, vocab_size):
         config = self.config
-        if not config.use_dynamic_lengths:
+        if logits_seq_len is None:
             logits_seq_len = tf.fill([tf.shape(logits)[0]], tf.shape(logits)[1])
 
+        # Batch major logits, exported for the backends decoding them outside of the graph
+        self.logits, self.logits_seq_len = logits, logits_seq_len
+
         logits_T = tf.transpose(logits, [1, 0, 2])
         loss = tf.nn.ctc_loss(labels,
                               logits_T,
@@ -302,7 +310,7 @@ class Model():
         self.sess = self._get_session()
         self.saver = tf.train.Saver(save_relative_paths=True)
 
-        if not os.path.isdir(config.save_dir):
+        if not self.INFER and not os.path.isdir(config.save_dir):
             os.mkdir(config.save_dir)
 
         # WILL BE HERE
@@ -321,25 +329,31 @@ class Model():
             self.sess.run(tf.global_variables_initializer())
 
         # WILL BE HERE
-        if verbose:
+        if verbose and not self.INFER:
             tic = time.time()
             params = tf.trainable_variables()
             num_params = sum(map(lambda t: np.prod(tf.shape(t.value()).eval(session=self.sess)), params))
             toc = time.time()
             logging.info("Number of params: %d (retreival took %f secs)" % (num_params, toc - tic))
 
-        self.writer = tf.summary.FileWriter(os.path.join(config.save_dir, "Tensorboard"), self.sess.graph)
+        # The graph is only written for Tensorboard when training, loading a model for inference writes no files
+        if not self.INFER:
+            self.writer = tf.summary.FileWriter(os.path.join(config.save_dir, "Tensorboard"), self.sess.graph)
+
+    def _get_session(self, graph=None):
+        # Thread pool sizes and CPU pinning from the model config or the OCR_* environment variables
+        threads = session_threads(self.config)
+        if pin_process(threads.cpu_affinity):
+            logging.info("Pinned the process to CPUs %s" % threads.cpu_affinity)
 
-    def _get_session(self):
+        config = tf.ConfigProto(intra_op_parallelism_threads=threads.intra_op_threads,
+                                inter_op_parallelism_threads=threads.inter_op_threads)
         if self.config.use_gpu:
-            config = tf.ConfigProto()
             config.gpu_options.allow_growth = True
-            session = tf.Session(config=config)
-        else:
-            session = tf.Session()
+        session = tf.Session(graph=graph, config=config)
 
         if self.config.debug_mode:
-            session = tf_debug.LocalCLIDebugWrapperSession(tf.Session())
+            session = tf_debug.LocalCLIDebugWrapperSession(tf.Session(graph=graph, config=config))
             add_filters(session)
 
         return session
@@ -589,8 +603,23 @@ class Model():
         self._initialize_model(True, verbose=False)
         self._validate(self.eval_dataset, self.sess)
 
-    def _infer(self):
+    def infer_logits(self, X_infer, X_infer_seq_len):
+        dropout = 0.0 if self.config.dropout is not None else None
+        feed_dict = self._create_feed_dict(X_infer, X_infer_seq_len, y=None, y_seq_len=None, dropout=dropout,
+                                           is_training=False)
+
+        return self.sess.run([self.logits, self.logits_seq_len], feed_dict)
+
+    def _decodes_logits(self):
+        # Greedy decoding of the logits with NumPy skips the decoder op and the conversion of its SparseTensor
+        return self.config.decoder_type == "greedy_search" and not self.config.save_alignments and \
+            getattr(self, "logits", None) is not None
+
+    def _infer(self, X_infer, X_infer_seq_len):
         # print("    + model_class.py -> _infer() ")
+        if self._decodes_logits():
+            return self._infer_greedy(X_infer, X_infer_seq_len)[0]
+
         dropout = 0.0 if self.config.dropout is not None else None
 
         # cv2.imshow("Image", self.X_infer[0])
@@ -599,13 +628,13 @@ class Model():
         # print(self.X_infer_seq_len)
 
         # X_infer is inputted image
-        feed_dict = self._create_feed_dict(self.X_infer, self.X_infer_seq_len, y=None, y_seq_len=None, dropout=dropout,
+        feed_dict = self._create_feed_dict(X_infer, X_infer_seq_len, y=None, y_seq_len=None, dropout=dropout,
                                            is_training=False)
 
         # This will not run
         if self.config.save_alignments:
             decoded, alignment = self.sess.run([self.decoded_infer, self.infer_alignment], feed_dict)
-            _create_attention_video(self.X_infer, alignment, self.config.save_dir, decoded, self.config.data_folder,
+            _create_attention_video(X_infer, alignment, self.config.save_dir, decoded, self.config.data_folder,
                                     self.extra_codes)
 
         else:
@@ -614,7 +643,7 @@ class Model():
             decoded, = self.sess.run([self.decoded_infer], feed_dict)
 
         # print(decoded)
-        output = self._get_output_indices(decoded, labels=None, num_examples=self.X_infer.shape[0], test_flag=True)
+        output = self._get_output_indices(decoded, labels=None, num_examples=X_infer.shape[0], test_flag=True)
         # print(output)
         return list(output)
 
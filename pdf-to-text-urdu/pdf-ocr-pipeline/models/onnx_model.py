@@ -0,0 +1,59 @@
+from __future__ import print_function
+
+import numpy as np
+
+from .recognition import LineRecogniser
+from ..utils.session_utils import pin_process, session_threads
+
+__all__ = ["OnnxModel", "ONNX_INPUT", "ONNX_SEQ_LEN_INPUT", "ONNX_LOGITS", "ONNX_SEQ_LEN"]
+
+# Tensor names of the exported model, see export_model.export_onnx
+ONNX_INPUT = "X_placeholder:0"
+ONNX_SEQ_LEN_INPUT = "X_seq_len_placeholder:0"
+ONNX_LOGITS = "logits:0"
+ONNX_SEQ_LEN = "logits_seq_len:0"
+
+
+class OnnxModel(LineRecogniser):
+    """
+    Recognises lines with the ONNX export of a model (CNN, BiLSTM and the dense logits) on onnxruntime,
+    the logits are decoded with NumPy. Neither TensorFlow nor the model checkpoint are loaded.
+    """
+    def __init__(self, config, onnx_path):
+        if config.decoder_type != "greedy_search":
+            raise ValueError("The onnx backend only decodes greedy_search, not %s" % config.decoder_type)
+
+        import onnxruntime
+
+        self.config = config
+
+        # Same threading and CPU pinning as the TensorFlow sessions
+        threads = session_threads(config)
+        pin_process(threads.cpu_affinity)
+
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = threads.intra_op_threads
+        options.inter_op_num_threads = threads.inter_op_threads
+
+        self.sess = onnxruntime.InferenceSession(onnx_path, sess_options=options,
+                                                 providers=["CPUExecutionProvider"])
+        self.input_names = {model_input.name for model_input in self.sess.get_inputs()}
+        self.output_names = [output.name for output in self.sess.get_outputs()]
+
+    def infer_logits(self, X_infer, X_infer_seq_len):
+        feed = {ONNX_INPUT: np.asarray(X_infer, dtype=np.float32)}
+        if ONNX_SEQ_LEN_INPUT in self.input_names:
+            feed[ONNX_SEQ_LEN_INPUT] = np.asarray(X_infer_seq_len, dtype=np.int32)
+
+        outputs = dict(zip(self.output_names, self.sess.run(self.output_names, feed)))
+        logits = outputs[ONNX_LOGITS]
+        seq_len = outputs.get(ONNX_SEQ_LEN)
+
+        return logits, seq_len
+
+    def close(self):
+        # onnxruntime sessions are released with their last reference
+        self.sess = None
+
+    def _infer(self, X_infer, X_infer_seq_len):
+        return self._infer_greedy(X_infer, X_infer_seq_len)[0]
@@ -0,0 +1,134 @@
+from __future__ import print_function
+
+import numpy as np
+
+from ..utils.ctc_utils import ctc_greedy_decode
+from ..utils.data_utils import convert_to_urdu
+from ..utils.image_utils import handle_inferring, handle_inferring_batch
+
+__all__ = ["LineRecogniser"]
+
+
+class LineRecogniser():
+    """
+    Line recognition interface shared by the model backends. It does not import TensorFlow, backends
+    set self.config and implement _infer, which returns the label ids of every line of a batch, and
+    infer_logits when the logits of the model can be decoded with NumPy.
+    """
+    def __call__(self, image):
+        X_infer, X_infer_seq_len = self._load_inferring_data(image)
+
+        out = self._infer(X_infer, X_infer_seq_len)
+        urdu_out = [convert_to_urdu(o, self.config.data_folder)[1] for o in out]
+
+        return out, urdu_out
+
+    def predict_batch(self, images, max_batch=32, buckets=4, binarized=False, confidences=False):
+        """
+        Recognises a list of line images with one session run per batch of similar width lines
+        instead of one run per line.
+
+        Args:
+            images (list): Line images (np.ndarray, BGR).
+            max_batch (int): Maximum number of lines fed to a single session run.
+            buckets (int): Number of width buckets the lines are grouped into before batching.
+            binarized (bool): The images are binary lines (e.g. LineView.binary of a PageContext)
+                              that are not binarized again.
+            confidences (bool): Also return the probability of every label, greedy_search models only.
+
+        Returns:
+            tuple: (out, urdu_out) lists in the same order as images, and with confidences the list of
+                   label probabilities of every line.
+        """
+        config = self.config
+        if confidences and config.decoder_type != "greedy_search":
+            raise ValueError("Label confidences are only computed for greedy_search, not %s" % config.decoder_type)
+
+        out = [None] * len(images)
+        probabilities = [None] * len(images)
+
+        batches = handle_inferring_batch(images,
+                                         config.image_size,
+                                         flip_image=config.flip_image,
+                                         buckets=buckets,
+                                         max_batch=max_batch,
+                                         binarized=binarized,
+                                         binarize_once=getattr(config, "binarize_once", False))
+
+        for X_batch, X_batch_seq_len, indices in batches:
+            if confidences:
+                batch_out, batch_probabilities = self._infer_greedy(X_batch, X_batch_seq_len)
+                for i, p in zip(indices, batch_probabilities):
+                    probabilities[i] = p
+            else:
+                batch_out = self._infer(X_batch, X_batch_seq_len)
+
+            for i, o in zip(indices, batch_out):
+                out[i] = o
+
+        urdu_out = [convert_to_urdu(o, config.data_folder)[1] for o in out]
+
+        if confidences:
+            return out, urdu_out, probabilities
+        return out, urdu_out
+
+    def infer_batch(self, X, X_seq_len):
+        """
+        Runs a single session call on an already preprocessed and padded batch
+        (see preprocess_inferring_strip and pad_inferring_batch).
+
+        Returns:
+            tuple: (out, urdu_out) lists in the same order as the batch.
+        """
+        out = self._infer(X, X_seq_len)
+        urdu_out = [convert_to_urdu(o, self.config.data_folder)[1] for o in out]
+
+        return out, urdu_out
+
+    def infer_logits(self, X_infer, X_infer_seq_len):
+        """Returns the [batch, time, classes] logits of a batch and their sequence lengths."""
+        raise NotImplementedError
+
+    def close(self):
+        """Releases the session of the model."""
+        self.sess.close()
+
+    def _load_inferring_data(self, images):
+        config = self.config
+        X_infer, X_infer_seq_len = handle_inferring(images,
+                                                    config.image_size,
+                                                    flip_image=config.flip_image,
+                                                    buckets=1,
+                                                    binarize_once=getattr(config, "binarize_once", False))
+
+        return X_infer, X_infer_seq_len
+
+    def _logits_seq_len(self, X_infer_seq_len, max_time):
+        """
+        Returns the logits time steps of every line of a batch from its image widths, reduced by the time
+        strides of the CNN layers as cnn.py does with use_dynamic_lengths.
+        """
+        config = self.config
+        seq_len = np.asarray(X_infer_seq_len, dtype=np.float64).reshape(-1)
+
+        if "CNN" in config.model:
+            for i in range(config.cnn_num_layers):
+                seq_len = np.ceil(seq_len / (config.pool_strides[i][0] * config.cnn_strides[i][0]))
+
+        return np.minimum(seq_len, max_time).astype(np.int64)
+
+    def _infer(self, X_infer, X_infer_seq_len):
+        raise NotImplementedError
+
+    def _infer_greedy(self, X_infer, X_infer_seq_len):
+        """Decodes the logits of a batch with NumPy, returns the label ids and label probabilities of every line."""
+        logits, seq_len = self.infer_logits(X_infer, X_infer_seq_len)
+
+        # Without use_dynamic_lengths every line of a batch gets the logits length of the widest one, the
+        # steps of its padding are not decoded
+        line_seq_len = self._logits_seq_len(X_infer_seq_len, logits.shape[1])
+        seq_len = line_seq_len if seq_len is None else np.minimum(seq_len, line_seq_len)
+
+        labels, probabilities = ctc_greedy_decode(logits, seq_len)
+
+        return [l.tolist() for l in labels], [p.tolist() for p in probabilities]
@@ -9,7 +9,9 @@ from .encoder import *
 
 class RNN_CTC(Model):
     def _build_graph(self):
-        if self.config.use_dynamic_lengths:
+        # The lengths of the lines of an inference batch keep their padding out of the RNN, so every line
+        # is recognised as it is alone
+        if self.config.use_dynamic_lengths or self.INFER:
             X_seq_len = self.X_seq_len_placeholder
         else:
             X_seq_len = None
@@ -23,9 +25,11 @@ class RNN_CTC(Model):
 
         self.loss, decoded = self._setup_CTC(rnn_out, self.y_placeholder, X_seq_len, self.vocab_size) 
         self.decoded_train = self.decoded_infer = decoded
-        self.train_op, self.grad_norm = self._optimize(self.loss)
+        # The optimizer is only needed for training, inference restores the weights it trained
+        if not self.INFER:
+            self.train_op, self.grad_norm = self._optimize(self.loss)
 
-        if self.config.verbose:
+        if self.summaries:
             img = tf.expand_dims(tf.transpose(self.X_placeholder, [0,2,1]), -1)
             tf.summary.image("inputs", img , max_outputs=self.config.max_outputs)
 
@@ -36,7 +40,7 @@ class RNN_CTC(Model):
                                        config.rnn_type,
                                        config.rnn_num_units,
                                        config.rnn_num_residual_layers,
-                                       config.verbose)
+                                       self.summaries)
 
         with tf.variable_scope("rnn"):
             encoder = Encoder(params)
@@ -45,7 +49,7 @@ class RNN_CTC(Model):
             output_layer = tf.layers.Dense(vocab_size+1)
             outputs = output_layer(outputs)
 
-            if config.verbose:
+            if self.summaries:
                 variable_summaries(output_layer.trainable_weights[0], 'output_layer_weights')
                 variable_summaries(output_layer.trainable_weights[1], 'output_layer_biases')
                 variable_summaries(outputs, 'linear_projections')
@@ -0,0 +1,176 @@
+"""
+    Page level image work shared by line segmentation and recognition.
+
+    A PageContext converts a page to grayscale, binarizes it and estimates its skew
+    once, and deskews the whole page once. Line finding uses the Otsu binary of the
+    page, and recognition gets views of the page and of its Sauvola binary instead
+    of re-greying and re-binarizing every line crop.
+"""
+
+import cv2
+import numpy as np
+
+from .image_utils import otsu_binary
+from .utils.binarization import get_binarizer, get_gray_image
+
+MAX_SKEW_ANGLE = 5.0  # largest page skew searched for, in degrees
+SKEW_ANGLE_STEP = 0.25  # resolution of the skew search, in degrees
+MIN_SKEW_ANGLE = 0.25  # smaller skews are not worth rotating the page for
+SKEW_ESTIMATION_SIDE = 1000  # the skew is estimated on the binary page downscaled to this longest side
+BACKGROUND_SAMPLE_PIXELS = 250000  # pixels sampled to detect the background colour of a page
+
+def rotate_image(image, angle, border_value=255, interpolation=cv2.INTER_LINEAR):
+    """Rotates an image by angle degrees (counter clockwise) around its centre, keeping its size."""
+    h, w = image.shape[:2]
+    M = cv2.getRotationMatrix2D((w / 2, h / 2), angle, 1.0)
+
+    return cv2.warpAffine(image, M, (w, h), flags=interpolation, borderMode=cv2.BORDER_CONSTANT,
+                          borderValue=border_value)
+
+
+def estimate_skew_angle(bw, max_angle=MAX_SKEW_ANGLE, step=SKEW_ANGLE_STEP, max_side=SKEW_ESTIMATION_SIDE):
+    """
+    Estimates the skew of a page from the horizontal projection profile of its text.
+
+    Text lines are horizontal when the row sums of the binary page vary the most, so the page is
+    rotated over the candidate angles, whole degrees first and then step degrees around the best
+    one, and the angle with the sharpest profile is returned. Unlike
+    minAreaRect on the ink (_skew_correction), this works on whole pages with several lines,
+    headers and page numbers.
+
+    Args:
+        bw (np.ndarray): Binary page image, ink is 255.
+        max_angle (float): Angles from -max_angle to max_angle degrees are tried.
+        step (float): Step between the tried angles.
+        max_side (int): The page is downscaled to this longest side first.
+
+    Returns:
+        float: Angle in degrees the page has to be rotated by (see rotate_image) to deskew it.
+    """
+    scale = min(1.0, max_side / max(bw.shape[:2]))
+    if scale < 1.0:
+        bw = cv2.resize(bw, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+
+    if not bw.any():
+        return 0.0
+
+    def best_of(angles):
+        scores = [np.var(rotate_image(bw, angle, border_value=0, interpolation=cv2.INTER_NEAREST)
+                         .sum(axis=1, dtype=np.float64)) for angle in angles]
+        return float(angles[int(np.argmax(scores))])
+
+    # Whole degrees first, then the given step around the best one
+    coarse_angle = best_of(np.arange(-np.floor(max_angle), np.floor(max_angle) + 0.5, 1.0))
+    fine_angles = np.arange(coarse_angle - 1.0, coarse_angle + 1.0 + step / 2, step)
+
+    return best_of(fine_angles[np.abs(fine_angles) <= max_angle])
+
+
+class LineView():
+    """
+    A line of a page.
+
+    Attributes:
+        image (np.ndarray): View of the line on the deskewed BGR page.
+        box (tuple): (x, y, w, h) of the line on the deskewed page.
+        page_box (tuple): (x, y, w, h) of the line on the page as it was given, before deskewing.
+        binary (np.ndarray): View of the line on the binary page, which is only binarized when a line
+                             asks for it.
+    """
+
+    __slots__ = ("image", "box", "_page")
+
+    def __init__(self, image, box, page):
+        self.image = image
+        self.box = box
+        self._page = page
+
+    @property
+    def binary(self):
+        x, y, w, h = self.box
+        return self._page.binary[y:y + h, x:x + w]
+
+    @property
+    def page_box(self):
+        return self._page.page_box(self.box)
+
+    def __repr__(self):
+        return f"LineView(box={self.box})"
+
+
+class PageContext():
+    """
+    Grayscale, binary images and skew of a page, computed once and shared by segmentation and recognition.
+
+    Attributes:
+        image (np.ndarray): Deskewed BGR page.
+        gray (np.ndarray): Grayscale of the deskewed page.
+        bw (np.ndarray): Blurred, inverted Otsu binary of the deskewed page (ink is 255), used to find the lines.
+        skew_angle (float): Angle in degrees the page was rotated by, 0 if it was not rotated.
+        binary (np.ndarray): Sauvola binary of the deskewed page as recognition expects it (see
+                             utils.binarization.get_gray_image), computed on first use.
+    """
+
+    def __init__(self, page_img, deskew=True, max_skew_angle=MAX_SKEW_ANGLE):
+        if len(page_img.shape) == 2:
+            page_img = cv2.cvtColor(page_img, cv2.COLOR_GRAY2BGR)
+
+        gray, bw = otsu_binary(page_img)
+
+        self.skew_angle = 0.0
+        if deskew:
+            angle = estimate_skew_angle(bw, max_angle=max_skew_angle)
+            if abs(angle) >= MIN_SKEW_ANGLE:
+                page_img = rotate_image(page_img, angle, border_value=(255, 255, 255))
+                gray, bw = otsu_binary(page_img)
+                self.skew_angle = angle
+
+        self.image = page_img
+        self.gray = gray
+        self.bw = bw
+        self._binary = None
+
+    @property
+    def binary(self):
+        if self._binary is None:
+            # The background is detected on the whole page, where line crops used to detect it one by one
+            gray = get_gray_image(self.image, max_pixels=BACKGROUND_SAMPLE_PIXELS)
+            self._binary = get_binarizer().binarize(gray)
+        return self._binary
+
+    def line_views(self, boxes):
+        """
+        Args:
+            boxes (np.ndarray or list): (x, y, w, h) boxes of the lines on the deskewed page.
+
+        Returns:
+            list: LineView of each box, its image and binary are views of the page, not copies.
+        """
+        return [LineView(self.image[y:y + h, x:x + w], (x, y, w, h), self)
+                for x, y, w, h in np.asarray(boxes, dtype=np.int64).reshape(-1, 4).tolist()]
+
+    def page_box(self, box):
+        """
+        Maps a box of the deskewed page back to the page as it was given, through the inverse of the
+        rotation of the page.
+
+        Args:
+            box (tuple): (x, y, w, h) box on the deskewed page.
+
+        Returns:
+            tuple: (x, y, w, h) box around the rotated corners of the box, clipped to the page. The box
+                   itself if the page was not rotated.
+        """
+        if not self.skew_angle:
+            return tuple(box)
+
+        x, y, w, h = box
+        height, width = self.image.shape[:2]
+        M = cv2.invertAffineTransform(cv2.getRotationMatrix2D((width / 2, height / 2), self.skew_angle, 1.0))
+
+        corners = np.array([[x, y, 1], [x + w, y, 1], [x, y + h, 1], [x + w, y + h, 1]], dtype=np.float64)
+        points = corners @ M.T
+        x0, y0 = np.clip(np.floor(points.min(axis=0)), 0, (width, height)).astype(int)
+        x1, y1 = np.clip(np.ceil(points.max(axis=0)), 0, (width, height)).astype(int)
+
+        return int(x0), int(y0), int(x1 - x0), int(y1 - y0)
@@ -4,12 +4,13 @@
 
 import os
 import cv2
-from . import run_model
+from . import model_registry
+from .model_registry import DEFAULT_MODEL_CONFIG
 
 
-def get_model(model_config_path):
-    model, config= run_model.create_and_run_model(model_config_path)
-    return model
+def get_model(model_config_path=DEFAULT_MODEL_CONFIG):
+    """Return the shared model for the config, it is only built on the first call."""
+    return model_registry.get_model(model_config_path)
 
 
 def do_pred(image, model):
@@ -20,6 +21,27 @@ def do_pred(image, model):
     return predicted_text
 
 
+def do_batch_pred(images, model, max_batch=32, binarized=False):
+    """
+    Predict the text of several line images, batching them through the model.
+
+    Args:
+        images (list): Line images (np.ndarray, BGR).
+        model (Model): Model returned by get_model.
+        max_batch (int): Maximum number of lines per session run.
+        binarized (bool): The images are already binarized lines, e.g. from a PageContext.
+
+    Returns:
+        list: Predicted text of each line image, in the same order.
+    """
+    if not images:
+        return []
+
+    out, urdu_out = model.predict_batch(images, max_batch=max_batch, binarized=binarized)
+
+    return urdu_out
+
+
 def do_prediction(image):
     """
     Author : M.Zeeshan Javed
@@ -37,7 +59,7 @@ def do_prediction(image):
     # cv2.waitKey(0)
     # cv2.destroyAllWindows()
     # encoded, predicted_text = run_model.recognize_strip(model_config_path, image)
-    model = get_model('pdf_ocr_pipeline/configs/CNN_RNN_CTC/MMA-UD.json')
+    model = get_model(DEFAULT_MODEL_CONFIG)
     out, urdu_out = model(image)
 
     predicted_text = urdu_out[0]
@@ -45,13 +67,13 @@ def do_prediction(image):
     return predicted_text
 
 
-def bulk_predictions(input_path):
+def bulk_predictions(input_path, max_batch=32):
     """
     Process images from a directory or a single image, predict text, and save results to text files.
 
     Args:
         input_path (str): Path to a single image or directory containing images.
-        model (callable): The model used for prediction.
+        max_batch (int): Number of line images predicted together in one batch.
     """
 
     output_dir = "output/book_text_predictions"
@@ -59,8 +81,20 @@ def bulk_predictions(input_path):
         os.makedirs(output_dir)
         print(f"Created output directory: {output_dir}")
 
+    model = get_model(DEFAULT_MODEL_CONFIG)
     predictions = {}
 
+    # Images are read and predicted a few batches at a time to keep memory bounded on large directories,
+    # while still giving the width bucketing enough lines to group.
+    pending_names = []
+    pending_images = []
+
+    def predict_pending():
+        for name, text in zip(pending_names, do_batch_pred(pending_images, model, max_batch=max_batch)):
+            predictions[name] = text
+        pending_names.clear()
+        pending_images.clear()
+
     if os.path.isfile(input_path):
         # Process single image
         img_pth = input_path
@@ -72,8 +106,7 @@ def bulk_predictions(input_path):
             print(f"Error reading image {img_pth}. Skipping.")
             return
 
-        predicted_text = do_prediction(image)
-        predictions[img_name] = predicted_text
+        predictions[img_name] = do_pred(image, model)
 
     elif os.path.isdir(input_path):
         # Process all images in the directory
@@ -89,8 +122,12 @@ def bulk_predictions(input_path):
                     print(f"Error reading image {img_pth}. Skipping.")
                     continue
 
-                predicted_text = do_prediction(image)
-                predictions[img_name] = predicted_text
+                pending_names.append(img_name)
+                pending_images.append(image)
+                if len(pending_images) >= max_batch * 8:
+                    predict_pending()
+
+        predict_pending()
 
     else:
         raise ValueError("Provided path is neither a file nor a directory.")
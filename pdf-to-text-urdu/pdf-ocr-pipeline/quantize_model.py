@@ -0,0 +1,129 @@
+"""
+    Quantises the ONNX export of a recognition model (see export_model.py) to INT8 for CPU serving.
+
+    The modes are
+        - dynamic: the weights of the convolutions, dense layers and LSTMs are stored as
+          INT8 and the activations are quantised on the fly for every run. It needs no
+          calibration data and quantises the BiLSTM too.
+        - static: the activation ranges are measured once on calibration line images
+          (the images of the training data of the model config by default), so the
+          convolutions and dense layers run on INT8 without quantising on the fly.
+          onnxruntime keeps the LSTMs in float in this mode.
+
+    Serve the quantised model with "backend": "onnx" and "quantized": "True" in the model
+    config, or OCR_QUANTIZED=1 in the environment of a server process. Compare its CER and
+    speed with the float model with scripts/stats/quantization_report.py.
+
+    Run from the folder containing pdf_ocr_pipeline:
+        python -m pdf_ocr_pipeline.quantize_model pdf_ocr_pipeline/configs/CNN_RNN_CTC/MMA-UD.json \
+            [--mode static] [--calibration <line_images_dir>] [--output model.int8.onnx]
+"""
+
+import argparse
+import os
+import time
+
+import onnx
+from onnxruntime.quantization import CalibrationDataReader, QuantFormat, QuantType, quantize_dynamic, quantize_static
+
+from .export_model import load_line_images
+from .models.onnx_model import ONNX_INPUT, ONNX_SEQ_LEN_INPUT
+from .utils.config_utils import get_config
+from .utils.image_utils import handle_inferring_batch
+
+DYNAMIC = "dynamic"
+STATIC = "static"
+QUANTIZATION_MODES = (DYNAMIC, STATIC)
+
+
+class LineCalibrationReader(CalibrationDataReader):
+    """Feeds batches of preprocessed calibration line images to the static quantisation."""
+    def __init__(self, config, images, input_names, batch_size=32):
+        batches = handle_inferring_batch(images, config.image_size, flip_image=config.flip_image, max_batch=batch_size,
+                                         binarize_once=getattr(config, "binarize_once", False))
+        self.batches = [(X, seq_len) for X, seq_len, _ in batches]
+        self.input_names = input_names
+        self.index = 0
+
+    def get_next(self):
+        if self.index >= len(self.batches):
+            return None
+
+        X, seq_len = self.batches[self.index]
+        self.index += 1
+
+        feed = {ONNX_INPUT: X.astype("float32"), ONNX_SEQ_LEN_INPUT: seq_len.astype("int32")}
+        return {name: value for name, value in feed.items() if name in self.input_names}
+
+    def rewind(self):
+        self.index = 0
+
+
+def quantize_onnx(model_config_path, mode=DYNAMIC, calibration_dir=None, max_lines=500, input_path=None,
+                  output_path=None, per_channel=False, reduce_range=False):
+    """
+    Quantises the float ONNX model of a config.
+
+    Args:
+        model_config_path (str): Path to the model JSON config.
+        mode (str): "dynamic" or "static".
+        calibration_dir (str): Folder of calibration line images for the static mode, the images of the
+                               data_folder of the config by default.
+        max_lines (int): Calibration line images used.
+        input_path (str): Float ONNX model, the "onnx_model" of the config by default.
+        output_path (str): Quantised ONNX model, the "quantized_onnx_model" of the config or
+                           <input>.int8.onnx by default.
+        per_channel (bool): Quantise the weights of every output channel with their own range.
+        reduce_range (bool): Quantise the weights to 7 bits, more accurate on CPUs without VNNI.
+
+    Returns:
+        str: Path of the quantised model.
+    """
+    config = get_config(model_config_path)
+    input_path = input_path or config.onnx_model
+    output_path = output_path or getattr(config, "quantized_onnx_model", None) or \
+        os.path.splitext(input_path)[0] + ".int8.onnx"
+
+    if not os.path.isfile(input_path):
+        raise ValueError(f"ONNX model {input_path} not found, export it with export_model.py --format onnx")
+
+    tic = time.time()
+    if mode == DYNAMIC:
+        quantize_dynamic(input_path, output_path, per_channel=per_channel, reduce_range=reduce_range,
+                         weight_type=QuantType.QInt8)
+    elif mode == STATIC:
+        calibration_dir = calibration_dir or os.path.join(config.data_folder, "images")
+        _, images = load_line_images(calibration_dir, max_lines)
+        if not images:
+            raise ValueError(f"No calibration line images found in {calibration_dir}")
+
+        input_names = {model_input.name for model_input in onnx.load(input_path).graph.input}
+        reader = LineCalibrationReader(config, images, input_names)
+        print(f"Calibrating on {len(images)} lines of {calibration_dir}")
+
+        quantize_static(input_path, output_path, reader, quant_format=QuantFormat.QOperator,
+                        per_channel=per_channel, reduce_range=reduce_range,
+                        activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8)
+    else:
+        raise ValueError(f"Unknown quantization mode {mode}, expected one of {QUANTIZATION_MODES}")
+
+    print(f"Saved the {mode} quantized model to {output_path} ({os.path.getsize(input_path) / 2 ** 20:.1f} MB -> "
+          f"{os.path.getsize(output_path) / 2 ** 20:.1f} MB) in {time.time() - tic:.1f} secs.")
+    return output_path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Quantize the ONNX recognition model to INT8.")
+    parser.add_argument("model_config", help="path to the model JSON config")
+    parser.add_argument("--mode", choices=QUANTIZATION_MODES, default=DYNAMIC, help="quantization mode")
+    parser.add_argument("--calibration", help="folder of calibration line images (static mode)")
+    parser.add_argument("--max-lines", type=int, default=500, help="calibration line images used")
+    parser.add_argument("--input", help="float ONNX model")
+    parser.add_argument("--output", help="path of the quantized model")
+    parser.add_argument("--per-channel", action="store_true", help="per channel weight ranges")
+    parser.add_argument("--reduce-range", action="store_true", help="7 bit weights, for CPUs without VNNI")
+    args = parser.parse_args()
+
+    quantize_onnx(args.model_config, mode=args.mode, calibration_dir=args.calibration, max_lines=args.max_lines,
+                  input_path=args.input, output_path=args.output, per_channel=args.per_channel,
+                  reduce_range=args.reduce_range)
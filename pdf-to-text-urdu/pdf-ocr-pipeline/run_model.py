@@ -10,24 +10,73 @@ import time
 import logging
 
 
-# Import python scripts from utils and models folder
+# Import python scripts from utils and models folder, the tensorflow models are imported by the tensorflow backend
 from .utils.config_utils import get_config
-from .models.cnn_rnn_ctc import CNN_RNN_CTC
-from .models.rnn_ctc import RNN_CTC
-from .models.encoder_decoder import Encoder_Decoder
 # logging.basicConfig(level=logging.INFO)
 
+TENSORFLOW = "tensorflow"
+ONNX = "onnx"
+BACKENDS = (TENSORFLOW, ONNX)
 
-def create_and_run_model(model_config_path):
+# Serves the quantised onnx model (see quantize_model.py) in this process when set to 1, overriding "quantized"
+QUANTIZED_ENV = "OCR_QUANTIZED"
+
+
+def use_quantized_model(config, quantized=None):
+    """Returns whether the quantised onnx model is served, the argument, then OCR_QUANTIZED, then the config."""
+    if quantized is not None:
+        return quantized
+    if os.environ.get(QUANTIZED_ENV, "") != "":
+        return os.environ[QUANTIZED_ENV].strip().lower() in ("1", "true", "yes")
+    return getattr(config, "quantized", False)
+
+
+def create_and_run_model(model_config_path, use_inference_graph=True, backend=None, quantized=None):
     # print("run_mode.py -> create_and_run_model")
     # if eval_path is not None and infer:
     #     raise Exception("Both infer_path and eval_path are set. But cannot infer and evaluate at the same time.")
 
-    mappings = {'CNN_RNN_CTC': CNN_RNN_CTC, 'RNN_CTC': RNN_CTC, 'Encoder_Decoder': Encoder_Decoder}
     # Read all the configurations from config_name
     # print("    -- reading configs")
     config = get_config(model_config_path)
 
+    backend = backend or getattr(config, "backend", TENSORFLOW)
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown model backend {backend}, expected one of {BACKENDS}")
+
+    # The onnx export of the model (see export_model.py) runs on onnxruntime without importing tensorflow
+    if backend == ONNX:
+        onnx_model = getattr(config, "onnx_model", None)
+        if use_quantized_model(config, quantized):
+            quantized_model = getattr(config, "quantized_onnx_model", None)
+            if quantized_model and os.path.isfile(quantized_model):
+                onnx_model = quantized_model
+            else:
+                print(f"Quantized model {quantized_model} not found, using the float model. "
+                      f"Create it with quantize_model.py.")
+        if onnx_model and os.path.isfile(onnx_model):
+            from .models.onnx_model import OnnxModel
+
+            return OnnxModel(config, onnx_model), config
+        print(f"ONNX model {onnx_model} not found, using the tensorflow backend. Export it with export_model.py.")
+    elif use_quantized_model(config, quantized):
+        print("Quantized models are served by the onnx backend only, using the float tensorflow model.")
+
+    from .models.cnn_rnn_ctc import CNN_RNN_CTC
+    from .models.rnn_ctc import RNN_CTC
+    from .models.encoder_decoder import Encoder_Decoder
+    from .models.inference_model import InferenceModel
+
+    mappings = {'CNN_RNN_CTC': CNN_RNN_CTC, 'RNN_CTC': RNN_CTC, 'Encoder_Decoder': Encoder_Decoder}
+
+    # The frozen inference graph (see export_model.py) is loaded instead of building the model when it exists
+    inference_graph = getattr(config, "inference_graph", None)
+    if use_inference_graph and inference_graph:
+        if os.path.isfile(inference_graph):
+            return InferenceModel(config, inference_graph), config
+        print(f"Inference graph {inference_graph} not found, building the model from its checkpoint. "
+              f"Export it with export_model.py.")
+
     eval_path = None
     # ** Loading the model for example if CNN_RNN_CTC is called the model from /models/cnn_rnn_ctc.py will be loaded
     model = mappings[config.model](config, eval_path, infer= True)
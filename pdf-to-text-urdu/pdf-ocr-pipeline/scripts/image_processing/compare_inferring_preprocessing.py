@@ -0,0 +1,148 @@
+"""
+    Compares the binarize once line preprocessing (InferringPreprocessing) with the
+    three pass ImagePreprocessing(INFERRING) + _binarize preprocessing on a folder of
+    line images, and reports how often they agree and how long each one takes.
+
+    With --model-config the model also recognises held-out labelled lines (images/ and
+    labels/gt_char.csv) with both preprocessings and the CER of each is reported. Set
+    "binarize_once" in the model config only if the CER does not regress.
+
+    Run with the folder containing pdf_ocr_pipeline on the PYTHONPATH:
+        PYTHONPATH=. python pdf_ocr_pipeline/scripts/image_processing/compare_inferring_preprocessing.py <lines_dir>
+        PYTHONPATH=. python pdf_ocr_pipeline/scripts/image_processing/compare_inferring_preprocessing.py \
+            --model-config <model_config> --data-folder <held_out_data_folder> [--max-lines 2000]
+"""
+
+import argparse
+import os
+import time
+
+import cv2
+import numpy as np
+
+from pdf_ocr_pipeline.utils.image_utils import (ImagePreprocessing, InferringPreprocessing, INFERRING, _binarize,
+                                                _resize_image)
+
+IMAGE_SIZE = (None, 64)  # image_size of configs/CNN_RNN_CTC/MMA-UD.json
+
+
+def three_pass_preprocessing(image, preprocessor):
+    return _binarize(preprocessor(image, save_path=None), blur=True)
+
+
+def compare_line(image, old_preprocessor, new_preprocessor):
+    """
+    Returns:
+        dict: Whether both binarized crops have the same shape, the share of equal pixels of the crops,
+              the mean absolute difference of the resized features and the time of both preprocessings.
+    """
+    start = time.perf_counter()
+    old_binary = three_pass_preprocessing(image, old_preprocessor)
+    old_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    new_binary = new_preprocessor(image)
+    new_time = time.perf_counter() - start
+
+    same_shape = old_binary.shape == new_binary.shape
+    result = {
+        "same_shape": same_shape,
+        "pixel_agreement": float((old_binary == new_binary).mean()) if same_shape else None,
+        "feature_difference": None,
+        "old_time": old_time,
+        "new_time": new_time,
+    }
+
+    old_feature, _ = _resize_image(old_binary, IMAGE_SIZE)
+    new_feature, _ = _resize_image(new_binary, IMAGE_SIZE)
+    if old_feature.shape == new_feature.shape:
+        result["feature_difference"] = float(np.abs(old_feature.astype(float) - new_feature.astype(float)).mean()) / 255
+
+    return result
+
+
+def compare_directory(lines_dir):
+    old_preprocessor = ImagePreprocessing(INFERRING)
+    new_preprocessor = InferringPreprocessing()
+
+    results = []
+    for file_name in sorted(os.listdir(lines_dir)):
+        image = cv2.imread(os.path.join(lines_dir, file_name))
+        if image is None:
+            continue
+
+        results.append(compare_line(image, old_preprocessor, new_preprocessor))
+
+    if not results:
+        print(f"No line images in {lines_dir}")
+        return
+
+    same_shape = [r for r in results if r["same_shape"]]
+    differences = [r["feature_difference"] for r in results if r["feature_difference"] is not None]
+    old_time = sum(r["old_time"] for r in results)
+    new_time = sum(r["new_time"] for r in results)
+
+    print(f"Lines: {len(results)}")
+    print(f"Same crop: {len(same_shape)}/{len(results)}")
+    if same_shape:
+        print(f"Mean pixel agreement of same crops: {np.mean([r['pixel_agreement'] for r in same_shape]):.4f}")
+    if differences:
+        print(f"Mean feature difference (0-1): {np.mean(differences):.4f}")
+    print(f"Three pass: {old_time / len(results) * 1000:.2f} ms/line, "
+          f"binarize once: {new_time / len(results) * 1000:.2f} ms/line, speed up: {old_time / new_time:.2f}x")
+
+
+def compare_cer(model_config_path, data_folder, max_lines=None, max_batch=32):
+    """
+    Recognises labelled lines with the three pass and the binarize once preprocessing.
+
+    Returns:
+        dict: The CER of both preprocessings and the number of lines decoded differently.
+    """
+    from pdf_ocr_pipeline.run_model import create_and_run_model
+    from pdf_ocr_pipeline.utils.accuracy_metrics import character_error_rate
+    from pdf_ocr_pipeline.utils.data_utils import load_labelled_lines
+
+    model, config = create_and_run_model(model_config_path)
+    images, labels = load_labelled_lines(data_folder, config.char_or_lig, max_lines)
+    if not images:
+        raise ValueError(f"No labelled line images found in {data_folder}")
+
+    preds = {}
+    for binarize_once in (False, True):
+        # predict_batch reads binarize_once from the model config on every call, configs are namedtuples
+        model.config = config._replace(binarize_once=binarize_once)
+        preds[binarize_once], _ = model.predict_batch(images, max_batch=max_batch)
+    model.close()
+
+    result = {"lines": len(images),
+              "three_pass_cer": character_error_rate(labels, preds[False]),
+              "binarize_once_cer": character_error_rate(labels, preds[True]),
+              "lines_decoded_differently": sum(list(old) != list(new) for old, new in zip(preds[False], preds[True]))}
+
+    print(f"Lines: {result['lines']} of {data_folder}")
+    print(f"CER three pass: {result['three_pass_cer'] * 100:.2f}%, binarize once: "
+          f"{result['binarize_once_cer'] * 100:.2f}% "
+          f"({(result['binarize_once_cer'] - result['three_pass_cer']) * 100:+.2f} points)")
+    print(f"Lines decoded differently: {result['lines_decoded_differently']}/{result['lines']}")
+
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the binarize once and the three pass line preprocessing.")
+    parser.add_argument("lines_dir", nargs="?", help="folder of line images whose crops are compared")
+    parser.add_argument("--model-config", help="model JSON config, compares the CER of both preprocessings")
+    parser.add_argument("--data-folder", help="held-out labelled lines for the CER comparison")
+    parser.add_argument("--max-lines", type=int, help="labelled lines compared")
+    args = parser.parse_args()
+
+    if args.model_config and not args.data_folder:
+        parser.error("--model-config needs a held-out --data-folder, not the training data of the config")
+    if not args.lines_dir and not args.model_config:
+        parser.error("give a lines_dir, a --model-config or both")
+
+    if args.lines_dir:
+        compare_directory(args.lines_dir)
+    if args.model_config:
+        compare_cer(args.model_config, args.data_folder, args.max_lines)
@@ -9,75 +9,34 @@
 import os
 import re
 import shutil
-import sys
 
 import cv2
-import numpy as np
 import pandas as pd
-from pdf2image import convert_from_path
 
 
-def is_image_completely_blank(image):
+def pdf_to_page_images(pdf_path, thread_count=1):
     """
-    Check if an image is completely blank (white).
-
-    Args:
-        image (PIL.Image.Image): Image object.
-
-    Returns:
-        bool: True if image is completely blank, False otherwise.
-    """
-    grayscale_image = image.convert("L")
-    extrema = grayscale_image.getextrema()
-    return extrema == (255, 255)
-
-
-def pdf_to_page_images(pdf_path):
-    """
-    Convert each page of a PDF to an image and save it in the specified output directory.
+    Lazily convert each page of a PDF to an image, a few pages at a time, so a page
+    is freed once it is consumed.
 
     Args:
         pdf_path (str): Path to the PDF file.
+        thread_count (int): Number of pdftoppm processes rendering the pages at once.
 
-    Returns:
-        dict: A dictionary where the key is the image filename and the value is the image.
+    Yields:
+        tuple: The image filename and the OpenCV image of each page that is not blank.
     """
-    useful_images = {}
+    from pdf_ocr_pipeline.convert_to_pages import iter_pdf_pages
 
     # Extract the name of the book from the PDF filename
     book_name = pdf_path.split("/")[-1].replace(".pdf", "")
 
     print(f"Processing {book_name}")
 
-    # Convert PDF pages to images
-    images = convert_from_path(pdf_path)
-
-    # Get the total number of pages in the PDF
-    total_pages = len(images)
-
-    # Process each page with tqdm progress bar
-    for index, image in enumerate(images):
-        page_number = index + 1
-
-        # Print the progress on the same line (page_number/total_pages)
-        sys.stdout.write(f"\rProcessing page {page_number}/{total_pages}")
-        sys.stdout.flush()
-
-        # Check if the image is blank
-        if is_image_completely_blank(image):
-            print(f"\nPage {page_number} is completely blank. Skipping.")
-        else:
-            # Generate the filename for the image
-            filename = f"{book_name}_pg{page_number}.jpg"
-
-            # Add the image to the useful_images dictionary
-            useful_images[filename] = image
+    yield from iter_pdf_pages(pdf_path, book_name=book_name, thread_count=thread_count)
 
     print()  # Print a new line after all pages are processed
 
-    # Return the dictionary of useful images
-    return useful_images
-
 
 def extract_page_number(line):
     """
@@ -147,17 +106,26 @@ def save_text_pages(pages, output_dir):
             file.write('\n'.join(content))
 
 
-def save_image_pages(page_images, output_dir):
+def save_image_pages(page_images, output_dir, misc_output_dir=None, keep_keys=None):
     """
-    Given the dictionary of the page image and image name, saves it to the
-    specified output directory.
+    Saves the page images to the specified output directory as they are converted.
 
     Args:
-        page_images (dict): A dictionary where key is the name of the file with extension
-                            and the value is the image content.
+        page_images (iterable): (name of the file with extension, OpenCV image) pairs, e.g. from pdf_to_page_images.
+        output_dir (str): Output directory of the pages whose key is in keep_keys.
+        misc_output_dir (str): Output directory of the other pages.
+        keep_keys (set): Names of the files without extension saved to output_dir, all pages if None.
+
+    Returns:
+        set: Names of all the saved files without extension.
     """
-    for key, image in page_images.items():
-        image.save(os.path.join(output_dir, str(key)))  # image is a PIL <image>
+    image_keys = set()
+    for key, image in page_images:
+        image_keys.add(key[:-4])
+        save_dir = output_dir if keep_keys is None or key[:-4] in keep_keys else misc_output_dir
+        cv2.imwrite(os.path.join(save_dir, str(key)), image)
+
+    return image_keys
 
 
 def remove_recreate_dir(dir_pth):
@@ -243,7 +211,7 @@ def lines_from_page_image(image):
     return line_imgs
 
 
-def pdf_to_pages(path, extract_images=True, extract_texts=False):
+def pdf_to_pages(path, extract_images=True, extract_texts=False, thread_count=os.cpu_count()):
     """
     Convert PDFs to images and texts, and save them in corresponding directories.
 
@@ -251,6 +219,7 @@ def pdf_to_pages(path, extract_images=True, extract_texts=False):
         path (str): Can be a path to a pdf or a directory containing the pdfs
         extract_images (bool): Flag to determine if images should be extracted and saved.
         extract_texts (bool): Flag to determine if texts should be extracted and saved.
+        thread_count (int): Number of pdftoppm processes rendering the pages of a PDF at once.
 
     Note:
         ** Main issue is for some pages which have Arabic and English text,
@@ -303,26 +272,23 @@ def pdf_to_pages(path, extract_images=True, extract_texts=False):
         image_keys = set()
         text_keys = set()
 
-        if extract_images:
-            print(f"============== Extracting Images ==============")
-            page_images = pdf_to_page_images(book_pdf_pth)
-            image_keys = set([key[:-4] for key in page_images.keys()])
-
+        # Texts are extracted first, so each page image is saved to its folder as soon as it is converted
         if extract_texts:
             print(f"============== Extracting Text ==============")
             page_texts = pages_from_book_txt(book_txt_pth)
             text_keys = set([key[:-4] for key in page_texts.keys()])
 
+        if extract_images:
+            print(f"============== Extracting Images ==============")
+            image_keys = save_image_pages(pdf_to_page_images(book_pdf_pth, thread_count),
+                                          output_images_dir, misc_images_dir,
+                                          keep_keys=text_keys if extract_texts else None)
+
         mutual_keys = image_keys & text_keys if extract_images and extract_texts else image_keys if extract_images else text_keys if extract_texts else set()
 
         misc_image_keys = [key for key in image_keys if key not in mutual_keys]
         misc_text_keys = [key for key in text_keys if key not in mutual_keys]
 
-        filtered_page_images = {f"{key}.jpg": page_images[f"{key}.jpg"] for key in
-                                mutual_keys} if extract_images else {}
-        misc_page_images = {f"{key}.jpg": page_images[f"{key}.jpg"] for key in
-                            misc_image_keys} if extract_images else {}
-
         filtered_page_texts = {f"{key}.txt": page_texts[f"{key}.txt"] for key in mutual_keys} if extract_texts else {}
         misc_page_texts = {f"{key}.txt": page_texts[f"{key}.txt"] for key in misc_text_keys} if extract_texts else {}
 
@@ -335,9 +301,6 @@ def pdf_to_pages(path, extract_images=True, extract_texts=False):
             'total_relevant_data': len(mutual_keys)
         }
 
-        if extract_images:
-            save_image_pages(filtered_page_images, output_images_dir)
-            save_image_pages(misc_page_images, misc_images_dir)
         if extract_texts:
             save_text_pages(filtered_page_texts, output_texts_dir)
             save_text_pages(misc_page_texts, misc_texts_dir)
@@ -470,7 +433,8 @@ def page_to_lines(path, extract_images=True, extract_texts=False):
     print(f"Processing complete. Stats saved to {os.path.join(main_output_dir, 'Pages_To_Lines.csv')}")
 
 
-def pdf_to_pages_and_lines(path, extract_images=True, extract_texts=False, model=None, predict=False):
+def pdf_to_pages_and_lines(path, extract_images=True, extract_texts=False, model=None, predict=False,
+                           thread_count=os.cpu_count()):
     """
     Convert PDFs to images and texts, and then convert those pages to line images and texts,
     saving them in corresponding directories based on flags.
@@ -481,6 +445,7 @@ def pdf_to_pages_and_lines(path, extract_images=True, extract_texts=False, model
         extract_texts (bool): Flag to determine if texts should be extracted and saved.
         model (object): Model to use for predictions if predict flag is True.
         predict (bool): Flag to determine if predictions on line images should be performed.
+        thread_count (int): Number of pdftoppm processes rendering the pages of a PDF at once.
     """
     main_output_dir = "Output/Book Pages"
 
@@ -525,26 +490,23 @@ def pdf_to_pages_and_lines(path, extract_images=True, extract_texts=False, model
         image_keys = set()
         text_keys = set()
 
-        if extract_images:
-            print(f"============== Extracting Images ==============")
-            page_images = pdf_to_page_images(book_pdf_pth)
-            image_keys = set([key[:-4] for key in page_images.keys()])
-
+        # Texts are extracted first, so each page image is saved to its folder as soon as it is converted
         if extract_texts:
             print(f"============== Extracting Text ==============")
             page_texts = pages_from_book_txt(book_txt_pth)
             text_keys = set([key[:-4] for key in page_texts.keys()])
 
+        if extract_images:
+            print(f"============== Extracting Images ==============")
+            image_keys = save_image_pages(pdf_to_page_images(book_pdf_pth, thread_count),
+                                          output_images_dir, misc_images_dir,
+                                          keep_keys=text_keys if extract_texts else None)
+
         mutual_keys = image_keys & text_keys if extract_images and extract_texts else image_keys if extract_images else text_keys if extract_texts else set()
 
         misc_image_keys = [key for key in image_keys if key not in mutual_keys]
         misc_text_keys = [key for key in text_keys if key not in mutual_keys]
 
-        filtered_page_images = {f"{key}.jpg": page_images[f"{key}.jpg"] for key in
-                                mutual_keys} if extract_images else {}
-        misc_page_images = {f"{key}.jpg": page_images[f"{key}.jpg"] for key in
-                            misc_image_keys} if extract_images else {}
-
         filtered_page_texts = {f"{key}.txt": page_texts[f"{key}.txt"] for key in mutual_keys} if extract_texts else {}
         misc_page_texts = {f"{key}.txt": page_texts[f"{key}.txt"] for key in misc_text_keys} if extract_texts else {}
 
@@ -557,9 +519,6 @@ def pdf_to_pages_and_lines(path, extract_images=True, extract_texts=False, model
             'total_relevant_data': len(mutual_keys)
         }
 
-        if extract_images:
-            save_image_pages(filtered_page_images, output_images_dir)
-            save_image_pages(misc_page_images, misc_images_dir)
         if extract_texts:
             save_text_pages(filtered_page_texts, output_texts_dir)
             save_text_pages(misc_page_texts, misc_texts_dir)
@@ -574,15 +533,15 @@ def pdf_to_pages_and_lines(path, extract_images=True, extract_texts=False, model
             from predict_and_save import do_prediction
 
             print(f"============== Making Predictions for {pdf_name} ==============")
-            for key, pil_image in filtered_page_images.items():
-                print(f"Predicting {key[:-4]}")
+            for key in (mutual_keys if extract_images else []):
+                print(f"Predicting {key}")
 
-                open_cv_image = cv2.cvtColor(np.array(pil_image), cv2.COLOR_RGB2BGR)
+                open_cv_image = cv2.imread(os.path.join(output_images_dir, f"{key}.jpg"))
                 page_lines_images = lines_from_page_image(open_cv_image)
 
 
                 # Create or open a text file to save predictions for the page
-                prediction_file_path = os.path.join(output_pred_dir, str(key.replace(".jpg", ".txt")))
+                prediction_file_path = os.path.join(output_pred_dir, f"{key}.txt")
                 with open(prediction_file_path, "w") as pred_file:
                     for line_image in page_lines_images:
                         prediction = do_prediction(line_image)
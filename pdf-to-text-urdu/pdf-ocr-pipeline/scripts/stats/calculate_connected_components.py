@@ -1,7 +1,19 @@
+"""
+    Counts the connected components of every line image of a dataset folder and saves them to an Excel file.
+
+    Run with the folder containing pdf_ocr_pipeline on the PYTHONPATH:
+        PYTHONPATH=. python pdf_ocr_pipeline/scripts/stats/calculate_connected_components.py <images_dir> [workers]
+"""
+
 import os
-import cv2
+import sys
+
 import pandas as pd
-from bookwise_no_of_pages_and_lines import get_book_names, get_page_count, get_line_count
+
+from pdf_ocr_pipeline.utils.binarization import directory_connected_components, image_connected_components
+
+INK_THRESHOLD = 127  # gray levels up to this are ink
+
 
 def calculate_connected_components(image_path):
     """
@@ -10,48 +22,39 @@ def calculate_connected_components(image_path):
     :param image_path: Path to the image file.
     :return: Number of connected components.
     """
-    # Read the image in grayscale
-    image = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
-
-    # Threshold the image to binary (you may need to adjust the threshold value)
-    _, binary_image = cv2.threshold(image, 127, 255, cv2.THRESH_BINARY_INV)
+    count, _ = image_connected_components(image_path, threshold=INK_THRESHOLD)
 
-    # Find connected components
-    num_labels, _ = cv2.connectedComponents(binary_image)
+    return count
 
-    # Since the first component is the background, subtract 1
-    return num_labels - 1
 
-def process_images_and_store_connected_components(dir_path):
+def process_images_and_store_connected_components(dir_path, workers=None):
     """
     Processes images to calculate connected components and stores the result in an Excel file.
+    The images are processed by a pool of worker processes.
 
     :param dir_path: Directory path where the images are stored.
+    :param workers: Number of processes, all CPUs by default.
     :return: None
     """
-    file_names = os.listdir(dir_path)
+    components = directory_connected_components(dir_path, threshold=INK_THRESHOLD, workers=workers)
 
     data = []
 
-    for file_name in file_names:
+    for file_name, (count, stats) in components.items():
         try:
             parts = file_name.split("_")
             book_name = parts[0]
             page_num = parts[1].replace("pg", "")
             line_num = parts[2].replace("ln", "").replace(".jpg", "")
 
-            # Full path to the image file
-            image_path = os.path.join(dir_path, file_name)
-
-            # Calculate connected components
-            connected_components = calculate_connected_components(image_path)
-
             # Append the results to the data list
             data.append({
                 "Book Name": book_name,
                 "Page Number": page_num,
                 "Line Number": line_num,
-                "Connected Components": connected_components
+                "Connected Components": count,
+                "Mean Component Area": float(stats[:, 4].mean()) if count else 0.0,
+                "Max Component Height": int(stats[:, 3].max()) if count else 0,
             })
 
         except Exception as e:
@@ -66,6 +69,9 @@ def process_images_and_store_connected_components(dir_path):
 
     print(f"Connected components data saved to {output_path}")
 
-# Example usage
-dir_path = "Final Dataset Backup/Test/images"
-process_images_and_store_connected_components(dir_path)
+
+if __name__ == "__main__":
+    # Example usage
+    dir_path = sys.argv[1] if len(sys.argv) > 1 else "Final Dataset Backup/Test/images"
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    process_images_and_store_connected_components(dir_path, workers=workers)
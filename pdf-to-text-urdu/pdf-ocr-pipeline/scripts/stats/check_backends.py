@@ -0,0 +1,39 @@
+"""
+    Checks that the exported model of a config (the "onnx_model" or the "inference_graph")
+    recognises the fixture line images (fixtures/lines) like the TensorFlow checkpoint, e.g.
+    after retraining or upgrading onnxruntime, without exporting the model again. Exits with 1
+    if any line is decoded differently or the exported model does not exist.
+
+    Run with the folder containing pdf_ocr_pipeline on the PYTHONPATH:
+        PYTHONPATH=. python pdf_ocr_pipeline/scripts/stats/check_backends.py <model_config> \
+            [--format onnx] [--lines-dir <lines_dir>]
+"""
+
+import argparse
+import os
+import sys
+
+from pdf_ocr_pipeline.export_model import EXPORT_FORMATS, FIXTURE_LINES_DIR, ONNX, verify_export
+from pdf_ocr_pipeline.utils.config_utils import get_config
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check an exported model against its checkpoint.")
+    parser.add_argument("model_config", help="path to the model JSON config")
+    parser.add_argument("--format", choices=EXPORT_FORMATS, default=ONNX, help="backend checked")
+    parser.add_argument("--lines-dir", default=FIXTURE_LINES_DIR, help="folder of line images, the fixture lines "
+                                                                       "by default")
+    parser.add_argument("--max-lines", type=int, help="line images checked")
+    args = parser.parse_args()
+
+    config = get_config(args.model_config)
+    if args.format == ONNX:
+        path = getattr(config, "onnx_model", None)
+    else:
+        from pdf_ocr_pipeline.models.inference_model import default_inference_graph_path
+        path = getattr(config, "inference_graph", None) or default_inference_graph_path(config)
+
+    if not path or not os.path.isfile(path):
+        sys.exit(f"The {args.format} model {path} does not exist, export it with export_model.py.")
+
+    if not verify_export(args.model_config, args.format, path, args.lines_dir, args.max_lines):
+        sys.exit(1)
@@ -0,0 +1,101 @@
+"""
+    Checks that recognising lines in padded batches (LineRecogniser.predict_batch) gives the same
+    result as recognising every line alone (handle_inferring), on the fixture lines by default.
+
+    Without a model the features are compared: the steps of every line of a batch must equal its
+    single line features and its padding must be zeros. With --model-config the model recognises the
+    lines both ways and the label ids of every line are compared. The script exits with 1 on any
+    mismatch.
+
+    Run with the folder containing pdf_ocr_pipeline on the PYTHONPATH:
+        PYTHONPATH=. python pdf_ocr_pipeline/scripts/stats/check_batched_inference.py [--lines-dir <lines_dir>]
+        PYTHONPATH=. python pdf_ocr_pipeline/scripts/stats/check_batched_inference.py --model-config <model_config>
+"""
+
+import argparse
+import os
+import sys
+
+import cv2
+import numpy as np
+
+from pdf_ocr_pipeline.utils.image_utils import handle_inferring, handle_inferring_batch
+
+FIXTURE_LINES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "fixtures", "lines")
+IMAGE_SIZE = (None, 64)  # image_size of configs/CNN_RNN_CTC/MMA-UD.json
+
+
+def load_lines(lines_dir):
+    images = []
+    for file_name in sorted(os.listdir(lines_dir)):
+        image = cv2.imread(os.path.join(lines_dir, file_name))
+        if image is not None:
+            images.append(image)
+
+    return images
+
+
+def check_features(images, image_size=IMAGE_SIZE, flip_image=True, max_batch=32):
+    """
+    Returns:
+        int: Number of lines whose batched features differ from their single line features.
+    """
+    mismatches = 0
+    for X_batch, X_batch_seq_len, indices in handle_inferring_batch(images, image_size, flip_image=flip_image,
+                                                                    buckets=1, max_batch=max_batch):
+        for row, i in enumerate(indices):
+            single, _ = handle_inferring(images[i], image_size, flip_image=flip_image)
+            steps = X_batch_seq_len[row]
+            if not np.array_equal(X_batch[row, :steps], single[0]) or X_batch[row, steps:].any():
+                print(f"Line {i}: batched features differ from its single line features")
+                mismatches += 1
+
+    return mismatches
+
+
+def check_predictions(images, model_config_path, max_batch=32):
+    """
+    Returns:
+        int: Number of lines recognised differently in a batch and alone.
+    """
+    from pdf_ocr_pipeline.run_model import create_and_run_model
+
+    model, _ = create_and_run_model(model_config_path)
+    try:
+        batch_out, _ = model.predict_batch(images, max_batch=max_batch, buckets=1)
+        single_out = [list(model(image)[0][0]) for image in images]
+    finally:
+        model.close()
+
+    mismatches = 0
+    for i, (batched, single) in enumerate(zip(batch_out, single_out)):
+        if list(batched) != single:
+            print(f"Line {i}: batched {list(batched)} != single {single}")
+            mismatches += 1
+
+    return mismatches
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check batched line recognition against single line recognition.")
+    parser.add_argument("--lines-dir", default=FIXTURE_LINES_DIR, help="folder of line images, the fixture lines "
+                                                                       "by default")
+    parser.add_argument("--model-config", help="model JSON config, also compares the recognised labels")
+    parser.add_argument("--max-batch", type=int, default=32, help="lines per batch")
+    args = parser.parse_args()
+
+    images = load_lines(args.lines_dir)
+    if not images:
+        sys.exit(f"No line images in {args.lines_dir}")
+
+    mismatches = 0
+    for flip_image in (True, False):
+        mismatches += check_features(images, flip_image=flip_image, max_batch=args.max_batch)
+    print(f"Features: {len(images)} lines, {mismatches} mismatches")
+
+    if args.model_config:
+        prediction_mismatches = check_predictions(images, args.model_config, max_batch=args.max_batch)
+        print(f"Predictions: {len(images)} lines, {prediction_mismatches} mismatches")
+        mismatches += prediction_mismatches
+
+    sys.exit(1 if mismatches else 0)
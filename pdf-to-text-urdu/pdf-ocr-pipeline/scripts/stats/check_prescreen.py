@@ -0,0 +1,93 @@
+"""
+    Checks which synthetic 36 DPI page thumbnails the prescreen skips (image_utils.is_non_text_thumbnail):
+    blank pages and photo like figures with at most a one line caption are skipped, text pages, figures
+    with a caption of two lines and line drawings are kept. Exits with 1 on any mismatch.
+
+    Run with the folder containing pdf_ocr_pipeline on the PYTHONPATH:
+        PYTHONPATH=. python pdf_ocr_pipeline/scripts/stats/check_prescreen.py
+"""
+
+import sys
+
+import cv2
+import numpy as np
+
+from pdf_ocr_pipeline.image_utils import is_non_text_thumbnail, thumbnail_text_stats
+
+THUMBNAIL_SIZE = (421, 298)  # A4 page at 36 DPI
+LINE_SPACING = 14
+FIGURE_BOX = (40, 60, 258, 300)  # x0, y0, x1, y1
+
+
+def blank_page():
+    return np.full(THUMBNAIL_SIZE, 255, np.uint8)
+
+
+def draw_text_line(page, y, x0=40, x1=258, height=6):
+    """Draws a line of word like strokes of varying height."""
+    rng = np.random.default_rng(y)
+    for x in range(x0, x1, 3):
+        if rng.random() < 0.7:
+            page[y + rng.integers(0, 2):y + height - rng.integers(0, 2), x:x + 2] = 60
+
+
+def draw_photo(page):
+    x0, y0, x1, y1 = FIGURE_BOX
+    page[y0:y1, x0:x1] = np.random.default_rng(0).integers(0, 200, (y1 - y0, x1 - x0))
+
+
+def draw_line_drawing(page):
+    x0, y0, x1, y1 = FIGURE_BOX
+    cv2.rectangle(page, (x0, y0), (x1, y1), 0, 1)
+    cv2.line(page, (x0, y0), (x1, y1), 0, 1)
+    cv2.circle(page, ((x0 + x1) // 2, (y0 + y1) // 2), 80, 0, 1)
+
+
+def make_page(figure=None, caption_lines=0, text_lines=0):
+    page = blank_page()
+    if figure is not None:
+        figure(page)
+
+    caption_top = FIGURE_BOX[3] + 20
+    for index in range(caption_lines):
+        draw_text_line(page, caption_top + index * 12)
+    for index in range(text_lines):
+        draw_text_line(page, 50 + index * LINE_SPACING)
+
+    return page
+
+
+# (name, thumbnail, whether it is skipped)
+CASES = [
+    ("blank", make_page(), True),
+    ("text", make_page(text_lines=24), False),
+    ("photo", make_page(draw_photo), True),
+    ("photo with a one line caption", make_page(draw_photo, caption_lines=1), True),
+    ("photo with a two line caption", make_page(draw_photo, caption_lines=2), False),
+    ("line drawing", make_page(draw_line_drawing), False),
+    ("line drawing with a caption", make_page(draw_line_drawing, caption_lines=1), False),
+]
+
+
+def check_prescreen(cases=CASES):
+    """
+    Returns:
+        int: Number of thumbnails skipped or kept against expectation.
+    """
+    mismatches = 0
+    for name, thumbnail, expected in cases:
+        skipped = is_non_text_thumbnail(thumbnail)
+        ink_density, text_lines, figure_ink_share = thumbnail_text_stats(thumbnail)
+        print(f"{name}: {'skipped' if skipped else 'kept'} (ink density {ink_density:.3f}, {text_lines} text lines, "
+              f"figure ink share {figure_ink_share:.2f})")
+        if skipped != expected:
+            print(f"  expected {'skipped' if expected else 'kept'}")
+            mismatches += 1
+
+    return mismatches
+
+
+if __name__ == "__main__":
+    mismatches = check_prescreen()
+    print(f"Thumbnails: {len(CASES)}, {mismatches} mismatches")
+    sys.exit(1 if mismatches else 0)
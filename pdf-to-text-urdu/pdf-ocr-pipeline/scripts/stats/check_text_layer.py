@@ -0,0 +1,43 @@
+"""
+    Checks that words of a PDF text layer are put back in logical order (text_layer._logical_word),
+    in particular words with presentation form ligatures (lam alef, Allah), whose letters are already
+    in logical order once the glyph is mapped. Exits with 1 on any mismatch.
+
+    Run with the folder containing pdf_ocr_pipeline on the PYTHONPATH:
+        PYTHONPATH=. python pdf_ocr_pipeline/scripts/stats/check_text_layer.py
+"""
+
+import sys
+
+from pdf_ocr_pipeline.text_layer import _logical_word
+
+# (glyphs of a word from left to right as pdfplumber reads them, logical text)
+CASES = [
+    ("ﻻ", "لا"),  # lam alef ligature
+    ("ﷲ", "الله"),  # Allah ligature
+    ("ﻡﻼﺳ", "سلام"),  # salam: meem, final lam alef, initial seen
+    ("ﷲﻢﺴﺑ", "بسمالله"),  # bismillah written as one word
+    ("مالس", "سلام"),  # salam in base letters
+    ("page", "page"),  # latin words are kept as they are
+]
+
+
+def check_logical_words(cases=CASES):
+    """
+    Returns:
+        int: Number of words not put back in logical order.
+    """
+    mismatches = 0
+    for visual, expected in cases:
+        actual = _logical_word(visual)
+        if actual != expected:
+            print(f"{visual!r}: {actual!r} != {expected!r}")
+            mismatches += 1
+
+    return mismatches
+
+
+if __name__ == "__main__":
+    mismatches = check_logical_words()
+    print(f"Words: {len(CASES)}, {mismatches} mismatches")
+    sys.exit(1 if mismatches else 0)
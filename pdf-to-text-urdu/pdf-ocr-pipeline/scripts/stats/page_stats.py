@@ -204,8 +204,9 @@ def update_excel_with_comparisons(excel_file_path, txt_directory, pdf_directory)
     except Exception as e:
         print(f"Unexpected error: {e}")
 
-# Example usage
-excel_file_path = 'page_line_counts_extracted.xlsx'
-txt_directory = '/home/cle-dl-05/Documents/3.PdfOCR/2.Datasets/1.Raw/Annotated Books'
-pdf_directory = '/home/cle-dl-05/Documents/3.PdfOCR/2.Datasets/1.Raw/Annotated Books'
-update_excel_with_comparisons(excel_file_path, txt_directory, pdf_directory)
+if __name__ == "__main__":
+    # Example usage
+    excel_file_path = 'page_line_counts_extracted.xlsx'
+    txt_directory = '/home/cle-dl-05/Documents/3.PdfOCR/2.Datasets/1.Raw/Annotated Books'
+    pdf_directory = '/home/cle-dl-05/Documents/3.PdfOCR/2.Datasets/1.Raw/Annotated Books'
+    update_excel_with_comparisons(excel_file_path, txt_directory, pdf_directory)
@@ -0,0 +1,92 @@
+"""
+    Compares the quantised ONNX recognition model with the float model (see quantize_model.py).
+
+    Both models recognise the same held-out labelled line images (images/ and
+    labels/gt_char.csv of --data-folder, not the training data_folder of the model
+    config) with the same batches. The report
+    has the CER of every model against the labels, the CER regression of the quantised
+    model, the lines decoded differently, the lines/sec and size of both models and the
+    speedup, and is written as JSON.
+
+    Run with the folder containing pdf_ocr_pipeline on the PYTHONPATH:
+        PYTHONPATH=. python pdf_ocr_pipeline/scripts/stats/quantization_report.py <model_config> \
+            --data-folder <held_out_data_folder> [--max-lines 2000] [--quantized model.int8.onnx] [--output report.json]
+"""
+
+import argparse
+import json
+import os
+import time
+
+from pdf_ocr_pipeline.models.onnx_model import OnnxModel
+from pdf_ocr_pipeline.utils.accuracy_metrics import character_error_rate
+from pdf_ocr_pipeline.utils.config_utils import get_config
+from pdf_ocr_pipeline.utils.data_utils import load_labelled_lines
+
+
+def measure(model, images, labels, batch_size, runs):
+    """Recognises the lines runs times and returns the predictions, CER and best lines/sec."""
+    # The first run allocates the buffers of the session
+    preds, _ = model.predict_batch(images, max_batch=batch_size)
+
+    seconds = []
+    for _ in range(runs):
+        tic = time.perf_counter()
+        model.predict_batch(images, max_batch=batch_size)
+        seconds.append(time.perf_counter() - tic)
+
+    return preds, {"cer": character_error_rate(labels, preds), "lines_per_sec": len(images) / min(seconds)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CER and speed of the quantized ONNX model against the float model.")
+    parser.add_argument("model_config", help="path to the model JSON config")
+    parser.add_argument("--data-folder", required=True,
+                        help="held-out labelled lines, not the training data_folder of the config")
+    parser.add_argument("--max-lines", type=int, default=2000, help="lines compared")
+    parser.add_argument("--float", dest="float_model", help="float ONNX model, onnx_model of the config by default")
+    parser.add_argument("--quantized", help="quantized ONNX model, quantized_onnx_model of the config by default")
+    parser.add_argument("--batch-size", type=int, default=32, help="lines per session run")
+    parser.add_argument("--runs", type=int, default=3, help="timed runs of every model, the best is reported")
+    parser.add_argument("--output", help="path of the JSON report")
+    args = parser.parse_args()
+
+    config = get_config(args.model_config)
+    data_folder = args.data_folder
+    paths = {"float": args.float_model or config.onnx_model,
+             "quantized": args.quantized or config.quantized_onnx_model}
+
+    images, labels = load_labelled_lines(data_folder, config.char_or_lig, args.max_lines)
+    if not images:
+        raise ValueError(f"No labelled line images found in {data_folder}")
+    print(f"Comparing on {len(images)} lines of {data_folder}")
+
+    results, preds = {}, {}
+    for name, path in paths.items():
+        model = OnnxModel(config, path)
+        preds[name], results[name] = measure(model, images, labels, args.batch_size, args.runs)
+        results[name].update(path=path, size_mb=os.path.getsize(path) / 2 ** 20)
+        model.close()
+
+        print(f"{name:>9}: CER {results[name]['cer'] * 100:.2f}%, {results[name]['lines_per_sec']:.1f} lines/sec, "
+              f"{results[name]['size_mb']:.1f} MB")
+
+    report = {"data_folder": data_folder,
+              "lines": len(images),
+              "batch_size": args.batch_size,
+              "models": results,
+              "cer_regression": results["quantized"]["cer"] - results["float"]["cer"],
+              "speedup": results["quantized"]["lines_per_sec"] / results["float"]["lines_per_sec"],
+              "lines_decoded_differently": sum(list(float_pred) != list(quantized_pred) for float_pred, quantized_pred
+                                               in zip(preds["float"], preds["quantized"]))}
+
+    print(f"CER regression {report['cer_regression'] * 100:+.2f} points, speedup {report['speedup']:.2f}x, "
+          f"{report['lines_decoded_differently']} of {len(images)} lines decoded differently")
+
+    if args.output:
+        with open(args.output, "w") as report_file:
+            json.dump(report, report_file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
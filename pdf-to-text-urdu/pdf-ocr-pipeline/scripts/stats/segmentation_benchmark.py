@@ -0,0 +1,267 @@
+"""
+    Benchmarks the line segmentation engines on annotated books.
+
+    Every <book>.pdf of the books folder is rendered once, and the pages annotated in
+    <book>.txt (pages separated by #########<page number>########## lines, see
+    page_stats.process_text_file) are segmented by every engine. The report has the
+    speed (pages/sec, lines/sec), the peak memory and, per book, the line count
+    precision and recall of every engine, and is written as JSON so runs on different
+    commits can be compared with --compare.
+
+    The calibrated and production engines get the kernel sizes calibrated on a sample of
+    pages of each book as the API calibrates them (calibration.calibrated_pages), the
+    production engine also deskews the page (PageContext) as the API does with
+    DESKEW_PAGES and CALIBRATE_KERNELS on. The calibration itself is not timed. They
+    scale the default kernels from --reference-text-height, calibration.REFERENCE_TEXT_HEIGHT
+    by default. The report has the median text height (calibration.page_text_metrics) of
+    the annotated pages, which is the reference text height when they are the pages the
+    default kernels were tuned on.
+
+    Only line counts are annotated, so on every page min(detected, annotated) lines are
+    taken as correct: precision is correct / detected lines and recall is correct /
+    annotated lines, summed over the pages.
+
+    Run with the folder containing pdf_ocr_pipeline on the PYTHONPATH:
+        PYTHONPATH=. python pdf_ocr_pipeline/scripts/stats/segmentation_benchmark.py <books_dir> \
+            [--engines old updated] [--output report.json] [--compare previous_report.json] \
+            [--reference-text-height <text_height>]
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+
+from pdf_ocr_pipeline.calibration import DEFAULT_KERNEL_SIZES, REFERENCE_TEXT_HEIGHT, calibrated_pages, page_text_metrics
+from pdf_ocr_pipeline.convert_to_lines import PROJECTION, page_to_line_views, page_to_lines_old, page_to_lines_updated
+from pdf_ocr_pipeline.convert_to_pages import iter_pdf_pages
+from pdf_ocr_pipeline.page_context import PageContext
+from pdf_ocr_pipeline.scripts.stats.page_stats import process_text_file
+
+# Engines take a BGR page image and return its line images, new engines are added here
+ENGINES = {
+    "old": page_to_lines_old,
+    "updated": page_to_lines_updated,
+    "projection": lambda page_img: page_to_lines_updated(page_img, method=PROJECTION),
+    "downscaled": lambda page_img: page_to_lines_updated(page_img, scale=0.5),
+    "columns": lambda page_img: page_to_lines_updated(page_img, columns=True),
+    "deskewed": lambda page_img: page_to_line_views(PageContext(page_img, deskew=True)),
+}
+
+# Engines that also take the kernel sizes calibrated on the book
+CALIBRATED_ENGINES = {
+    "calibrated": lambda page_img, kernel_sizes: page_to_lines_updated(page_img, kernel_sizes=kernel_sizes),
+    "production": lambda page_img, kernel_sizes: page_to_line_views(PageContext(page_img, deskew=True),
+                                                                    kernel_sizes=kernel_sizes),
+}
+
+
+class _BookCalibration():
+    """Calibration cache of a single run, so every book is calibrated again rather than read from the API cache."""
+
+    def get(self, key):
+        return None
+
+    def set(self, key, kernel_sizes):
+        pass
+
+
+def run_engine(name, page_img, kernel_sizes=DEFAULT_KERNEL_SIZES):
+    """Returns the lines an engine finds on a page."""
+    if name in CALIBRATED_ENGINES:
+        return CALIBRATED_ENGINES[name](page_img, kernel_sizes)
+    return ENGINES[name](page_img)
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL,
+                                       cwd=os.path.dirname(os.path.abspath(__file__))).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def annotated_line_counts(txt_path):
+    """Returns the annotated number of lines of every page of a book text file."""
+    return {page_number: num_lines for _, page_number, num_lines in process_text_file(txt_path)}
+
+
+def _new_counts():
+    return {"pages": 0, "annotated_lines": 0, "detected_lines": 0, "correct_lines": 0, "exact_pages": 0,
+            "absolute_error": 0}
+
+
+def _add_page(counts, annotated, detected):
+    counts["pages"] += 1
+    counts["annotated_lines"] += annotated
+    counts["detected_lines"] += detected
+    counts["correct_lines"] += min(annotated, detected)
+    counts["exact_pages"] += int(annotated == detected)
+    counts["absolute_error"] += abs(annotated - detected)
+
+
+def _accuracy(counts):
+    pages = counts["pages"]
+    return {
+        "pages": pages,
+        "annotated_lines": counts["annotated_lines"],
+        "detected_lines": counts["detected_lines"],
+        "precision": counts["correct_lines"] / counts["detected_lines"] if counts["detected_lines"] else 0.0,
+        "recall": counts["correct_lines"] / counts["annotated_lines"] if counts["annotated_lines"] else 0.0,
+        "exact_page_ratio": counts["exact_pages"] / pages if pages else 0.0,
+        "mean_absolute_error": counts["absolute_error"] / pages if pages else 0.0,
+    }
+
+
+def run_benchmark(books_dir, engines, texts_dir=None, max_pages=None, measure_memory=True, thread_count=1,
+                  reference_text_height=REFERENCE_TEXT_HEIGHT):
+    """
+    Segments the annotated pages of every book with every engine.
+
+    Args:
+        books_dir (str): Folder of <book>.pdf files.
+        engines (list): Names of the ENGINES and CALIBRATED_ENGINES to run.
+        texts_dir (str): Folder of the <book>.txt annotations, books_dir by default.
+        max_pages (int): Annotated pages benchmarked per book, all by default.
+        measure_memory (bool): Runs every engine a second time on each page under tracemalloc for its peak memory.
+        thread_count (int): pdftoppm processes rendering the pages.
+        reference_text_height (float): Text height the calibrated engines scale the default kernels from.
+
+    Returns:
+        dict: The report.
+    """
+    texts_dir = texts_dir or books_dir
+
+    totals = {name: {"seconds": 0.0, "peak_memory_bytes": 0, "counts": _new_counts(), "books": {}}
+              for name in engines}
+
+    text_heights = []
+    for file_name in sorted(os.listdir(books_dir)):
+        if not file_name.lower().endswith(".pdf"):
+            continue
+
+        book_name = os.path.splitext(file_name)[0]
+        txt_path = os.path.join(texts_dir, f"{book_name}.txt")
+        if not os.path.isfile(txt_path):
+            print(f"No annotations for {book_name}, skipping.")
+            continue
+
+        annotated = annotated_line_counts(txt_path)
+        book_counts = {name: _new_counts() for name in engines}
+        print(f"Benchmarking {book_name} ({len(annotated)} annotated pages)...")
+
+        pdf_path = os.path.join(books_dir, file_name)
+        pages = iter_pdf_pages(pdf_path, book_name=book_name, thread_count=thread_count)
+        if any(name in CALIBRATED_ENGINES for name in engines):
+            pages = calibrated_pages(pdf_path, pages, cache=_BookCalibration(),
+                                     reference_text_height=reference_text_height)
+        else:
+            pages = ((DEFAULT_KERNEL_SIZES, page) for page in pages)
+
+        num_pages = 0
+        for kernel_sizes, (page_name, page_img) in pages:
+            match = re.search(r"_pg(\d+)", page_name)
+            if match is None or int(match.group(1)) not in annotated:
+                continue
+            if max_pages is not None and num_pages >= max_pages:
+                break
+            num_pages += 1
+
+            metrics = page_text_metrics(page_img)
+            if metrics is not None:
+                text_heights.append(metrics[0])
+
+            for name in engines:
+                start = time.perf_counter()
+                lines = run_engine(name, page_img, kernel_sizes)
+                totals[name]["seconds"] += time.perf_counter() - start
+
+                if measure_memory:
+                    tracemalloc.start()
+                    run_engine(name, page_img, kernel_sizes)
+                    totals[name]["peak_memory_bytes"] = max(totals[name]["peak_memory_bytes"],
+                                                            tracemalloc.get_traced_memory()[1])
+                    tracemalloc.stop()
+
+                _add_page(book_counts[name], annotated[int(match.group(1))], len(lines))
+                _add_page(totals[name]["counts"], annotated[int(match.group(1))], len(lines))
+
+        for name in engines:
+            totals[name]["books"][book_name] = _accuracy(book_counts[name])
+
+    report = {"commit": git_commit(), "created_at": datetime.now().isoformat(timespec="seconds"),
+              "text_height": float(np.median(text_heights)) if text_heights else None, "engines": {}}
+    for name, total in totals.items():
+        counts, seconds = total["counts"], total["seconds"]
+        report["engines"][name] = {
+            **_accuracy(counts),
+            "seconds": seconds,
+            "pages_per_sec": counts["pages"] / seconds if seconds else 0.0,
+            "lines_per_sec": counts["detected_lines"] / seconds if seconds else 0.0,
+            "peak_memory_mb": total["peak_memory_bytes"] / 2 ** 20 if measure_memory else None,
+            "books": total["books"],
+        }
+
+    return report
+
+
+def print_report(report, previous=None):
+    """Prints the engines of a report, with the values of a previous report in brackets."""
+    print(f"Commit {report['commit']} ({report['created_at']})"
+          + (f", compared to {previous['commit']} ({previous['created_at']})" if previous else ""))
+    if report.get("text_height") is not None:
+        print(f"  Median text height of the annotated pages: {report['text_height']:.1f}")
+
+    columns = ("pages_per_sec", "lines_per_sec", "peak_memory_mb", "precision", "recall", "exact_page_ratio")
+    for name, engine in report["engines"].items():
+        before = previous["engines"].get(name) if previous else None
+        values = []
+        for column in columns:
+            value = engine[column]
+            text = f"{value:.3f}" if value is not None else "-"
+            if before is not None and before.get(column) is not None and value is not None:
+                text += f" ({before[column]:.3f})"
+            values.append(f"{column}: {text}")
+        print(f"  {name}: " + ", ".join(values))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Line segmentation benchmark on annotated books.")
+    parser.add_argument("books_dir", help="folder of <book>.pdf files")
+    parser.add_argument("--texts-dir", help="folder of the <book>.txt annotations, books_dir by default")
+    parser.add_argument("--engines", nargs="+", default=list(ENGINES) + list(CALIBRATED_ENGINES),
+                        choices=list(ENGINES) + list(CALIBRATED_ENGINES))
+    parser.add_argument("--max-pages", type=int, help="annotated pages benchmarked per book")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc peak memory runs")
+    parser.add_argument("--threads", type=int, default=os.cpu_count(), help="pdftoppm processes")
+    parser.add_argument("--output", help="report path, segmentation_benchmark_<commit>.json by default")
+    parser.add_argument("--compare", help="previous report to compare with")
+    parser.add_argument("--reference-text-height", type=float, default=REFERENCE_TEXT_HEIGHT,
+                        help="text height the calibrated engines scale the default kernels from, "
+                             "calibration.REFERENCE_TEXT_HEIGHT by default")
+    args = parser.parse_args()
+
+    if args.reference_text_height is None and any(name in CALIBRATED_ENGINES for name in args.engines):
+        parser.error("REFERENCE_TEXT_HEIGHT is not measured: run the other engines, the report has the text_height "
+                     "of the annotated pages, and pass it with --reference-text-height")
+
+    report = run_benchmark(args.books_dir, args.engines, texts_dir=args.texts_dir, max_pages=args.max_pages,
+                           measure_memory=not args.no_memory, thread_count=args.threads,
+                           reference_text_height=args.reference_text_height)
+
+    output = args.output or f"segmentation_benchmark_{report['commit'] or 'local'}.json"
+    with open(output, "w", encoding="utf-8") as report_file:
+        json.dump(report, report_file, indent=2)
+    print(f"Report saved to {output}")
+
+    previous = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as previous_file:
+            previous = json.load(previous_file)
+    print_report(report, previous)
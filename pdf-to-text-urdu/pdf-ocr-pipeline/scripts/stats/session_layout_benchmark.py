@@ -0,0 +1,191 @@
+"""
+    Finds the best "N sessions x M threads" layout of the recognition model on this machine.
+
+    Every layout runs N worker processes, each with its own session of M intra op
+    threads pinned to its own M cores, recognising the same line images at the same
+    time for a fixed duration. TensorFlow thread pools are created once per process,
+    so every layout is measured in fresh processes. The report has the lines/sec of
+    every layout and is written as JSON.
+
+    The best layout is served with N server processes (e.g. gunicorn workers) each
+    started with OCR_INTRA_OP_THREADS=M and its own OCR_CPU_AFFINITY, see the Readme.
+
+    Run with the folder containing pdf_ocr_pipeline on the PYTHONPATH:
+        PYTHONPATH=. python pdf_ocr_pipeline/scripts/stats/session_layout_benchmark.py <model_config> <images_dir> \
+            [--layouts 1x8 2x4 4x2] [--seconds 30] [--output report.json]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import cv2
+
+from pdf_ocr_pipeline.utils.session_utils import CPU_AFFINITY_ENV, INTER_OP_THREADS_ENV, INTRA_OP_THREADS_ENV
+
+READY = "ready"
+
+
+def available_cpus():
+    return sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else list(range(os.cpu_count()))
+
+
+def default_layouts(num_cpus):
+    """Returns the (sessions, threads) layouts that use every core, e.g. 1x8, 2x4, 4x2 and 8x1 for 8 cores."""
+    return [(sessions, num_cpus // sessions) for sessions in range(1, num_cpus + 1) if num_cpus % sessions == 0]
+
+
+def parse_layout(layout):
+    sessions, threads = layout.lower().split("x")
+    return int(sessions), int(threads)
+
+
+def load_line_images(images_dir, max_lines):
+    images = []
+    for file_name in sorted(os.listdir(images_dir)):
+        if file_name.lower().endswith((".jpg", ".jpeg", ".png")):
+            image = cv2.imread(os.path.join(images_dir, file_name))
+            if image is not None:
+                images.append(image)
+            if len(images) >= max_lines:
+                break
+
+    return images
+
+
+def run_worker(model_config_path, images_dir, seconds, max_lines, batch_size, concurrent_runs):
+    """
+    Worker process of a layout: loads the model and prepares the batches, prints READY, waits for the
+    start line on stdin and then recognises the batches for the given seconds. Prints the result as JSON.
+    """
+    from pdf_ocr_pipeline.run_model import create_and_run_model
+    from pdf_ocr_pipeline.utils.image_utils import handle_inferring_batch
+
+    model, config = create_and_run_model(model_config_path)
+    images = load_line_images(images_dir, max_lines)
+    batches = list(handle_inferring_batch(images, config.image_size, flip_image=config.flip_image,
+                                          max_batch=batch_size, binarize_once=getattr(config, "binarize_once", False)))
+    if not batches:
+        raise ValueError(f"No line images found in {images_dir}")
+
+    # The first runs allocate the buffers of the session
+    for X, seq_len, _ in batches[:2]:
+        model.infer_batch(X, seq_len)
+
+    print(READY, flush=True)
+    sys.stdin.readline()
+
+    counts = [0] * concurrent_runs
+    deadline = time.perf_counter() + seconds
+
+    def run(index):
+        batch_index = index
+        while time.perf_counter() < deadline:
+            X, seq_len, indices = batches[batch_index % len(batches)]
+            model.infer_batch(X, seq_len)
+            counts[index] += len(indices)
+            batch_index += concurrent_runs
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=run, args=(index,)) for index in range(concurrent_runs)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    print(json.dumps({"lines": sum(counts), "seconds": time.perf_counter() - start}), flush=True)
+
+
+def run_layout(model_config_path, images_dir, sessions, threads, seconds, max_lines, batch_size, concurrent_runs,
+               pin=True):
+    """
+    Runs the worker processes of a layout at the same time.
+
+    Returns:
+        dict: The layout and its throughput.
+    """
+    cpus = available_cpus()
+    workers = []
+    for index in range(sessions):
+        env = dict(os.environ)
+        env[INTRA_OP_THREADS_ENV] = str(threads)
+        env[INTER_OP_THREADS_ENV] = str(concurrent_runs)
+        if pin and sessions * threads <= len(cpus):
+            env[CPU_AFFINITY_ENV] = ",".join(str(cpu) for cpu in cpus[index * threads:(index + 1) * threads])
+
+        command = [sys.executable, os.path.abspath(__file__), model_config_path, images_dir, "--worker",
+                   "--seconds", str(seconds), "--max-lines", str(max_lines), "--batch-size", str(batch_size),
+                   "--concurrent-runs", str(concurrent_runs)]
+        workers.append(subprocess.Popen(command, env=env, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                        universal_newlines=True))
+
+    # Every worker loads the model before any of them starts, so the runs overlap
+    for worker in workers:
+        for line in worker.stdout:
+            if line.strip() == READY:
+                break
+        else:
+            raise RuntimeError(f"A worker of layout {sessions}x{threads} exited before loading the model")
+
+    for worker in workers:
+        worker.stdin.write("start\n")
+        worker.stdin.flush()
+
+    results = []
+    for worker in workers:
+        output = [line for line in worker.stdout if line.startswith("{")]
+        worker.wait()
+        if worker.returncode != 0 or not output:
+            raise RuntimeError(f"A worker of layout {sessions}x{threads} failed")
+        results.append(json.loads(output[-1]))
+
+    lines = sum(result["lines"] for result in results)
+    elapsed = max(result["seconds"] for result in results)
+
+    return {"layout": f"{sessions}x{threads}", "sessions": sessions, "intra_op_threads": threads,
+            "concurrent_runs": concurrent_runs, "lines": lines, "seconds": elapsed,
+            "lines_per_sec": lines / elapsed if elapsed else 0.0}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Session layout benchmark of the recognition model.")
+    parser.add_argument("model_config", help="path to the model JSON config")
+    parser.add_argument("images_dir", help="folder of line images, e.g. data/MMA-UD/test")
+    parser.add_argument("--layouts", nargs="+", help="NxM layouts, every layout using all cores by default")
+    parser.add_argument("--seconds", type=float, default=30.0, help="duration of every layout")
+    parser.add_argument("--max-lines", type=int, default=512, help="line images recognised")
+    parser.add_argument("--batch-size", type=int, default=32, help="lines per session run")
+    parser.add_argument("--concurrent-runs", type=int, default=1,
+                        help="session runs at the same time in every process (BATCH_DISPATCHERS)")
+    parser.add_argument("--no-pin", action="store_true", help="do not pin the sessions to their own cores")
+    parser.add_argument("--output", default="session_layout_benchmark.json", help="report path")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.model_config, args.images_dir, args.seconds, args.max_lines, args.batch_size,
+                   args.concurrent_runs)
+        sys.exit(0)
+
+    layouts = [parse_layout(layout) for layout in args.layouts] if args.layouts else \
+        default_layouts(len(available_cpus()))
+
+    report = []
+    for sessions, threads in layouts:
+        print(f"Running {sessions} sessions x {threads} threads for {args.seconds} secs...")
+        result = run_layout(args.model_config, args.images_dir, sessions, threads, args.seconds, args.max_lines,
+                            args.batch_size, args.concurrent_runs, pin=not args.no_pin)
+        print(f"  {result['lines_per_sec']:.1f} lines/sec")
+        report.append(result)
+
+    with open(args.output, "w", encoding="utf-8") as report_file:
+        json.dump(report, report_file, indent=2)
+    print(f"Report saved to {args.output}")
+
+    best = max(report, key=lambda result: result["lines_per_sec"])
+    print(f"Best layout: {best['layout']} ({best['lines_per_sec']:.1f} lines/sec), serve it with {best['sessions']} "
+          f"processes started with {INTRA_OP_THREADS_ENV}={best['intra_op_threads']} on their own cores.")
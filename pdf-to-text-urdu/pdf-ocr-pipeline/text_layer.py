@@ -0,0 +1,188 @@
+"""
+    Embedded text layer of born-digital PDF pages.
+
+    Pages with a usable Urdu Unicode text layer do not need rasterising and OCR, the
+    text is read with pdfplumber instead. A page is usable when it has enough
+    characters, most of its letters are in the Arabic script blocks and it is not
+    garbled by unmapped glyphs. Everything else falls back to raster OCR.
+"""
+
+import re
+import unicodedata
+
+import pdfplumber
+
+MIN_TEXT_LAYER_CHARS = 50  # fewer characters are e.g. page numbers over a scanned page
+MIN_URDU_RATIO = 0.8  # share of the letters in the Arabic script blocks
+MAX_GARBLED_RATIO = 0.02  # share of unmapped glyphs, (cid:N), U+FFFD and private use characters
+
+_ARABIC_RANGES = ((0x0600, 0x06FF), (0x0750, 0x077F), (0x08A0, 0x08FF), (0xFB50, 0xFDFF), (0xFE70, 0xFEFF))
+_PRESENTATION_RANGES = ((0xFB50, 0xFDFF), (0xFE70, 0xFEFF))
+
+_CID_PATTERN = re.compile(r"\(cid:\d+\)")
+# Runs written left to right inside right to left text
+_LTR_RUN_PATTERN = re.compile(r"[0-9A-Za-z٠-٩۰-۹]+")
+
+
+def _in_ranges(char, ranges):
+    code = ord(char)
+    return any(start <= code <= end for start, end in ranges)
+
+
+def is_arabic_char(char):
+    return _in_ranges(char, _ARABIC_RANGES)
+
+
+def _is_garbled_char(char):
+    return char == "�" or 0xE000 <= ord(char) <= 0xF8FF
+
+
+def text_layer_quality(text):
+    """
+    Measures how usable an extracted text is.
+
+    Args:
+        text (str): Text extracted from a page.
+
+    Returns:
+        tuple: (number of characters without spaces, share of the letters in the Arabic script,
+                share of garbled characters)
+    """
+    num_cids = len(_CID_PATTERN.findall(text))
+    text = _CID_PATTERN.sub("", text)
+
+    chars = [char for char in text if not char.isspace()]
+    letters = [char for char in chars if char.isalpha()]
+    num_garbled = num_cids + sum(1 for char in chars if _is_garbled_char(char))
+
+    num_chars = len(chars) + num_cids
+    urdu_ratio = sum(1 for char in letters if is_arabic_char(char)) / len(letters) if letters else 0.0
+    garbled_ratio = num_garbled / num_chars if num_chars else 0.0
+
+    return num_chars, urdu_ratio, garbled_ratio
+
+
+def is_usable_text_layer(text, min_chars=MIN_TEXT_LAYER_CHARS, min_urdu_ratio=MIN_URDU_RATIO,
+                         max_garbled_ratio=MAX_GARBLED_RATIO):
+    """Returns True if the text of a page can be used instead of OCR."""
+    num_chars, urdu_ratio, garbled_ratio = text_layer_quality(text)
+    return num_chars >= min_chars and urdu_ratio >= min_urdu_ratio and garbled_ratio <= max_garbled_ratio
+
+
+def _logical_word(text):
+    """
+    pdfplumber orders the characters of a word from left to right, which reverses right to left
+    words. Reverses them back, keeping numbers and latin runs left to right, and maps presentation
+    form glyphs to their letters.
+
+    The glyphs are reversed before they are mapped: a ligature glyph (e.g. lam alef, Allah) maps to
+    its letters in logical order, which must not be reversed again.
+    """
+    if any(is_arabic_char(char) and char.isalpha() for char in text):
+        text = _LTR_RUN_PATTERN.sub(lambda match: match.group(0)[::-1], text[::-1])
+
+    return "".join(unicodedata.normalize("NFKC", char) if _in_ranges(char, _PRESENTATION_RANGES) else char
+                   for char in text)
+
+
+def _group_lines(words):
+    """Groups the words of a page into lines from top to bottom."""
+    lines = []
+    for word in sorted(words, key=lambda word: word["top"]):
+        tolerance = (word["bottom"] - word["top"]) / 2
+        if lines and abs(word["top"] - lines[-1][0]["top"]) <= tolerance:
+            lines[-1].append(word)
+        else:
+            lines.append([word])
+
+    return lines
+
+
+def page_text_lines(page):
+    """
+    Extracts the text lines of a pdfplumber page in reading order.
+
+    Args:
+        page (pdfplumber.page.Page): Page of an opened PDF.
+
+    Returns:
+        list: Text of each line, from top to bottom.
+    """
+    text_lines = []
+    for line in _group_lines(page.extract_words()):
+        words = [(word["x0"], word["x1"], _logical_word(word["text"])) for word in line]
+
+        # Lines are right to left unless most of their letters are latin
+        text = "".join(text for _, _, text in words)
+        right_to_left = sum(1 for char in text if is_arabic_char(char)) * 2 >= sum(1 for char in text
+                                                                                  if char.isalpha())
+        words.sort(key=lambda word: word[1], reverse=right_to_left)
+        text_lines.append(" ".join(text for _, _, text in words))
+
+    return text_lines
+
+
+def _release_page(page):
+    """Frees the parsed layout objects a pdfplumber page keeps cached after it was read."""
+    page.flush_cache()
+    if hasattr(page, "close"):  # pdfplumber 0.10+
+        page.close()
+
+
+def iter_text_layer(pdf_path, min_chars=MIN_TEXT_LAYER_CHARS, min_urdu_ratio=MIN_URDU_RATIO,
+                    max_garbled_ratio=MAX_GARBLED_RATIO, page_numbers=None):
+    """
+    Classifies the pages of a PDF one at a time. A page is only parsed when the iterator reaches it and
+    is released right after, so the first page is not delayed by the rest of the PDF and the memory
+    used does not grow with the number of pages.
+
+    Args:
+        pdf_path (str): Path to the PDF file.
+        min_chars (int): Minimum characters of a usable page.
+        min_urdu_ratio (float): Minimum share of letters in the Arabic script of a usable page.
+        max_garbled_ratio (float): Maximum share of garbled characters of a usable page.
+        page_numbers (iterable): Page numbers to classify, starting at 1, every page if None.
+
+    Yields:
+        tuple: (page number starting at 1, text lines) of every page in page order. The text lines
+               are None for scanned or garbled pages.
+    """
+    try:
+        pdf = pdfplumber.open(pdf_path)
+    except Exception as e:
+        print(f"Error reading the text layer of the PDF: {e}")
+        return
+
+    page_numbers = set(page_numbers) if page_numbers is not None else None
+    with pdf:
+        for page_number, page in enumerate(pdf.pages, start=1):
+            if page_numbers is not None and page_number not in page_numbers:
+                continue
+
+            try:
+                text_lines = page_text_lines(page)
+            except Exception as e:
+                print(f"Error reading the text layer of page {page_number}: {e}")
+                text_lines = None
+            finally:
+                _release_page(page)
+
+            if text_lines is not None and not is_usable_text_layer("\n".join(text_lines), min_chars,
+                                                                   min_urdu_ratio, max_garbled_ratio):
+                text_lines = None
+
+            yield page_number, text_lines
+
+
+def extract_text_layer(pdf_path, min_chars=MIN_TEXT_LAYER_CHARS, min_urdu_ratio=MIN_URDU_RATIO,
+                       max_garbled_ratio=MAX_GARBLED_RATIO):
+    """
+    Reads the pages of a PDF that have a usable Urdu text layer (see iter_text_layer).
+
+    Returns:
+        dict: Page number (starting at 1) to the text lines of each usable page. Scanned or
+              garbled pages are left out.
+    """
+    return {page_number: text_lines
+            for page_number, text_lines in iter_text_layer(pdf_path, min_chars, min_urdu_ratio, max_garbled_ratio)
+            if text_lines is not None}
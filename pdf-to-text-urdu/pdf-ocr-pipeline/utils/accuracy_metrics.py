@@ -30,3 +30,25 @@ def Levenshtein(labels=None, logits=None):
     
     #return lev_dist
     return max(0, 1-lev_dist/size_x)*100
+
+
+# Return the number of insertions, deletions and substitutions turning the label (gt) into the prediction
+def edit_distance(labels, preds):
+    previous = list(range(len(preds) + 1))
+    for x in range(1, len(labels) + 1):
+        current = [x] + [0] * len(preds)
+        for y in range(1, len(preds) + 1):
+            current[y] = min(previous[y] + 1,
+                             current[y - 1] + 1,
+                             previous[y - 1] + (labels[x - 1] != preds[y - 1]))
+        previous = current
+
+    return previous[-1]
+
+
+# Return the character error rate of a set of lines, the edits of all the lines over the characters of their labels
+def character_error_rate(labels, preds):
+    edits = sum(edit_distance(label, pred) for label, pred in zip(labels, preds))
+    characters = sum(len(label) for label in labels)
+
+    return edits / max(characters, 1)
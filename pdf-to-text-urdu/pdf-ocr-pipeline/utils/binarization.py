@@ -1,11 +1,18 @@
 import os
+import threading
 import cv2 as cv
 from PIL import Image
 import PIL.ImageOps
 import numpy as np
 import math
-import doxapy
-from collections import Counter
+
+try:
+    import doxapy
+except ImportError:  # SauvolaBinarizer falls back to its NumPy implementation
+    doxapy = None
+
+SAUVOLA_WINDOW = 94
+SAUVOLA_K = 0.3
 
 class ColorRenderer():
     def __init__(self, rgb):
@@ -21,21 +28,37 @@ class ColorRenderer():
 
 
 class BackgroundColorDetector():
-    def __init__(self, imageLoc):
+    def __init__(self, imageLoc, max_pixels=None):
+        """
+        Args:
+            imageLoc (np.ndarray): BGR image.
+            max_pixels (int): If given, larger images are subsampled with an equal stride on both
+                              axes to about this many pixels before counting the colours.
+        """
         #         self.img = cv2.imread(imageLoc, 1)
         self.img = imageLoc
-        self.manual_count = {}
         self.w, self.h, self.channels = self.img.shape
+
+        if max_pixels is not None and self.w * self.h > max_pixels:
+            stride = int(math.ceil(math.sqrt(self.w * self.h / max_pixels)))
+            self.img = self.img[::stride, ::stride]
+            self.w, self.h = self.img.shape[:2]
+
         self.total_pixels = self.w * self.h
 
     def count(self):
-        for y in range(0, self.h):
-            for x in range(0, self.w):
-                RGB = (self.img[x, y, 2], self.img[x, y, 1], self.img[x, y, 0])
-                if RGB in self.manual_count:
-                    self.manual_count[RGB] += 1
-                else:
-                    self.manual_count[RGB] = 1
+        """
+        Counts the pixels of every colour, most common first. Colours with equal counts keep the order
+        in which a column by column scan of the image first sees them, like a dict filled pixel by pixel.
+        """
+        pixels = self.img[:, :, :3].transpose(1, 0, 2).reshape(-1, 3)  # column by column scan order
+        packed = (pixels[:, 2].astype(np.uint32) << 16) | (pixels[:, 1].astype(np.uint32) << 8) | pixels[:, 0]
+
+        colors, first_index, counts = np.unique(packed, return_index=True, return_counts=True)
+        order = np.lexsort((first_index, -counts))
+
+        self.packed_colors = colors[order]
+        self.color_counts = counts[order]
 
     def average_colour(self):
         red = 0
@@ -56,7 +79,11 @@ class BackgroundColorDetector():
 
     def twenty_most_common(self):
         self.count()
-        self.number_counter = Counter(self.manual_count).most_common(20)
+
+        top_colors = self.packed_colors[:20]
+        rgb = np.stack([top_colors >> 16, top_colors >> 8, top_colors], axis=1).astype(np.uint8)
+        # ((R, G, B) of np.uint8, count) like Counter.most_common
+        self.number_counter = [(tuple(color), int(count)) for color, count in zip(rgb, self.color_counts[:20])]
 
     #         for rgb, value in self.number_counter:
     #             print(rgb, value, ((float(value)/self.total_pixels)*100))
@@ -82,15 +109,15 @@ def isLightOrDark(rgbColor):
         return 'dark'
 
 
-def back(image):
+def back(image, max_pixels=None):
     # cv_img = cv.imread(path)
-    BackgroundColor = BackgroundColorDetector(image)
+    BackgroundColor = BackgroundColorDetector(image, max_pixels=max_pixels)
     average_color = BackgroundColor.detect()
     return isLightOrDark(average_color)
 
 
-def get_gray_image(image):
-    background = back(image)
+def get_gray_image(image, max_pixels=None):
+    background = back(image, max_pixels=max_pixels)
     
     if background == 'dark':
         # print(background)
@@ -106,82 +133,174 @@ def get_gray_image(image):
     return gray
 
 
-class stack:
-    def __init__(self):
-        self.array = list()
+class SauvolaBinarizer():
+    """
+    Sauvola binarization of grayscale images, ink is 0 and background 255.
+
+    The doxapy Binarization object and the output buffer are kept between calls and only grown
+    when a larger image comes in. Without doxapy, or with use_doxapy=False, a NumPy/OpenCV box
+    filter implementation is used, which gives the same result as doxapy. Images narrower or
+    shorter than the window, like line crops, always use it: doxapy reads past the edges of
+    those, so its output changes from call to call and narrow images can corrupt the heap.
+
+    A binarizer is not thread safe because of its buffers, use get_binarizer() for one per thread.
+    """
+
+    def __init__(self, window=SAUVOLA_WINDOW, k=SAUVOLA_K, use_doxapy=None):
+        self.window = window
+        self.k = k
+        self.use_doxapy = doxapy is not None if use_doxapy is None else use_doxapy
+        if self.use_doxapy and doxapy is None:
+            raise ImportError("doxapy is not installed, use use_doxapy=False for the NumPy implementation")
+
+        self._sauvola = doxapy.Binarization(doxapy.Binarization.Algorithms.SAUVOLA) if self.use_doxapy else None
+        self._output = np.empty(0, np.uint8)
 
-    def push(self, value):
-        self.array.append(value)
+    @staticmethod
+    def _view(buffer, shape):
+        """Returns a view of the buffer with the given shape, the buffer is grown if it is too small."""
+        size = int(np.prod(shape))
+        if buffer.size < size:
+            buffer = np.empty(size, buffer.dtype)
+        return buffer, buffer[:size].reshape(shape)
 
-    def pop(self):
-        return self.array.pop()
+    def binarize(self, gray, copy=True):
+        """
+        Args:
+            gray (np.ndarray): uint8 grayscale image, a page or a line.
+            copy (bool): If False the result is a view of the output buffer, only valid until the next call.
 
-    def is_empty(self):
-        if len(self.array) == 0:
-            return True
+        Returns:
+            np.ndarray: Binary image of the same shape.
+        """
+        gray = np.ascontiguousarray(gray, dtype=np.uint8)
+        self._output, binary_image = self._view(self._output, gray.shape)
+
+        if self.use_doxapy and min(gray.shape) >= self.window:
+            self._sauvola.initialize(gray)
+            self._sauvola.to_binary(binary_image, {"window": self.window, "k": self.k})
         else:
-            return False
+            self._numpy_sauvola(gray, binary_image)
+
+        return binary_image.copy() if copy else binary_image
+
+    def binarize_batch(self, grays):
+        """Binarizes every grayscale image of a batch, e.g. the line crops of a page."""
+        return [self.binarize(gray) for gray in grays]
+
+    def _numpy_sauvola(self, gray, out):
+        before = (self.window - 1) // 2  # window pixels before the pixel, as doxapy
+        # Sums over the windows, which are clipped at the image borders like doxapy
+        window_sum = dict(ddepth=cv.CV_64F, ksize=(self.window, self.window), anchor=(before, before),
+                          normalize=False, borderType=cv.BORDER_CONSTANT)
+
+        pixels = gray.astype(np.float64)
+        area = cv.boxFilter(np.ones_like(pixels), **window_sum)
+        mean = cv.boxFilter(pixels, **window_sum) / area
+        std = np.sqrt(np.maximum(cv.boxFilter(pixels * pixels, **window_sum) / area - mean * mean, 0))
+        threshold = mean * (1 + self.k * (std / 128 - 1))
+
+        np.copyto(out, np.where(gray <= threshold, 0, 255).astype(np.uint8))
+
+
+_binarizers = threading.local()
+
+
+def get_binarizer():
+    """Returns the SauvolaBinarizer of the calling thread, so its buffers are reused without locking."""
+    binarizer = getattr(_binarizers, "binarizer", None)
+    if binarizer is None:
+        binarizer = SauvolaBinarizer()
+        _binarizers.binarizer = binarizer
+    return binarizer
+
+
+def connected_component_stats(image, connectivity=8):
+    """
+    Labels the connected components of the ink of a binary image.
+
+    Args:
+        image (np.ndarray): Binary image where ink pixels are 1 (see convert_binary).
+        connectivity (int): 8 or 4 neighbour connectivity.
+
+    Returns:
+        tuple: The number of components and an int array of shape (count, 5) with the x, y, width,
+               height and area (pixels) of every component.
+    """
+    ink = (np.asarray(image) == 1).astype(np.uint8)
+    num_labels, _, stats, _ = cv.connectedComponentsWithStats(ink, connectivity=connectivity)
+
+    # Label 0 is the background
+    return num_labels - 1, stats[1:]
 
 
 def connected_components(image):
-    X = [0, -1, -1, -1, 0, 1, 1, 1]
-    Y = [1, 1, 0, -1, -1, -1, 0, 1]
-    pass_flag = True
-    obj = stack()
-    final_point_array = list()
-    i = 0
-    j = 0
-    count = 0
-    limit = image.shape[0] / 1
-    while i < image.shape[0]:
-        #         print(i)
-        while j < image.shape[1]:
-            flag = True
-            pass_flag = True
-            point_array = list()
-            m = int()
-            n = int()
-            if image[i][j] == 1:
-                obj.push((i, j))
-                while flag:
-                    center_pixel = obj.pop()
-                    n = center_pixel[0]
-                    m = center_pixel[1]
-                    if image[n][m] == 1:
-                        point_array.append(center_pixel)
-                        image[n][m] = 3
-                    for k in range(len(X)):
-                        row = n + X[k]
-                        column = m + Y[k]
-                        if row < 0 or column < 0 or row >= image.shape[0] or column >= image.shape[1]:
-                            pass
-                        else:
-                            if image[row][column] == 1:
-                                center_pixel = obj.push((row, column))
-                            elif obj.is_empty():
-                                #                                 print(count)
-                                #                                 i=0
-                                #                                 j=0
-                                pass_flag = False
-                                flag = False
-                final_point_array.append(point_array)
-            else:
-                if pass_flag:
-                    j += 1
-        if pass_flag:
-            if i >= limit:
-                break
-            i += 1
-            j = 0
-    return len(final_point_array)
-
-
-def convert_binary(image):
+    """
+    Counts the 8 connected components of the ink of a binary image (ink pixels are 1, see convert_binary).
+    The image is not modified.
+    """
+    return connected_component_stats(image)[0]
+
+
+def image_connected_components(image_path, threshold=195):
+    """
+    Reads an image, binarizes it with convert_binary and labels its connected components.
+
+    Returns:
+        tuple: See connected_component_stats.
+    """
+    image = cv.imread(image_path)
+    if image is None:
+        raise ValueError(f"Could not read image {image_path}")
+
+    return connected_component_stats(convert_binary(image, threshold=threshold))
+
+
+def _directory_worker(args):
+    image_path, threshold = args
+    try:
+        return image_connected_components(image_path, threshold=threshold)
+    except Exception as e:
+        print(f"Error processing file {image_path}: {e}")
+        return None
+
+
+def directory_connected_components(dir_path, threshold=195, workers=None, chunksize=64,
+                                   extensions=(".jpg", ".jpeg", ".png", ".bmp", ".tiff")):
+    """
+    Labels the connected components of every image of a directory with a pool of processes.
+
+    Args:
+        dir_path (str): Directory of line or page images.
+        threshold (int): Gray level up to which a pixel is ink (see convert_binary).
+        workers (int): Number of processes, os.cpu_count() by default. 1 runs in the calling process.
+        chunksize (int): Images sent to a process at a time.
+        extensions (tuple): Extensions of the image files.
+
+    Returns:
+        dict: File name to the (count, stats) of the image (see connected_component_stats), images that
+              could not be read are left out.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    file_names = sorted(f for f in os.listdir(dir_path) if f.lower().endswith(extensions))
+    tasks = [(os.path.join(dir_path, f), threshold) for f in file_names]
+
+    if workers == 1:
+        results = map(_directory_worker, tasks)
+        return {f: r for f, r in zip(file_names, results) if r is not None}
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = executor.map(_directory_worker, tasks, chunksize=chunksize)
+        return {f: r for f, r in zip(file_names, results) if r is not None}
+
+
+def convert_binary(image, threshold=195):
     if len(image.shape) == 3:
         gray_image = cv.cvtColor(image, cv.COLOR_BGR2GRAY)
     elif len(image.shape) < 3:
         gray_image = image
-    (thresh, gray_image) = cv.threshold(gray_image, 195, 255, cv.THRESH_BINARY)
+    (thresh, gray_image) = cv.threshold(gray_image, threshold, 255, cv.THRESH_BINARY)
     gray_image[gray_image == 0] = 1  # black pixels set to 1
     gray_image[gray_image == 255] = 0  # white pixels set to 0
     #     gray_image[gray_image == 1] = 255
@@ -35,7 +35,12 @@ def _cast_to_correct_dtype(name, value):
                  "attention_type",
                  "decoder_unit_type",
                  "decoder_type",
-                 "lm_path"]
+                 "lm_path",
+                 "inference_graph",
+                 "cpu_affinity",
+                 "backend",
+                 "onnx_model",
+                 "quantized_onnx_model"]
 
     bool_types = ["use_gpu",
                   "debug_mode",
@@ -56,7 +61,9 @@ def _cast_to_correct_dtype(name, value):
                   "output_attention",
                   "pass_hidden_state",
                   "do_scheduled_sampling",
-                  "anneal_not_sampling_prob"]
+                  "anneal_not_sampling_prob",
+                  "quantized",
+                  "binarize_once"]
 
     int_types = ["max_outputs",
                  "stop_after_num_epochs",
@@ -79,7 +86,9 @@ def _cast_to_correct_dtype(name, value):
                  "decoder_num_residual_layers",
                  "decoder_num_units",
                  "beam_width",
-                 "ngrams"]
+                 "ngrams",
+                 "intra_op_threads",
+                 "inter_op_threads"]
 
     float_types = ["restore_best_model_range",
                    "lr",
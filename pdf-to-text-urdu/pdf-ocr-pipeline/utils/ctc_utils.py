@@ -0,0 +1,44 @@
+"""
+    CTC decoding of the recognition model outputs with NumPy, for the backends
+    that return the logits instead of decoding them in a TensorFlow graph.
+"""
+
+import numpy as np
+
+__all__ = ["ctc_greedy_decode"]
+
+
+def ctc_greedy_decode(logits, seq_len=None, blank=None):
+    """
+    Greedy CTC decoding of a batch, like tf.nn.ctc_greedy_decoder with merge_repeated: the best class
+    of every time step is taken, repeated classes are merged and blanks are dropped. The softmax
+    probability of every label kept is computed at the time step it is emitted, only for those steps.
+
+    Args:
+        logits (np.ndarray): [batch, time, classes] logits of the model.
+        seq_len (np.ndarray): Time steps of every line, all of them by default.
+        blank (int): Blank class, the last class by default as in TensorFlow.
+
+    Returns:
+        tuple: (labels, probabilities) lists with the label ids (np.ndarray) of every line of the batch
+               and the probability (np.ndarray) of every label.
+    """
+    batch_size, max_time, num_classes = logits.shape
+    blank = num_classes - 1 if blank is None else blank
+    if batch_size == 0:
+        return [], []
+
+    best = logits.argmax(axis=2)
+    previous = np.concatenate([np.full((batch_size, 1), -1, dtype=best.dtype), best[:, :-1]], axis=1)
+
+    keep = (best != blank) & (best != previous)
+    if seq_len is not None:
+        keep &= np.arange(max_time)[None, :] < np.asarray(seq_len)[:, None]
+
+    # max softmax probability = 1 / sum(exp(logits - max logit)) of the kept steps
+    kept_logits = logits[keep].astype(np.float64)
+    kept_logits -= kept_logits.max(axis=1, keepdims=True)
+    probabilities = 1.0 / np.exp(kept_logits).sum(axis=1)
+
+    splits = np.cumsum(keep.sum(axis=1))[:-1]
+    return np.split(best[keep], splits), np.split(probabilities, splits)
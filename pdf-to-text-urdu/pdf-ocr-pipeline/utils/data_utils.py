@@ -110,6 +110,27 @@ def load_gt(gt_directory, image_directory=None, image_width=None, image_range=No
 
     return gt, filenames
 
+
+def load_labelled_lines(data_folder, char_or_lig, max_lines=None):
+    """
+    Reads the line images of a labelled data folder (images/ and labels/gt_<char_or_lig>.csv).
+
+    Returns:
+        tuple: The line images (np.ndarray, BGR) and their label ids, images that could not be read
+               are left out.
+    """
+    labels, file_names = load_gt(os.path.join(data_folder, "labels", "gt_" + char_or_lig + ".csv"),
+                                 os.path.join(data_folder, "images"), size=max_lines)
+
+    images, image_labels = [], []
+    for file_name, label in zip(file_names, labels):
+        image = cv2.imread(file_name)
+        if image is not None:
+            images.append(image)
+            image_labels.append(label)
+
+    return images, image_labels
+
 # Load the _bucket_gt data by returing images_Label, images_Label_seq_len 
 def _bucket_gt(gt, num_buckets, bucket_indices):
     y_seq_len = [len(g) for g in gt]
@@ -17,7 +17,6 @@ import cv2
 import time
 import os
 import collections
-import doxapy
 
 VERBOSE = False
 
@@ -102,6 +101,44 @@ class ImagePreprocessing():
         return images
 
 
+class InferringPreprocessing():
+    """
+    Preprocessing of INFERRING line images that binarizes every line only once.
+
+    ImagePreprocessing(INFERRING) binarizes a line to find its white columns, again to find its
+    white rows, and _resize_images binarizes the cropped line a third time. Here the white columns
+    and rows are found on a single binarization and the binarized crop is returned, ready for
+    _resize_image. The three pass path detects the background again on the cropped line and Sauvola
+    sees a cropped neighbourhood near its edges, so crops and edge pixels can differ from the three
+    pass result and the model sees slightly different lines. It is only used with "binarize_once"
+    in the model config, measure the CER change on labelled lines with
+    scripts/image_processing/compare_inferring_preprocessing.py before setting it.
+
+    Lines that are already binarized, e.g. views of the binary page of a PageContext, are only
+    cropped. The binarizer gives ink 0 and background 255, and like _remove_white_columns and
+    _remove_white_rows the crop drops the columns and rows that are 0 throughout, i.e. without any
+    background pixel, so the background margins of a line are kept as the model was trained on them.
+    """
+
+    def __call__(self, image, binarized=False):
+        from .binarization import get_gray_image, get_binarizer
+
+        if binarized:
+            binarized_image = np.asarray(image)
+        else:
+            # The binarizer's buffer is not copied, the masked crops below are new arrays
+            binarized_image = get_binarizer().binarize(get_gray_image(np.array(image)), copy=False)
+
+        # The same columns and rows as _remove_white_columns and _remove_white_rows: 0 throughout
+        column_mask = (binarized_image == 0).all(0)
+        binarized_image = binarized_image[:, ~column_mask]
+
+        row_mask = (binarized_image == 0).all(1)
+        binarized_image = binarized_image[~row_mask, :]
+
+        return binarized_image
+
+
 def _naive_extract_red_component(image):
     lower = (30, 30, 0)
     upper = (255, 255, 255)
@@ -304,12 +341,10 @@ def _vertical_segmentation_using_projections(image):
 # binarized image means turn the Gray image into the numbers from 0(white) to 255(black) w.r.t the image pixels
 # intensity
 def _binarize(image, blur=True):
-    # Defining window size and value of k which will be different for each channel
-    window_size = 94
-    k = 0.3
+    # Sauvola with window 94 and k 0.3, the binarizer of the thread keeps its buffers between calls
     # Geo News For now
     
-    from  .binarization import get_gray_image, convert_binary
+    from  .binarization import get_gray_image, get_binarizer
     # cv2.imshow("Original", image)
 
     
@@ -317,15 +352,7 @@ def _binarize(image, blur=True):
     gray_img = get_gray_image(image)
     # cv2.imshow("Gray", gray_img)
     
-    #         img = cv.imread(img_path)
-    # binary_image = np.empty(gray_img.shape, gray_img.dtype)
-    #  cv2.imshow("Binary", binary_image)
-    # binary_image = gray_img
-    
-    binary_image = np.empty(gray_img.shape, gray_img.dtype)
-    sauvola = doxapy.Binarization(doxapy.Binarization.Algorithms.SAUVOLA)
-    sauvola.initialize(gray_img)
-    sauvola.to_binary(binary_image, {"window": window_size, "k": k})
+    binary_image = get_binarizer().binarize(gray_img)
 
 
     # cv2.imshow("Binarized", binary_image)
@@ -411,7 +438,7 @@ def _merge(a, b):
 
 
 # resize The images by calling the _resize_image method
-def _resize_images(image, image_size, flip_image=True, buckets=1):
+def _resize_images(image, image_size, flip_image=True, buckets=1, binarize=True):
     features = []
     seq_len = []
 
@@ -426,7 +453,9 @@ def _resize_images(image, image_size, flip_image=True, buckets=1):
     # cv2.waitKey(0)
 
     # Call the _resize_image method by passing the binarizing the the image
-    f, s = _resize_image(_binarize(image, blur=True), image_size, flip_image=flip_image)
+    if binarize:
+        image = _binarize(image, blur=True)
+    f, s = _resize_image(image, image_size, flip_image=flip_image)
     if VERBOSE:
         cv2.imshow("resized image", f)
         cv2.waitKey(0)
@@ -602,7 +631,7 @@ def handle_training(filenames, image_size, flip_image=True, buckets=1, params=TR
     return images, seq_len, bucket_indices
 
 
-def handle_inferring(image_strip, image_size, flip_image=True, buckets=1, params=INFERRING):
+def handle_inferring(image_strip, image_size, flip_image=True, buckets=1, params=INFERRING, binarize_once=False):
     """
     'paths' can be one of the following:
         - string: in which case it can be a:
@@ -646,13 +675,19 @@ def handle_inferring(image_strip, image_size, flip_image=True, buckets=1, params
     #     raise ValueError("Unvalid 'paths' type %s" % type(paths))
 
     # images = []
-    preprocessor = ImagePreprocessing(params)
+    if params == INFERRING and binarize_once:
+        # Binarizes the line once and returns the binarized crop
+        image_strip = InferringPreprocessing()(image_strip)
+        images, seq_len, _ = _resize_images(image_strip, image_size, flip_image=flip_image, buckets=buckets,
+                                            binarize=False)
+    else:
+        preprocessor = ImagePreprocessing(params)
 
-    # for f in filenames:
-    # IMAGE IS PASSING CORRECTLY
-    image_strip = preprocessor(image_strip, save_path=None)
-    # GETTING IMAGE CORRECTLY
-    images, seq_len, _ = _resize_images(image_strip, image_size, flip_image=flip_image, buckets=buckets)
+        # for f in filenames:
+        # IMAGE IS PASSING CORRECTLY
+        image_strip = preprocessor(image_strip, save_path=None)
+        # GETTING IMAGE CORRECTLY
+        images, seq_len, _ = _resize_images(image_strip, image_size, flip_image=flip_image, buckets=buckets)
 
     if buckets == 1:
         images = images[0]
@@ -660,3 +695,100 @@ def handle_inferring(image_strip, image_size, flip_image=True, buckets=1, params
 
     return images, seq_len
 
+
+
+
+def preprocess_inferring_strip(image_strip, image_size, flip_image=True, preprocessor=None, binarized=False):
+    """
+    Applies the handle_inferring preprocessing to a single line image without padding it.
+
+    Args:
+        preprocessor: ImagePreprocessing(INFERRING) (the default) or an InferringPreprocessing.
+        binarized (bool): image_strip is already a binary line of the SauvolaBinarizer (ink 0,
+                          background 255), e.g. LineView.binary. It is only cropped by an
+                          InferringPreprocessing, which drops the columns and rows without
+                          background pixels (all 0) and keeps the background margins.
+
+    Returns:
+        tuple: The resized line image and its sequence length (width).
+    """
+    if binarized:
+        preprocessor = InferringPreprocessing()
+    elif preprocessor is None:
+        preprocessor = ImagePreprocessing(INFERRING)
+
+    if isinstance(preprocessor, InferringPreprocessing):
+        binarized_image = preprocessor(image_strip, binarized=binarized)
+    else:
+        binarized_image = _binarize(preprocessor(image_strip, save_path=None), blur=True)
+
+    return _resize_image(binarized_image, image_size, flip_image=flip_image)
+
+
+def pad_inferring_batch(features, seq_len, image_size, flip_image=True):
+    """
+    Pads lines returned by preprocess_inferring_strip up to the widest one and stacks them into a batch.
+
+    Every line is normalized on its own first, as handle_inferring normalizes a single line, so the
+    padding does not change the mean and deviation of the lines. The padded time steps are zeros after
+    the steps of each line.
+    """
+    if image_size[0] is not None:
+        # Fixed size images are already padded and normalized by _resize_image
+        return np.array(features)
+
+    lines = [_pad_image_horizontally(f, f.shape[1], flip_image=flip_image) for f in features]
+
+    batch = np.zeros((len(lines), max(seq_len), lines[0].shape[1]))
+    for i, line in enumerate(lines):
+        batch[i, :line.shape[0]] = line
+
+    return batch
+
+
+def handle_inferring_batch(image_strips, image_size, flip_image=True, buckets=4, max_batch=32, params=INFERRING,
+                           binarized=False, binarize_once=False):
+    """
+    Batched counterpart of handle_inferring for a list of line images.
+
+    Every line goes through the same preprocessing as handle_inferring (binarized only once with
+    binarize_once, see InferringPreprocessing), or is only cropped if the lines are already binarized
+    (see preprocess_inferring_strip). The lines are then grouped
+    into width buckets (see _bucket), sorted by width inside each bucket and split into batches of
+    at most max_batch lines, each padded only up to its own widest line.
+
+    Returns:
+        list: (images, seq_len, indices) tuples, one per batch, where indices are the positions
+              of the batch lines in image_strips.
+    """
+    preprocessor = InferringPreprocessing() if params == INFERRING and binarize_once else ImagePreprocessing(params)
+
+    features = []
+    seq_len = []
+    for image_strip in image_strips:
+        f, s = preprocess_inferring_strip(image_strip, image_size, flip_image=flip_image, preprocessor=preprocessor,
+                                          binarized=binarized)
+        features.append(f)
+        seq_len.append(s)
+
+    if not features:
+        return []
+
+    if image_size[0] is not None or buckets <= 1 or min(seq_len) == max(seq_len):
+        bucket_positions = [np.arange(len(features))]
+    else:
+        _, _, bucket_indices = _bucket(features, seq_len, buckets)
+        bucket_positions = [np.where(bucket_indices == b)[0] for b in np.unique(bucket_indices)]
+
+    batches = []
+    for positions in bucket_positions:
+        positions = sorted(positions, key=lambda i: seq_len[i])
+        for start in range(0, len(positions), max_batch):
+            indices = [int(i) for i in positions[start:start + max_batch]]
+            batch_seq_len = np.array([seq_len[i] for i in indices])
+            images = pad_inferring_batch([features[i] for i in indices], batch_seq_len, image_size,
+                                         flip_image=flip_image)
+
+            batches.append((images, batch_seq_len, indices))
+
+    return batches
@@ -28,7 +28,6 @@ import time
 import cv2
 import gc
 import psutil
-import tensorflow as tf
 
 skip_files = ["Irtbat-e-Harf-o-Maani_pg8_ln2.jpg"]
 
@@ -114,7 +113,8 @@ def ocr_on_images_dir(dir, tech="Updated"):
                 log_file.write(
                     f"before loading model: {current_memory:.2f} GB (Current), {system_memory:.2f} GB (System Occupied)")
 
-            # model = get_model('configs/CNN_RNN_CTC/MMA-UD.json')
+            # The model is shared by every image, it is built once here and reused by the registry.
+            model = get_model('configs/CNN_RNN_CTC/MMA-UD.json')
 
             current_memory, system_memory = get_memory_usage()
             print(
@@ -184,7 +184,6 @@ def ocr_on_images_dir(dir, tech="Updated"):
                         log_file.write(
                             f"before prediction: {current_memory:.2f} GB (Current), {system_memory:.2f} GB (System Occupied)")
 
-                    model = get_model('configs/CNN_RNN_CTC/MMA-UD.json')
                     prediction = do_pred(image, model)
 
                     current_memory, system_memory = get_memory_usage()
@@ -194,16 +193,6 @@ def ocr_on_images_dir(dir, tech="Updated"):
                         log_file.write(
                             f"after prediction: {current_memory:.2f} GB (Current), {system_memory:.2f} GB (System Occupied)")
 
-                    tf.keras.backend.clear_session()
-                    gc.collect()
-
-                    current_memory, system_memory = get_memory_usage()
-                    print(
-                        f"after clearing session: {current_memory:.2f} GB (Current), {system_memory:.2f} GB (System Occupied)")
-                    with open(log_file_path, "a") as log_file:
-                        log_file.write(
-                            f"after clearing session: {current_memory:.2f} GB (Current), {system_memory:.2f} GB (System Occupied)")
-
                     with open(save_path, "w") as f:
                         f.write(prediction + '\n')
                     print(f"Saved prediction at: {save_path}")
@@ -0,0 +1,97 @@
+"""
+    Threading and CPU placement of the sessions of the recognition models.
+
+    TensorFlow sizes its thread pools to every core of the machine by default, so
+    several server processes on one box each start a pool per core and fight over
+    them. The pool sizes and the cores a process is pinned to are read from the
+    model config (intra_op_threads, inter_op_threads, cpu_affinity) and can be
+    overridden per process with environment variables, e.g. from a gunicorn hook.
+"""
+
+import collections
+import os
+
+__all__ = ["SessionThreads", "session_threads", "parse_cpu_list", "pin_process"]
+
+INTRA_OP_THREADS_ENV = "OCR_INTRA_OP_THREADS"
+INTER_OP_THREADS_ENV = "OCR_INTER_OP_THREADS"
+CPU_AFFINITY_ENV = "OCR_CPU_AFFINITY"
+
+# 0 threads leaves the pool size to TensorFlow, an empty cpu_affinity does not pin the process
+SessionThreads = collections.namedtuple("SessionThreads", ["intra_op_threads", "inter_op_threads", "cpu_affinity"])
+
+
+def parse_cpu_list(spec):
+    """
+    Parses a CPU list like "0-3,8,10-11" into a sorted list of CPU ids.
+
+    Args:
+        spec (str): CPU list, None, "" or "None" for no CPUs.
+
+    Returns:
+        list: CPU ids.
+    """
+    if spec is None or spec.strip() in ("", "None"):
+        return []
+
+    cpus = set()
+    for part in spec.split(","):
+        part = part.strip()
+        if "-" in part:
+            first, last = part.split("-")
+            cpus.update(range(int(first), int(last) + 1))
+        else:
+            cpus.add(int(part))
+
+    return sorted(cpus)
+
+
+def _env_int(name, default):
+    value = os.environ.get(name)
+    return int(value) if value not in (None, "") else default
+
+
+def session_threads(config):
+    """
+    Returns the session threading of a model config, the environment variables taking precedence.
+
+    Args:
+        config (Config): Model config (see config_utils.get_config), the threading keys are optional.
+
+    Returns:
+        SessionThreads: Intra and inter op pool sizes and the CPUs to pin the process to.
+    """
+    intra_op_threads = _env_int(INTRA_OP_THREADS_ENV, getattr(config, "intra_op_threads", 0))
+    inter_op_threads = _env_int(INTER_OP_THREADS_ENV, getattr(config, "inter_op_threads", 0))
+    cpu_affinity = parse_cpu_list(os.environ.get(CPU_AFFINITY_ENV, getattr(config, "cpu_affinity", None)))
+
+    return SessionThreads(intra_op_threads, inter_op_threads, cpu_affinity)
+
+
+def pin_process(cpus):
+    """
+    Pins every thread of the process to the given CPUs. Threads started afterwards, like the thread
+    pools of a session created next, inherit the affinity of the thread starting them.
+
+    Args:
+        cpus (list): CPU ids, nothing is done if it is empty.
+
+    Returns:
+        bool: Whether the process was pinned.
+    """
+    if not cpus:
+        return False
+
+    if not hasattr(os, "sched_setaffinity"):
+        print("CPU affinity is not supported on this platform, cpu_affinity is ignored.")
+        return False
+
+    # On Linux sched_setaffinity applies to a single thread, so every thread of the process is pinned
+    thread_ids = [int(tid) for tid in os.listdir("/proc/self/task")] if os.path.isdir("/proc/self/task") else [0]
+    for thread_id in thread_ids:
+        try:
+            os.sched_setaffinity(thread_id, cpus)
+        except ProcessLookupError:
+            continue  # the thread has exited
+
+    return True
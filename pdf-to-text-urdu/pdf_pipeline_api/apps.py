@@ -0,0 +1,39 @@
+import os
+import sys
+
+from django.apps import AppConfig
+
+
+class PdfPipelineApiConfig(AppConfig):
+    name = 'pdf_pipeline_api'
+
+    def ready(self):
+        """
+        Loads the OCR model into the process wide registry when the server starts,
+        so the first upload does not pay for building the graph, and starts the OCR job workers.
+        """
+        from pdf_pipeline_api.config import (MODEL_CONFIG_PATH, PRELOAD_MODEL, USE_BATCH_SCHEDULER,
+                                             MAX_BATCH_SIZE, MAX_BATCH_WAIT_MS, BATCH_DISPATCHERS)
+
+        if not PRELOAD_MODEL:
+            return
+
+        # The runserver autoreloader only watches files, the model is needed in the serving child process.
+        if 'runserver' in sys.argv and os.environ.get('RUN_MAIN') != 'true':
+            return
+
+        from pdf_ocr_pipeline.model_registry import preload_models
+
+        print("Loading OCR model ......")
+        preload_models([MODEL_CONFIG_PATH])
+
+        if USE_BATCH_SCHEDULER:
+            from pdf_ocr_pipeline.batch_scheduler import get_scheduler
+
+            get_scheduler(MODEL_CONFIG_PATH, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_BATCH_WAIT_MS,
+                          num_dispatchers=BATCH_DISPATCHERS)
+
+        from pdf_pipeline_api.ocr_jobs import get_job_workers
+
+        # Continues the jobs interrupted by a restart
+        get_job_workers()
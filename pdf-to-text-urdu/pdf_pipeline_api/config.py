@@ -1 +1,28 @@
-DEBUG =  True # decides rather to save images of lines and pages or not
\ No newline at end of file
+DEBUG =  True # decides rather to save images of lines and pages or not
+
+MODEL_CONFIG_PATH = 'pdf_ocr_pipeline/configs/CNN_RNN_CTC/MMA-UD.json'  # recognition model served by the api
+PRELOAD_MODEL = True  # load the model once at startup instead of on the first request
+
+PDF_RENDER_THREADS = 4  # pdftoppm processes rasterising the pages of a pdf at once
+PRESCREEN_PAGES = False  # skip blank and figure only pages found on low resolution thumbnails, off until measured on real books
+USE_TEXT_LAYER = True  # read born-digital pdf pages from their urdu text layer instead of running ocr
+DESKEW_PAGES = False  # estimate the skew of every page once and rotate the whole page before finding its lines, off until its CER is compared
+USE_PAGE_BINARY = False  # recognise lines from the binarized page instead of binarizing every line crop again, off until its CER is compared
+LINE_SEGMENTATION = 'morphology'  # 'projection' finds the lines of single column pages from the row ink profile, falling back to morphology
+MORPHOLOGY_SCALE = 1.0  # downscale factor of the page for the line finding morphology, e.g. 0.5 for 300-600 DPI scans
+DETECT_COLUMNS = False  # split multi column pages at their gutters and read the columns right to left
+LAYOUT_WORKERS = 2  # threads finding the lines of the columns of a page at once
+CALIBRATE_KERNELS = False  # scale the line finding kernels to the text size of every book, measured on a sample of its pages, needs calibration.REFERENCE_TEXT_HEIGHT
+KERNEL_CALIBRATION_PATH = 'output/kernel_calibration.json'  # calibrated kernel sizes keyed by the hash of the pdf
+BATCH_LINES = False  # recognise the lines of a page in padded batches instead of one by one, off until scripts/stats/check_batched_inference.py passes on the served model
+RETURN_LINE_BOXES = False  # return every line as {"text": ..., "box": [x, y, w, h]} with its position on the page
+
+# Cross request micro-batching of line recognition
+USE_BATCH_SCHEDULER = False  # queue lines of concurrent requests into shared session runs, off until batched and single line outputs are verified equal (see BATCH_LINES)
+MAX_BATCH_SIZE = 32  # maximum lines per session run
+MAX_BATCH_WAIT_MS = 5  # maximum time the oldest queued line waits for a batch to fill
+BATCH_DISPATCHERS = 1  # batches recognised on the model at the same time, see "Session Threads" in the Readme
+
+# Asynchronous OCR jobs
+OCR_JOBS_DB_PATH = 'output/ocr_jobs.sqlite3'  # local queue and per page results of the jobs
+OCR_JOB_WORKERS = 2  # jobs processed at the same time
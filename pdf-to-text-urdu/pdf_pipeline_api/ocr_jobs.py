@@ -0,0 +1,345 @@
+"""
+    Asynchronous OCR jobs for large PDFs.
+
+    Uploaded PDFs are saved under output/jobs/<job_id> and queued in a local SQLite
+    database. A pool of worker threads takes queued jobs, OCRs them page by page
+    and stores the result of every page as soon as it is done, so clients can
+    poll the progress and read partial results.
+
+    Several server processes can share the database: a job is claimed by a single
+    process, which records itself as the owner and keeps a heartbeat while the job
+    runs. Jobs whose owner died (e.g. interrupted by a restart) are queued again and
+    only render the pages that are not finished yet.
+"""
+
+import json
+import os
+import socket
+import sqlite3
+import threading
+import uuid
+from datetime import datetime, timedelta
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+# Page statuses, besides DONE and FAILED
+NO_TEXT = "no_text"
+
+HEARTBEAT_INTERVAL = 10  # seconds between the heartbeats of the running jobs of a process
+STALE_JOB_SECONDS = 60  # running jobs without a heartbeat for this long are queued again
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    file_name TEXT NOT NULL,
+    pdf_path TEXT NOT NULL,
+    output_base TEXT NOT NULL,
+    status TEXT NOT NULL,
+    num_pages INTEGER,
+    pages_skipped INTEGER,
+    error TEXT,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    owner TEXT,
+    heartbeat TEXT
+);
+CREATE TABLE IF NOT EXISTS job_pages (
+    job_id TEXT NOT NULL,
+    page_number INTEGER NOT NULL,
+    page_name TEXT NOT NULL,
+    status TEXT NOT NULL,
+    predicted_data TEXT,
+    page_text TEXT,
+    PRIMARY KEY (job_id, page_number)
+);
+"""
+
+
+_TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Columns added after the first release, added to existing databases
+_ADDED_JOB_COLUMNS = {"owner": "TEXT", "heartbeat": "TEXT", "pages_skipped": "INTEGER"}
+
+
+def _now():
+    return datetime.now().strftime(_TIME_FORMAT)
+
+
+def process_owner():
+    """Returns the owner name of the jobs claimed by this process, host:pid."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _owner_is_dead(owner):
+    """Returns True if the owner is a process of this host that no longer runs."""
+    host, _, pid = (owner or "").rpartition(":")
+    if host != socket.gethostname() or not pid.isdigit():
+        return False  # processes of other hosts are only judged by their heartbeat
+
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return True
+    except PermissionError:
+        return False
+    return False
+
+
+class JobStore():
+    """SQLite backed queue of OCR jobs and their per page results."""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+
+        db_folder = os.path.dirname(db_path)
+        if db_folder:
+            os.makedirs(db_folder, exist_ok=True)
+
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+            for column, column_type in _ADDED_JOB_COLUMNS.items():
+                if column not in columns:
+                    conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {column_type}")
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    @staticmethod
+    def new_job_id():
+        return uuid.uuid4().hex
+
+    def create_job(self, file_name, pdf_path, output_base, job_id=None):
+        """Queues a job for the saved PDF and returns its id."""
+        job_id = job_id or self.new_job_id()
+        with self._lock, self._connect() as conn:
+            conn.execute("INSERT INTO jobs (id, file_name, pdf_path, output_base, status, created_at, updated_at) "
+                         "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                         (job_id, file_name, pdf_path, output_base, QUEUED, _now(), _now()))
+        return job_id
+
+    def claim_next_job(self, owner=None):
+        """
+        Marks the oldest queued job as running and owned by this process and returns it, or None if the
+        queue is empty. The job is only claimed if it is still queued, so a job taken by another process
+        between the select and the update is skipped.
+        """
+        owner = owner or process_owner()
+        with self._lock, self._connect() as conn:
+            while True:
+                row = conn.execute("SELECT id FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1",
+                                   (QUEUED,)).fetchone()
+                if row is None:
+                    return None
+
+                claimed = conn.execute("UPDATE jobs SET status = ?, owner = ?, heartbeat = ?, updated_at = ? "
+                                       "WHERE id = ? AND status = ?",
+                                       (RUNNING, owner, _now(), _now(), row["id"], QUEUED)).rowcount
+                conn.commit()
+                if claimed:
+                    return dict(conn.execute("SELECT * FROM jobs WHERE id = ?", (row["id"],)).fetchone())
+
+    def heartbeat(self, owner=None):
+        """Records that the running jobs of this process are alive."""
+        with self._lock, self._connect() as conn:
+            conn.execute("UPDATE jobs SET heartbeat = ? WHERE status = ? AND owner = ?",
+                         (_now(), RUNNING, owner or process_owner()))
+
+    def requeue_orphaned_jobs(self, stale_seconds=STALE_JOB_SECONDS):
+        """
+        Queues the running jobs whose owner is dead again: processes of this host that no longer run, or
+        owners without a heartbeat for stale_seconds. Jobs of live processes are left running.
+
+        Returns:
+            list: Ids of the jobs queued again.
+        """
+        stale_before = (datetime.now() - timedelta(seconds=stale_seconds)).strftime(_TIME_FORMAT)
+        with self._lock, self._connect() as conn:
+            rows = conn.execute("SELECT id, owner, heartbeat FROM jobs WHERE status = ?", (RUNNING,)).fetchall()
+            orphaned = [row for row in rows
+                        if _owner_is_dead(row["owner"]) or (row["heartbeat"] or "") < stale_before]
+
+            job_ids = []
+            for row in orphaned:
+                # The owner and heartbeat must be unchanged, the job may have been claimed again meanwhile
+                requeued = conn.execute("UPDATE jobs SET status = ?, owner = NULL, updated_at = ? "
+                                        "WHERE id = ? AND status = ? AND owner IS ? AND heartbeat IS ?",
+                                        (QUEUED, _now(), row["id"], RUNNING, row["owner"],
+                                         row["heartbeat"])).rowcount
+                if requeued:
+                    job_ids.append(row["id"])
+
+        return job_ids
+
+    def set_num_pages(self, job_id, num_pages):
+        with self._lock, self._connect() as conn:
+            conn.execute("UPDATE jobs SET num_pages = ?, updated_at = ? WHERE id = ?", (num_pages, _now(), job_id))
+
+    def set_pages_skipped(self, job_id, pages_skipped):
+        with self._lock, self._connect() as conn:
+            conn.execute("UPDATE jobs SET pages_skipped = ?, updated_at = ? WHERE id = ?",
+                         (pages_skipped, _now(), job_id))
+
+    def finish_job(self, job_id, status, error=None):
+        with self._lock, self._connect() as conn:
+            conn.execute("UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE id = ?",
+                         (status, error, _now(), job_id))
+
+    def save_page(self, job_id, page_number, page_name, status, predicted_data=None, page_text=None):
+        with self._lock, self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO job_pages "
+                         "(job_id, page_number, page_name, status, predicted_data, page_text) "
+                         "VALUES (?, ?, ?, ?, ?, ?)",
+                         (job_id, page_number, page_name, status,
+                          json.dumps(predicted_data, ensure_ascii=False) if predicted_data is not None else None,
+                          page_text))
+            conn.execute("UPDATE jobs SET updated_at = ? WHERE id = ?", (_now(), job_id))
+
+    def get_job(self, job_id):
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row is not None else None
+
+    def get_pages(self, job_id):
+        """Returns the finished pages of a job in page order."""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT * FROM job_pages WHERE job_id = ? ORDER BY page_number",
+                                (job_id,)).fetchall()
+
+        pages = []
+        for row in rows:
+            page = dict(row)
+            page["predicted_data"] = json.loads(page["predicted_data"]) if page["predicted_data"] else None
+            pages.append(page)
+        return pages
+
+
+class JobWorkers():
+    """Pool of threads that process the queued jobs of a JobStore one page at a time."""
+
+    def __init__(self, store, num_workers=2, poll_interval=2.0):
+        self.store = store
+        self.num_workers = num_workers
+        self.poll_interval = poll_interval
+
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self):
+        self._requeue_orphaned_jobs()
+        for index in range(self.num_workers):
+            thread = threading.Thread(target=self._work_loop, name=f"ocr-job-worker-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+        thread = threading.Thread(target=self._heartbeat_loop, name="ocr-job-heartbeat", daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def _requeue_orphaned_jobs(self):
+        job_ids = self.store.requeue_orphaned_jobs()
+        if job_ids:
+            print(f"Queued {len(job_ids)} OCR jobs of stopped processes again: {job_ids}")
+            self._wakeup.set()
+
+    def _heartbeat_loop(self):
+        """Keeps the jobs of this process alive and takes over the jobs of processes that died."""
+        while not self._stop.is_set():
+            try:
+                self.store.heartbeat()
+                self._requeue_orphaned_jobs()
+            except sqlite3.Error as e:
+                print(f"OCR job heartbeat failed. Exception: {e}")
+            self._stop.wait(HEARTBEAT_INTERVAL)
+
+    def stop(self):
+        """Stops the heartbeat, and the workers once their running job is done."""
+        self._stop.set()
+        self._wakeup.set()
+
+    def notify(self):
+        """Wakes up the idle workers after a job was queued."""
+        self._wakeup.set()
+
+    def _work_loop(self):
+        while not self._stop.is_set():
+            job = self.store.claim_next_job()
+            if job is None:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+
+            try:
+                self.run_job(job)
+                self.store.finish_job(job["id"], DONE)
+            except Exception as e:
+                print(f"OCR job {job['id']} failed. Exception: {e}")
+                self.store.finish_job(job["id"], FAILED, error=str(e))
+
+    def run_job(self, job):
+        """OCRs the pages of a job that are not finished yet and saves the text of the document."""
+        from pdf_ocr_pipeline.convert_to_pages import get_pdf_page_count, iter_pdf_pages_with_text, page_number_of
+        from pdf_pipeline_api.config import PDF_RENDER_THREADS, PRESCREEN_PAGES, USE_TEXT_LAYER
+        from pdf_pipeline_api.views import PerformOcr
+
+        ocr = PerformOcr()
+        job_id, file_name, output_base = job["id"], job["file_name"], job["output_base"]
+
+        num_pages = get_pdf_page_count(job["pdf_path"])
+        self.store.set_num_pages(job_id, num_pages)
+
+        # Only the pages left are rendered, a resumed job continues where it stopped
+        finished_pages = {page["page_number"] for page in self.store.get_pages(job_id)}
+        pending_pages = [page_number for page_number in range(1, num_pages + 1) if page_number not in finished_pages]
+        page_images = iter_pdf_pages_with_text(job["pdf_path"], save=False, book_name=file_name,
+                                               thread_count=PDF_RENDER_THREADS, use_text_layer=USE_TEXT_LAYER,
+                                               prescreen=PRESCREEN_PAGES, page_numbers=pending_pages)
+        pages = ocr.book_pages(job["pdf_path"], page_images)
+        for kernel_sizes, (page_name, page_image, text_lines) in pages:
+            page_number = page_number_of(page_name)
+            try:
+                page_predictions, page_text = ocr.ocr_pdf_page(file_name, output_base, page_number, page_name,
+                                                               page_image, text_lines, kernel_sizes=kernel_sizes)
+            except Exception as e:
+                print(f"OCR job {job_id} failed on page {page_number}. Exception: {e}")
+                page_predictions = None
+
+            if page_predictions is None:
+                self.store.save_page(job_id, page_number, page_name, FAILED)
+            elif page_text is None:
+                self.store.save_page(job_id, page_number, page_name, NO_TEXT, predicted_data=page_predictions)
+            else:
+                self.store.save_page(job_id, page_number, page_name, DONE, predicted_data=page_predictions,
+                                     page_text=page_text)
+
+        # Blank and prescreened pages are not yielded, so they have no page of their own
+        self.store.set_pages_skipped(job_id, num_pages - len(self.store.get_pages(job_id)))
+
+        page_texts = {page["page_name"]: page["page_text"] for page in self.store.get_pages(job_id)
+                      if page["status"] == DONE}
+        ocr.save_document_text(output_base, file_name, page_texts)
+
+
+_workers = None
+_workers_lock = threading.Lock()
+
+
+def get_job_workers():
+    """Return the process wide job workers, starting them on first use."""
+    global _workers
+
+    with _workers_lock:
+        if _workers is None:
+            from pdf_pipeline_api.config import OCR_JOBS_DB_PATH, OCR_JOB_WORKERS
+
+            _workers = JobWorkers(JobStore(OCR_JOBS_DB_PATH), num_workers=OCR_JOB_WORKERS)
+            _workers.start()
+
+    return _workers
@@ -37,6 +37,7 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     'rest_framework',
     'drf_yasg',
+    'pdf_pipeline_api.apps.PdfPipelineApiConfig',
 ]
 
 # settings.py
@@ -20,7 +20,7 @@ from django.urls import path
 from rest_framework import permissions
 from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
-from .views import PerformOcr, view_utility_page, download_scope_document
+from .views import PerformOcr, OcrJobs, OcrJobStatus, view_utility_page, download_scope_document, ocr_batch_stats
 
 # Swagger schema view configuration
 schema_view = get_schema_view(
@@ -38,6 +38,9 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     path('utility/', view_utility_page , name='perform_ocr'),
     path('api/perform_ocr', PerformOcr.as_view() , name='perform_ocr'),
+    path('api/ocr_jobs', OcrJobs.as_view(), name='ocr_jobs'),
+    path('api/ocr_jobs/<str:job_id>', OcrJobStatus.as_view(), name='ocr_job_status'),
+    path('api/ocr_batch_stats', ocr_batch_stats, name='ocr_batch_stats'),
     path('download_scope_document/', download_scope_document, name='download_scope_document'),
 
     # Paths for Swagger documentation
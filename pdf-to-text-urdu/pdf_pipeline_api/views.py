@@ -1,4 +1,5 @@
 import csv
+import json
 import os
 from datetime import datetime
 from datetime import timedelta
@@ -6,7 +7,7 @@ from datetime import timedelta
 import cv2
 import numpy as np
 from django.conf import settings
-from django.http import FileResponse, HttpResponse
+from django.http import FileResponse, HttpResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render
 from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
@@ -16,10 +17,18 @@ from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from pdf_ocr_pipeline.convert_to_lines import page_to_lines_updated
-from pdf_ocr_pipeline.convert_to_pages import pdf_to_pages
-from pdf_ocr_pipeline.predict_and_save import get_model, do_pred
-from pdf_pipeline_api.config import DEBUG
+from pdf_ocr_pipeline.batch_scheduler import get_scheduler, get_all_stats
+from pdf_ocr_pipeline.calibration import DEFAULT_KERNEL_SIZES, calibrated_pages, get_calibration_cache
+from pdf_ocr_pipeline.convert_to_lines import page_to_line_views
+from pdf_ocr_pipeline.convert_to_pages import iter_pdf_pages_with_text
+from pdf_ocr_pipeline.page_context import PageContext
+from pdf_ocr_pipeline.predict_and_save import get_model, do_pred, do_batch_pred
+from pdf_pipeline_api.ocr_jobs import get_job_workers
+from pdf_pipeline_api.config import (DEBUG, MODEL_CONFIG_PATH, USE_BATCH_SCHEDULER, BATCH_LINES, MAX_BATCH_SIZE,
+                                     MAX_BATCH_WAIT_MS, BATCH_DISPATCHERS, PDF_RENDER_THREADS, PRESCREEN_PAGES, USE_TEXT_LAYER,
+                                     DESKEW_PAGES, USE_PAGE_BINARY, LINE_SEGMENTATION,
+                                     MORPHOLOGY_SCALE, DETECT_COLUMNS, LAYOUT_WORKERS, CALIBRATE_KERNELS,
+                                     KERNEL_CALIBRATION_PATH, RETURN_LINE_BOXES)
 
 
 def view_utility_page(request):
@@ -67,7 +76,9 @@ class PerformOcr(APIView):
     parser_classes = [MultiPartParser, FormParser]  # Ensures correct parsing for file uploads
 
     def __init__(self):
-        self.model = get_model('pdf_ocr_pipeline/configs/CNN_RNN_CTC/MMA-UD.json')
+        self.model = get_model(MODEL_CONFIG_PATH)  # shared model, built once per process
+        self.scheduler = get_scheduler(MODEL_CONFIG_PATH, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_BATCH_WAIT_MS,
+                                       num_dispatchers=BATCH_DISPATCHERS) if USE_BATCH_SCHEDULER else None
         self.width_thres = 40
         self.height_thres = 50
         self.DEBUG = DEBUG  # Toggle debug mode for saving files
@@ -86,7 +97,9 @@ class PerformOcr(APIView):
     @swagger_auto_schema(
         manual_parameters=[
             openapi.Parameter('file', openapi.IN_FORM, type=openapi.TYPE_FILE,
-                              description="Upload a file (.pdf, .png, .jpg)")
+                              description="Upload a file (.pdf, .png, .jpg)"),
+            openapi.Parameter('stream', openapi.IN_QUERY, type=openapi.TYPE_INTEGER,
+                              description="1 to stream the results of a .pdf page by page as NDJSON")
         ],
         responses={
             200: 'File uploaded successfully',
@@ -108,6 +121,8 @@ class PerformOcr(APIView):
         if file_extension in ['png', 'jpg', 'jpeg']:
             return self.process_image(file)
         elif file_extension == 'pdf':
+            if request.query_params.get('stream') == '1':
+                return self.stream_pdf(file)
             return self.process_pdf(file)
 
     def save_debug_files(self, base_folder, sub_folder, file_name, content, is_image=False):
@@ -121,6 +136,209 @@ class PerformOcr(APIView):
             with open(file_path, 'w', encoding='utf-8') as f:
                 f.write(content)  # Save text
 
+    def predict_lines(self, line_images, line_masks=None):
+        """
+        Predicts all line images in batches, shared with concurrent requests when the batch scheduler
+        is enabled, or one line per session run without BATCH_LINES. If the batch fails the lines are predicted one by one, so a single bad line does
+        not fail the others. Failed lines are returned as None.
+
+        Args:
+            line_images (list): BGR line images.
+            line_masks (list): Binary images of the lines cut from the binary page (see PageContext).
+                               When given they are recognised instead of binarizing every line again.
+        """
+        binarized = line_masks is not None
+        batch_images = line_masks if binarized else line_images
+        try:
+            if self.scheduler is not None:
+                return self.scheduler.predict(batch_images, binarized=binarized)
+            return do_batch_pred(batch_images, self.model, max_batch=MAX_BATCH_SIZE if BATCH_LINES else 1,
+                                 binarized=binarized)
+        except Exception as e:
+            print(f"Batch prediction failed, predicting line by line. Exception: {e}")
+
+        predictions = []
+        for count, line_image in enumerate(line_images):
+            try:
+                predictions.append(do_pred(line_image, self.model))
+            except Exception as e:
+                print(f"Prediction failed for Line {count + 1}. Exception: {e}")
+                predictions.append(None)
+
+        return predictions
+
+    def line_result(self, prediction, box=None):
+        """
+        Returns the prediction of a line, or with RETURN_LINE_BOXES the prediction and the (x, y, w, h)
+        box of the line on the page as it was uploaded (see PageContext.page_box), None for lines read from
+        a text layer.
+        """
+        if not RETURN_LINE_BOXES:
+            return prediction
+
+        return {"text": prediction, "box": list(box) if box is not None else None}
+
+    def ocr_page(self, file_name, output_base, count, page_name, page_image, kernel_sizes=DEFAULT_KERNEL_SIZES):
+        """
+        Extracts the lines of a page and predicts all of them together.
+
+        Args:
+            file_name (str): Name of the uploaded file, used for logging.
+            output_base (str): Output folder of the file.
+            count (int): Page number, starting at 1.
+            page_name (str): Name of the page image.
+            page_image (np.ndarray): BGR page image.
+            kernel_sizes (tuple): Closing and opening kernel sizes of the line finding morphology.
+
+        Returns:
+            tuple: (page_predictions, page_text). page_predictions is None if the lines could not be extracted,
+            page_text is None if no text was detected in the page.
+        """
+        print(f"Processing Page {count}...")
+
+        # Extract Lines from Page
+        print(f"Extracting Lines from Page {count}...")
+        try:
+            start_time = datetime.now()
+            lines = page_to_line_views(PageContext(page_image, deskew=DESKEW_PAGES), kernel_sizes=kernel_sizes,
+                                       method=LINE_SEGMENTATION, scale=MORPHOLOGY_SCALE, columns=DETECT_COLUMNS,
+                                       workers=LAYOUT_WORKERS)
+            end_time = datetime.now()
+            log_entry(file_name, f"Page {count} to Lines", start_time, end_time, "Success")
+            print(f"Extracted {len(lines)} lines from Page {count}.")
+
+            if self.DEBUG:
+                for line_index, line in enumerate(lines):
+                    self.save_debug_files(output_base, "lines", f"{page_name}_line_{line_index + 1}.png",
+                                          line.image,
+                                          is_image=True)
+        except Exception as e:
+            end_time = datetime.now()
+            log_entry(file_name, f"Page {count} to Lines", start_time, end_time, "Failure")
+            print(f"Failed to extract lines from Page {count}. Exception: {e}")
+            return None, None
+
+        # Skip pages with no detected lines
+        if not lines:
+            return {"error": "No text detected in this page."}, None
+
+        # Perform OCR on all Lines of the Page together
+        page_predictions = {}
+        page_text = []  # Start collecting text for the current page
+
+        line_numbers = []
+        valid_lines = []
+        for line_count, line in enumerate(lines, start=1):
+            if line.image.shape[0] < self.width_thres or line.image.shape[1] < self.height_thres:
+                print(f"Skipping Line {line_count} of Page {count} due to insufficient dimensions.")
+                continue
+
+            line_numbers.append(line_count)
+            valid_lines.append(line)
+
+        start_time = datetime.now()
+        predictions = self.predict_lines([line.image for line in valid_lines],
+                                         [line.binary for line in valid_lines] if USE_PAGE_BINARY else None)
+        end_time = datetime.now()
+        log_entry(file_name, f"OCR on Page {count}", start_time, end_time,
+                  "Failure" if None in predictions else "Success")
+
+        for line_count, line, prediction in zip(line_numbers, valid_lines, predictions):
+            if prediction is None:
+                print(f"Failed OCR for Line {line_count} of Page {count}.")
+                continue
+
+            page_predictions[f"line_{line_count}"] = self.line_result(prediction, line.page_box)
+            page_text.append(prediction)  # Append line prediction to the page text
+
+            if self.DEBUG:
+                self.save_debug_files(output_base, "predictions", f"{page_name}_line_{line_count}.txt",
+                                      prediction)
+
+        page_text = "\n".join(page_text)  # Join all lines for the page
+
+        # Save full page text if DEBUG is enabled
+        if self.DEBUG:
+            self.save_debug_files(output_base, "page_texts", f"{page_name}.txt", page_text)
+
+        return page_predictions, page_text
+
+    def ocr_pdf_page(self, file_name, output_base, count, page_name, page_image, text_lines=None,
+                     kernel_sizes=DEFAULT_KERNEL_SIZES):
+        """
+        Returns the predictions of a PDF page like ocr_page. Pages read from the embedded text layer
+        are returned as they are, rasterised pages are OCRed.
+
+        Args:
+            text_lines (list): Lines of the text layer of the page, None for rasterised pages.
+            kernel_sizes (tuple): Line finding kernel sizes of the book (see book_pages).
+        """
+        if text_lines is None:
+            # Save extracted page
+            if self.DEBUG:
+                self.save_debug_files(output_base, "pages", f"{page_name}.png", page_image, is_image=True)
+
+            return self.ocr_page(file_name, output_base, count, page_name, page_image, kernel_sizes=kernel_sizes)
+
+        print(f"Read Page {count} from the text layer.")
+        page_predictions = {f"line_{line_count}": self.line_result(line)
+                            for line_count, line in enumerate(text_lines, start=1)}
+        page_text = "\n".join(text_lines)
+
+        if self.DEBUG:
+            self.save_debug_files(output_base, "page_texts", f"{page_name}.txt", page_text)
+
+        return page_predictions, page_text
+
+    def book_pages(self, pdf, page_images):
+        """
+        Yields the pages of a book with their line finding kernel sizes. With CALIBRATE_KERNELS the kernel
+        sizes are calibrated on a sample of pages of the book before the first page and cached by the hash
+        of the PDF.
+
+        Args:
+            pdf (str or bytes): Path to the PDF or its bytes.
+            page_images (iterable): (page_name, page_image, text_lines) of the pages.
+
+        Yields:
+            tuple: (kernel_sizes, (page_name, page_image, text_lines)) of every page.
+        """
+        if not CALIBRATE_KERNELS:
+            return ((DEFAULT_KERNEL_SIZES, page) for page in page_images)
+
+        return calibrated_pages(pdf, page_images, cache=get_calibration_cache(KERNEL_CALIBRATION_PATH))
+
+    def save_document_text(self, output_base, file_name, page_texts):
+        """
+        Saves the full text of the document and the text of every page.
+
+        Args:
+            output_base (str): Output folder of the file.
+            file_name (str): Name of the uploaded file without extension.
+            page_texts (dict): Page name to page text, in page order.
+        """
+        # Save the full extracted text of the entire document to a text file
+        try:
+            os.makedirs(output_base, exist_ok=True)
+            full_text_filename = os.path.join(output_base, f"{file_name}.txt")
+            with open(full_text_filename, 'w') as full_text_file:
+                full_text_file.write("\n\n".join(page_texts.values()))  # Join pages with double newline
+            print(f"Full extracted text saved to {full_text_filename}.")
+        except Exception as e:
+            print(f"Failed to save full text file. Exception: {e}")
+
+        # Save page-wise text to individual files
+        try:
+            page_text_folder = os.path.join(output_base, "page_texts")
+            os.makedirs(page_text_folder, exist_ok=True)
+            for page_name, page_text in page_texts.items():
+                page_file_path = os.path.join(page_text_folder, f"{page_name}.txt")
+                with open(page_file_path, 'w') as page_file:
+                    page_file.write(page_text)
+            print("Page-wise texts saved successfully.")
+        except Exception as e:
+            print(f"Failed to save page-wise text files. Exception: {e}")
+
     def process_image(self, file):
         """Process an image file and return OCR results."""
         image_data = file.read()  # Read the image file into memory
@@ -133,10 +351,11 @@ class PerformOcr(APIView):
         print("Extracting Lines ......")
         start_time = datetime.now()
         try:
-            line_images = page_to_lines_updated(img_cv2)
+            lines = page_to_line_views(PageContext(img_cv2, deskew=DESKEW_PAGES), method=LINE_SEGMENTATION,
+                                       scale=MORPHOLOGY_SCALE, columns=DETECT_COLUMNS, workers=LAYOUT_WORKERS)
             end_time = datetime.now()
             log_entry(file_name, "Page to Lines", start_time, end_time, "Success")
-            print(f"Extracted {len(line_images)} Lines.")
+            print(f"Extracted {len(lines)} Lines.")
         except Exception as e:
             end_time = datetime.now()
             log_entry(file_name, "Page to Lines", start_time, end_time, "Failure")
@@ -145,39 +364,41 @@ class PerformOcr(APIView):
                             status=status.HTTP_400_BAD_REQUEST)
 
         # 2. If No Lines Detected, Return Error
-        if not line_images:
+        if not lines:
             return Response({"error": "OCR failed to detect any text in the image."},
                             status=status.HTTP_400_BAD_REQUEST)
 
-        # 3. OCR on Each Line
+        # 3. OCR on the Lines, all lines of the image are predicted together
         predicted_data = {}
         start_time = datetime.now()
 
-        for count, line_image in enumerate(line_images):
-            print(f"Processing Line {count + 1}...")
-            height, width, _ = line_image.shape
+        line_numbers = []
+        valid_lines = []
+        for count, line in enumerate(lines):
+            height, width, _ = line.image.shape
 
             if height > 25 and width > 70:
                 if self.DEBUG:
-                    self.save_debug_files(output_base, "lines", f"line_{count + 1}.png", line_image, is_image=True)
-
-                try:
-                    line_start_time = datetime.now()
-                    prediction = do_pred(line_image, self.model)
-                    line_end_time = datetime.now()
-
-                    predicted_data[f'line_{count + 1}'] = prediction
-                    log_entry(file_name, f"OCR on Line {count + 1}", line_start_time, line_end_time, "Success")
-
-                    if self.DEBUG:
-                        self.save_debug_files(output_base, "predictions", f"line_{count + 1}.txt", prediction)
-                except Exception as e:
-                    print(f"Prediction failed for Line {count + 1}. Exception: {e}")
-                    # Log the failure for this line but continue processing the next line
-                    continue
+                    self.save_debug_files(output_base, "lines", f"line_{count + 1}.png", line.image, is_image=True)
+
+                line_numbers.append(count + 1)
+                valid_lines.append(line)
             else:
                 print("Image to small to be processed!.")
 
+        print(f"Processing {len(valid_lines)} Lines...")
+        predictions = self.predict_lines([line.image for line in valid_lines],
+                                         [line.binary for line in valid_lines] if USE_PAGE_BINARY else None)
+
+        for line_number, line, prediction in zip(line_numbers, valid_lines, predictions):
+            if prediction is None:
+                continue
+
+            predicted_data[f'line_{line_number}'] = self.line_result(prediction, line.page_box)
+
+            if self.DEBUG:
+                self.save_debug_files(output_base, "predictions", f"line_{line_number}.txt", prediction)
+
         end_time = datetime.now()
         log_entry(file_name, "OCR", start_time, end_time, "Success")
 
@@ -192,115 +413,57 @@ class PerformOcr(APIView):
         file_name = os.path.splitext(file.name)[0]
         output_base = os.path.join(self.output_folder, file_name)
         predicted_data = {}
-
-        # Initialize variables for storing extracted text
-        full_text_output = []
         page_texts = {}  # Store page-wise text separately
 
-        # 1. Extract Pages
+        # 1. Extract Pages, lazily a few pages at a time so a page is freed once it is processed
         print("Extracting Pages...")
-        try:
-            start_time = datetime.now()
-            page_images = pdf_to_pages(pdf_data, save=False, book_name=file_name)
-            end_time = datetime.now()
-            log_entry(file_name, "PDF to Pages", start_time, end_time, "Success")
-            print(f"Extracted {len(page_images)} pages from the PDF.")
+        page_images = iter_pdf_pages_with_text(pdf_data, save=False, book_name=file_name,
+                                               thread_count=PDF_RENDER_THREADS, use_text_layer=USE_TEXT_LAYER,
+                                               prescreen=PRESCREEN_PAGES)
 
-            # Save extracted pages
-            if self.DEBUG:
-                for page_name, page_image in page_images.items():
-                    self.save_debug_files(output_base, "pages", f"{page_name}.png", page_image, is_image=True)
-        except Exception as e:
-            end_time = datetime.now()
-            log_entry(file_name, "PDF to Pages", start_time, end_time, "Failure")
-            print(f"Failed to extract pages from the PDF. Exception: {e}")
-            return Response({"error": "Failed to process PDF to pages."}, status=status.HTTP_400_BAD_REQUEST)
-
-        # 2. Process Each Page
-        for count, (page_name, page_image) in enumerate(page_images.items(), start=1):
-            print(f"Processing Page {count}...")
-
-            # Extract Lines from Page
-            print(f"Extracting Lines from Page {count}...")
+        # 2. Process Each Page, a page that fails is reported on its own and the other pages are still returned
+        start_time = datetime.now()
+        count = 0
+        pages = self.book_pages(pdf_data, page_images)
+        while True:
             try:
-                start_time = datetime.now()
-                line_images = page_to_lines_updated(page_image)
-                end_time = datetime.now()
-                log_entry(file_name, f"Page {count} to Lines", start_time, end_time, "Success")
-                print(f"Extracted {len(line_images)} lines from Page {count}.")
-
-                if self.DEBUG:
-                    for line_index, line_image in enumerate(line_images):
-                        self.save_debug_files(output_base, "lines", f"{page_name}_line_{line_index + 1}.png",
-                                              line_image,
-                                              is_image=True)
+                kernel_sizes, (page_name, page_image, text_lines) = next(pages)
+            except StopIteration:
+                break
             except Exception as e:
-                end_time = datetime.now()
-                log_entry(file_name, f"Page {count} to Lines", start_time, end_time, "Failure")
-                print(f"Failed to extract lines from Page {count}. Exception: {e}")
-                continue
+                log_entry(file_name, "PDF to Pages", start_time, datetime.now(), "Failure")
+                print(f"Failed to extract pages from the PDF after {count} pages. Exception: {e}")
+                if not predicted_data:
+                    return Response({"error": "Failed to process PDF to pages."}, status=status.HTTP_400_BAD_REQUEST)
+
+                # The pages read so far are returned, the rest of the PDF could not be read
+                self.save_document_text(output_base, file_name, page_texts)
+                return Response({
+                    "file": file.name,
+                    "predicted_data": predicted_data,
+                    "error": f"Failed to process the PDF to pages after page {count}."
+                }, status=status.HTTP_200_OK)
+
+            count += 1
+            try:
+                page_predictions, page_text = self.ocr_pdf_page(file_name, output_base, count, page_name, page_image,
+                                                                text_lines, kernel_sizes=kernel_sizes)
+            except Exception as e:
+                print(f"Failed to OCR Page {count}. Exception: {e}")
+                page_predictions, page_text = {"error": "Failed to OCR this page."}, None
 
-            # Skip pages with no detected lines
-            if not line_images:
-                predicted_data[page_name] = {"error": "No text detected in this page."}
+            if page_predictions is None:
                 continue
 
-            # Perform OCR on Each Line
-            page_predictions = {}
-            page_text = []  # Start collecting text for the current page
-            for line_count, line_image in enumerate(line_images, start=1):
-                if line_image.shape[0] < self.width_thres or line_image.shape[1] < self.height_thres:
-                    print(f"Skipping Line {line_count} of Page {count} due to insufficient dimensions.")
-                    continue
-
-                try:
-                    start_time = datetime.now()
-                    prediction = do_pred(line_image, self.model)
-                    end_time = datetime.now()
-                    log_entry(file_name, f"Line {line_count} OCR on Page {count}", start_time, end_time, "Success")
-                    page_predictions[f"line_{line_count}"] = prediction
-                    page_text.append(prediction)  # Append line prediction to the page text
-
-                    if self.DEBUG:
-                        self.save_debug_files(output_base, "predictions", f"{page_name}_line_{line_count}.txt",
-                                              prediction)
-                except Exception as e:
-                    end_time = datetime.now()
-                    log_entry(file_name, f"Line {line_count} OCR on Page {count}", start_time, end_time, "Failure")
-                    print(f"Failed OCR for Line {line_count} of Page {count}. Exception: {e}")
-                    continue
-
-            # Save page text
-            page_texts[page_name] = "\n".join(page_text)  # Join all lines for the page
             predicted_data[page_name] = page_predictions
+            if page_text is not None:
+                page_texts[page_name] = page_text
 
-            # Save full page text if DEBUG is enabled
-            if self.DEBUG:
-                self.save_debug_files(output_base, "page_texts", f"{page_name}.txt", page_texts[page_name])
-
-            # Add the page text to the full text output
-            full_text_output.append(page_texts[page_name])
-
-        # Save the full extracted text of the entire document to a text file
-        try:
-            full_text_filename = os.path.join(output_base, f"{file_name}.txt")
-            with open(full_text_filename, 'w') as full_text_file:
-                full_text_file.write("\n\n".join(full_text_output))  # Join pages with double newline
-            print(f"Full extracted text saved to {full_text_filename}.")
-        except Exception as e:
-            print(f"Failed to save full text file. Exception: {e}")
+        end_time = datetime.now()
+        log_entry(file_name, "PDF to Pages and OCR", start_time, end_time, "Success")
+        print(f"Extracted {count} pages from the PDF.")
 
-        # Save page-wise text to individual files
-        try:
-            page_text_folder = os.path.join(output_base, "page_texts")
-            os.makedirs(page_text_folder, exist_ok=True)
-            for page_name, page_text in page_texts.items():
-                page_file_path = os.path.join(page_text_folder, f"{page_name}.txt")
-                with open(page_file_path, 'w') as page_file:
-                    page_file.write(page_text)
-            print("Page-wise texts saved successfully.")
-        except Exception as e:
-            print(f"Failed to save page-wise text files. Exception: {e}")
+        self.save_document_text(output_base, file_name, page_texts)
 
         # Final Logging and Return Response
         print("All pages processed successfully.")
@@ -309,6 +472,148 @@ class PerformOcr(APIView):
             "predicted_data": predicted_data
         }, status=status.HTTP_200_OK)
 
+    def stream_pdf(self, file):
+        """
+        Process a PDF file and stream the OCR results as NDJSON, one JSON object per page as soon as
+        the page is predicted, followed by a final object with done set to true.
+        """
+        pdf_data = file.read()
+        file_name = os.path.splitext(file.name)[0]
+        output_base = os.path.join(self.output_folder, file_name)
+
+        # 1. Extract Pages, lazily a few pages at a time so a page is freed once it is streamed
+        print("Extracting Pages...")
+        page_images = iter_pdf_pages_with_text(pdf_data, save=False, book_name=file_name,
+                                               thread_count=PDF_RENDER_THREADS, use_text_layer=USE_TEXT_LAYER,
+                                               prescreen=PRESCREEN_PAGES)
+
+        def stream_pages():
+            page_texts = {}  # only the text is kept, the predictions are sent as soon as a page is done
+            start_time = datetime.now()
+            count = 0
+
+            try:
+                pages = self.book_pages(pdf_data, page_images)
+                for count, (kernel_sizes, (page_name, page_image, text_lines)) in enumerate(pages, start=1):
+                    try:
+                        page_predictions, page_text = self.ocr_pdf_page(file_name, output_base, count, page_name,
+                                                                        page_image, text_lines,
+                                                                        kernel_sizes=kernel_sizes)
+                    except Exception as e:
+                        print(f"Failed to OCR Page {count}. Exception: {e}")
+                        page_predictions, page_text = {"error": "Failed to OCR this page."}, None
+
+                    if page_predictions is None:
+                        page_predictions = {"error": "Failed to extract lines from this page."}
+                    elif page_text is not None:
+                        page_texts[page_name] = page_text
+
+                    yield json.dumps({
+                        "page": page_name,
+                        "page_number": count,
+                        "predicted_data": page_predictions,
+                    }, ensure_ascii=False) + "\n"
+            except Exception as e:
+                log_entry(file_name, "PDF to Pages", start_time, datetime.now(), "Failure")
+                print(f"Failed to extract pages from the PDF. Exception: {e}")
+                yield json.dumps({"error": "Failed to process PDF to pages."}) + "\n"
+                return
+
+            log_entry(file_name, "PDF to Pages and OCR", start_time, datetime.now(), "Success")
+            self.save_document_text(output_base, file_name, page_texts)
+
+            print("All pages processed successfully.")
+            yield json.dumps({"file": file.name, "num_pages": count, "done": True}) + "\n"
+
+        response = StreamingHttpResponse(stream_pages(), content_type="application/x-ndjson")
+        response["X-Accel-Buffering"] = "no"  # keep reverse proxies from buffering the stream
+        return response
+
+
+class OcrJobs(APIView):
+    permission_classes = [AllowAny]  # No authorization required
+    parser_classes = [MultiPartParser, FormParser]  # Ensures correct parsing for file uploads
+
+    def __init__(self):
+        self.output_folder = "output"  # Base output folder
+
+    @swagger_auto_schema(
+        manual_parameters=[
+            openapi.Parameter('file', openapi.IN_FORM, type=openapi.TYPE_FILE,
+                              description="Upload a .pdf file")
+        ],
+        responses={
+            202: 'OCR job queued',
+            400: 'Invalid file type or no file provided',
+        }
+    )
+    def post(self, request, *args, **kwargs):
+        """Queues a PDF for OCR and returns the id of the job."""
+        file = request.FILES.get('file')
+        if not file:
+            return Response({"error": "No file uploaded."}, status=status.HTTP_400_BAD_REQUEST)
+
+        if file.name.split('.')[-1].lower() != 'pdf':
+            return Response({"error": "Unsupported file type. Only .pdf files are allowed."},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        file_name = os.path.splitext(file.name)[0]
+        workers = get_job_workers()
+
+        # Every job has its own folder, uploads with the same name do not overwrite each other
+        job_id = workers.store.new_job_id()
+        output_base = os.path.join(self.output_folder, "jobs", job_id)
+        os.makedirs(output_base, exist_ok=True)
+
+        pdf_path = os.path.join(output_base, file.name)
+        with open(pdf_path, 'wb') as pdf_file:
+            for chunk in file.chunks():
+                pdf_file.write(chunk)
+
+        workers.store.create_job(file_name, pdf_path, output_base, job_id=job_id)
+        workers.notify()
+
+        return Response({
+            "job_id": job_id,
+            "status": "queued",
+            "status_url": f"/api/ocr_jobs/{job_id}",
+        }, status=status.HTTP_202_ACCEPTED)
+
+
+class OcrJobStatus(APIView):
+    permission_classes = [AllowAny]  # No authorization required
+
+    def get(self, request, job_id, *args, **kwargs):
+        """Returns the progress of a job and the results of its finished pages."""
+        store = get_job_workers().store
+        job = store.get_job(job_id)
+        if job is None:
+            return Response({"error": "OCR job not found."}, status=status.HTTP_404_NOT_FOUND)
+
+        pages = store.get_pages(job_id)
+        return Response({
+            "job_id": job_id,
+            "file": job["file_name"],
+            "status": job["status"],
+            "error": job["error"],
+            "num_pages": job["num_pages"],
+            "pages_skipped": job["pages_skipped"],
+            "pages_done": len(pages),
+            "created_at": job["created_at"],
+            "updated_at": job["updated_at"],
+            "pages": [{
+                "page_number": page["page_number"],
+                "page_name": page["page_name"],
+                "status": page["status"],
+                "predicted_data": page["predicted_data"],
+            } for page in pages],
+        }, status=status.HTTP_200_OK)
+
+
+def ocr_batch_stats(request):
+    """Returns the occupancy metrics of the cross request batch scheduler."""
+    return JsonResponse(get_all_stats())
+
 
 def download_scope_document(request):
     # Construct the file path from the static folder